@@ -1,16 +1,21 @@
 from flask import Flask
 from flask_login import LoginManager
 from config import config
-from app.models import db, User
+from app.models import db
 import os
 
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
 def create_app(config_name='development'):
     """Factory function para crear la aplicación Flask"""
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
-    # Inicializar extensiones
+    # Inicializar extensiones (pool de conexiones según DB_POOL_STRATEGY)
+    from app.pooling import configure_pool, init_pool_events
+    configure_pool(app)
     db.init_app(app)
+    init_pool_events(app)
     
     # Configurar login manager
     login_manager = LoginManager()
@@ -19,10 +24,13 @@ def create_app(config_name='development'):
     login_manager.login_message = 'Por favor inicia sesión para acceder a esta página.'
     login_manager.login_message_category = 'info'
     
+    # La identidad del usuario se reutiliza desde la sesión (ver app/user_cache.py)
+    from app.user_cache import load_user_identity
+    
     @login_manager.user_loader
     def load_user(user_id):
         try:
-            return User.query.get(int(user_id))
+            return load_user_identity(user_id)
         except:
             return None
     
@@ -46,7 +54,49 @@ def create_app(config_name='development'):
     app.register_blueprint(admin_bp)
     app.register_blueprint(api_bp)
     
-    # Crear contexto de aplicación e intentar inicializar BD
+    # Instrumentación de consultas SQL (SQL_INSTRUMENTATION)
+    from app.instrumentation import init_instrumentation
+    init_instrumentation(app)
+    
+    # Registrar comandos CLI
+    from app.commands import register_commands
+    register_commands(app)
+    
+    # Migraciones (flask db ...): Alembic solo se importa al usar el CLI de Flask
+    if os.environ.get('FLASK_RUN_FROM_CLI'):
+        from flask_migrate import Migrate
+        Migrate(app, db, directory=MIGRATIONS_DIR, render_as_batch=True, compare_type=True)
+    
+    # Crear tablas al arrancar. En modo FAST_BOOT (producción/serverless) se omite
+    # para no pagar consultas de metadatos en cada arranque en frío:
+    # las tablas se crean una vez con "flask --app app init-db"
+    if not app.config.get('FAST_BOOT'):
+        init_database(app)
+    
+    # Escritura del registro de auditoría por lotes (ver app/audit_writer.py)
+    from app.audit_writer import init_audit_writer
+    init_audit_writer(app)
+    
+    # Pool de generación de reportes (ver app/report_jobs.py)
+    from app.report_jobs import init_report_jobs
+    init_report_jobs(app)
+    
+    # Pool de envío de correos dentro del proceso (ver app/mailer.py)
+    if app.config.get('MAIL_OUTBOX_AUTOSTART'):
+        import atexit
+        from app.mailer import start_outbox_worker, stop_outbox_worker
+        start_outbox_worker(app)
+        atexit.register(stop_outbox_worker)
+    
+    return app
+
+def init_database(app):
+    """
+    Crea las tablas que falten y muestra el estado de la conexión
+    
+    Returns:
+        bool: True si la base de datos respondió
+    """
     with app.app_context():
         try:
             db.create_all()
@@ -64,6 +114,7 @@ def create_app(config_name='development'):
             print(f"   Host: {app.config.get('DB_HOST', 'N/A')}")
             print(f"   Puerto: {app.config.get('DB_PORT', 'N/A')}")
             print(f"   Base de datos: {app.config.get('DB_NAME', 'N/A')}")
+            return True
             
         except Exception as e:
             db_host = app.config.get('DB_HOST', 'N/A')
@@ -89,5 +140,4 @@ def create_app(config_name='development'):
             
             # La aplicación continúa ejecutándose aunque no esté la BD
             app.config['DB_ERROR'] = True
-    
-    return app
+            return False
@@ -0,0 +1,284 @@
+"""
+Registro de auditoría: paginación por cursor y contadores
+
+La bitácora crece sin límite (cada login, logout y edición agrega una fila),
+así que el visor de /admin/audit-log no usa OFFSET ni COUNT(*):
+
+    • Paginación por cursor (keyset) sobre (created_at, id): cada página
+      continúa desde la última fila de la anterior usando el índice, sin
+      recorrer las filas ya mostradas.
+    • Filtros de fecha como rangos sobre created_at (>= inicio, < fin), que
+      pueden usar los índices compuestos de AuditLog.
+    • Estadísticas de la cabecera desde audit_log_counters (una fila por día y
+      acción). Los contadores no se actualizan en cada flush (la fila, común a
+      todas las peticiones que registran la misma acción el mismo día, quedaría
+      bloqueada hasta el final de la petición): los registros se cuentan en
+      memoria y se suman al hacer commit.
+        - Sin hilo de escritura (AUDIT_LOG_ASYNC desactivado): un upsert por
+          (día, acción) justo antes del commit, en la misma transacción. La
+          fila queda bloqueada solo durante el commit y no hay otra transacción.
+        - Con hilo: después del commit se encolan y el hilo de
+          app/audit_writer.py los suma con su siguiente lote.
+
+Los registros existentes antes de crear la tabla de contadores se cuentan con:
+
+    flask --app app rebuild-audit-log-counters
+"""
+from datetime import date, datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+# Registros por página del visor
+AUDIT_LOG_PAGE_SIZE = 20
+
+CURSOR_DATE_FORMAT = '%Y%m%d%H%M%S%f'
+
+
+# ---------- Paginación por cursor ----------
+
+class KeysetPage:
+    """Página de resultados con los cursores para avanzar y retroceder"""
+
+    def __init__(self, items, has_next, has_prev):
+        self.items = items
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = encode_cursor(items[-1]) if items and has_next else None
+        self.prev_cursor = encode_cursor(items[0]) if items and has_prev else None
+
+
+def encode_cursor(log):
+    """Cursor de un registro: fecha y id, ej: 20250131174502123456-981"""
+    return f'{log.created_at.strftime(CURSOR_DATE_FORMAT)}-{log.id}'
+
+
+def decode_cursor(cursor):
+    """
+    Convierte un cursor en (created_at, id)
+
+    Returns:
+        tuple o None si el cursor no es válido
+    """
+    try:
+        created_at, log_id = cursor.split('-')
+        return datetime.strptime(created_at, CURSOR_DATE_FORMAT), int(log_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def paginate_audit_log(query, before=None, after=None, per_page=AUDIT_LOG_PAGE_SIZE):
+    """
+    Pagina una consulta de AuditLog del más reciente al más antiguo
+
+    Args:
+        query: Consulta de AuditLog con los filtros ya aplicados
+        before: Cursor; devuelve los registros más antiguos que él (página siguiente)
+        after: Cursor; devuelve los registros más recientes que él (página anterior)
+        per_page: Registros por página
+
+    Returns:
+        KeysetPage
+    """
+    from app.models import AuditLog
+
+    created_at, log_id = AuditLog.created_at, AuditLog.id
+    position = decode_cursor(after) if after else decode_cursor(before) if before else None
+
+    if position and after:
+        # Página anterior: los per_page registros inmediatamente más recientes, luego se invierten
+        cursor_date, cursor_id = position
+        rows = query.filter(
+            created_at >= cursor_date,
+            (created_at > cursor_date) | (log_id > cursor_id)
+        ).order_by(created_at.asc(), log_id.asc()).limit(per_page + 1).all()
+        has_prev = len(rows) > per_page
+        return KeysetPage(list(reversed(rows[:per_page])), has_next=True, has_prev=has_prev)
+
+    if position:
+        # Escrito como created_at <= x AND (created_at < x OR id < y) para que use el índice
+        cursor_date, cursor_id = position
+        query = query.filter(
+            created_at <= cursor_date,
+            (created_at < cursor_date) | (log_id < cursor_id)
+        )
+
+    rows = query.order_by(created_at.desc(), log_id.desc()).limit(per_page + 1).all()
+    return KeysetPage(rows[:per_page], has_next=len(rows) > per_page, has_prev=position is not None)
+
+
+def filter_audit_log(query, user_id=None, action=None, entity_type=None, date_from=None, date_to=None):
+    """
+    Aplica los filtros del visor; las fechas (date) se convierten en rangos sobre created_at
+
+    date_to es inclusivo: se filtra created_at < date_to + 1 día.
+    """
+    from app.models import AuditLog
+
+    if user_id:
+        query = query.filter(AuditLog.user_id == user_id)
+    if action:
+        query = query.filter(AuditLog.action == action)
+    if entity_type:
+        query = query.filter(AuditLog.entity_type == entity_type)
+    if date_from:
+        query = query.filter(AuditLog.created_at >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        query = query.filter(AuditLog.created_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    return query
+
+
+# ---------- Contadores ----------
+
+def get_audit_log_stats(today=None):
+    """
+    Estadísticas de la cabecera del visor leídas de audit_log_counters
+
+    Returns:
+        dict: {'total_logs', 'logs_today', 'actions_count'}
+    """
+    from app.models import db, AuditLogCounter
+
+    today = today or date.today()
+    total_logs, logs_today, actions_count = db.session.execute(
+        db.select(
+            db.func.coalesce(db.func.sum(AuditLogCounter.total), 0),
+            db.func.coalesce(db.func.sum(db.case((AuditLogCounter.day == today, AuditLogCounter.total), else_=0)), 0),
+            db.func.count(db.func.distinct(AuditLogCounter.action))
+        )
+    ).one()
+
+    return {
+        'total_logs': int(total_logs),
+        'logs_today': int(logs_today),
+        'actions_count': actions_count
+    }
+
+
+def increment_audit_log_counters(connection, counts):
+    """
+    Suma registros a los contadores con un upsert por (día, acción)
+
+    Crea la fila o suma sobre la existente en la misma sentencia (ON DUPLICATE
+    KEY UPDATE en MySQL, ON CONFLICT en PostgreSQL y SQLite).
+
+    Args:
+        connection: Conexión en la transacción que guarda (o ya guardó) los registros
+        counts: dict {(day, action): cantidad}
+    """
+    from app.models import AuditLogCounter
+
+    table = AuditLogCounter.__table__
+    dialect = connection.dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+
+    for (day, action), amount in sorted(counts.items()):
+        values = {'day': day, 'action': action, 'total': amount}
+        if dialect == 'mysql':
+            statement = insert(table).values(**values).on_duplicate_key_update(total=table.c.total + amount)
+        elif dialect in ('postgresql', 'sqlite'):
+            statement = insert(table).values(**values).on_conflict_do_update(
+                index_elements=['day', 'action'], set_={'total': table.c.total + amount}
+            )
+        else:
+            # Motor sin upsert: UPDATE y, si no había fila, INSERT; si otra transacción la creó antes, sumar sobre ella
+            match = (table.c.day == day) & (table.c.action == action)
+            if connection.execute(table.update().where(match).values(total=table.c.total + amount)).rowcount:
+                continue
+            try:
+                with connection.begin_nested():
+                    connection.execute(table.insert().values(**values))
+            except IntegrityError:
+                connection.execute(table.update().where(match).values(total=table.c.total + amount))
+            continue
+        connection.execute(statement)
+
+
+def rebuild_audit_log_counters():
+    """
+    Recalcula audit_log_counters desde audit_logs (recorre toda la tabla)
+
+    Returns:
+        int: Filas de contadores creadas
+    """
+    from app.models import db, AuditLog, AuditLogCounter
+
+    day = db.func.date(AuditLog.created_at)
+    rows = db.session.execute(
+        db.select(day, AuditLog.action, db.func.count()).group_by(day, AuditLog.action)
+    ).all()
+
+    db.session.execute(db.delete(AuditLogCounter))
+    if rows:
+        db.session.execute(db.insert(AuditLogCounter), [
+            {'day': _as_date(row_day), 'action': action, 'total': total}
+            for row_day, action, total in rows
+        ])
+    db.session.commit()
+    return len(rows)
+
+
+def _as_date(value):
+    # SQLite devuelve date() como texto
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    return value
+
+
+def merge_counts(target, counts):
+    """Suma counts {(day, action): cantidad} sobre target"""
+    for key, amount in counts.items():
+        target[key] = target.get(key, 0) + amount
+    return target
+
+
+# Registros contados en la transacción de la sesión que aún no hizo commit
+PENDING_COUNTS_KEY = 'audit_log_counts'
+
+
+@event.listens_for(Session, 'after_flush')
+def _count_new_logs(session, flush_context):
+    """Cuenta los AuditLog insertados en este flush (sin escribir en audit_log_counters)"""
+    from app.models import AuditLog
+
+    counts = {}
+    for obj in session.new:
+        if isinstance(obj, AuditLog):
+            key = ((obj.created_at or datetime.now()).date(), obj.action)
+            counts[key] = counts.get(key, 0) + 1
+
+    if counts:
+        merge_counts(session.info.setdefault(PENDING_COUNTS_KEY, {}), counts)
+
+
+@event.listens_for(Session, 'before_commit')
+def _write_counts(session):
+    """Sin hilo de escritura, suma los registros en la transacción que los guarda"""
+    from app.audit_writer import get_running_writer
+
+    if get_running_writer() is not None:
+        return
+    # El commit todavía no hizo su flush: los registros pendientes se cuentan ahora
+    session.flush()
+    counts = session.info.pop(PENDING_COUNTS_KEY, None)
+    if counts:
+        increment_audit_log_counters(session.connection(), counts)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_counts(session):
+    """Con hilo de escritura, los registros ya confirmados se suman en su siguiente lote"""
+    counts = session.info.pop(PENDING_COUNTS_KEY, None)
+    if counts:
+        from app.audit_writer import queue_counts
+        queue_counts(counts)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_counts(session):
+    session.info.pop(PENDING_COUNTS_KEY, None)
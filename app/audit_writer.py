@@ -0,0 +1,269 @@
+"""
+Escritura del registro de auditoría
+
+Dos formas de registrar una acción, según si la petición ya escribe en la base
+de datos o no:
+
+    • record_action() → agrega el AuditLog a la sesión de la petición; se
+      guarda con el mismo commit que el cambio que registra (una transacción
+      por mutación, y si el cambio se revierte el registro también).
+    • queue_action()  → para acciones sin cambios propios (login, logout, ver
+      una política). La entrada se encola y un hilo la inserta junto con otras
+      en un solo INSERT con executemany cada AUDIT_LOG_FLUSH_SECONDS o al
+      juntar AUDIT_LOG_BATCH_SIZE entradas. La petición no espera ningún commit.
+
+Con AUDIT_LOG_ASYNC desactivado (ej: serverless, donde el proceso se congela
+al responder) queue_action() inserta la entrada en el momento, en su propia
+transacción. Al terminar el proceso se escriben las entradas pendientes.
+
+Los contadores de audit_log_counters de los registros de record_action() se
+suman con el commit de la petición (ver app/audit_log.py). Con el hilo activo
+se encolan después del commit (queue_counts) y el hilo los aplica con el
+siguiente lote, un upsert por (día, acción).
+"""
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from flask import current_app, has_app_context, has_request_context, request
+from flask_login import current_user
+
+# Marca para detener el hilo
+_STOP = object()
+
+
+class CounterDelta:
+    """Elemento de la cola: registros ya guardados por otra transacción, a sumar en los contadores"""
+
+    def __init__(self, counts):
+        self.counts = counts
+
+
+def build_entry(action, entity_type=None, entity_id=None, changes=None, user_id=None, ip_address=None):
+    """
+    Arma los valores de un registro; usuario e IP se toman de la petición si no se indican
+
+    changes puede ser un diccionario (se guarda como JSON) o un texto ya serializado.
+    """
+    if user_id is None and has_request_context() and current_user.is_authenticated:
+        user_id = current_user.id
+    if ip_address is None and has_request_context():
+        ip_address = request.remote_addr
+    if changes and not isinstance(changes, str):
+        changes = json.dumps(changes, ensure_ascii=False, default=str)
+
+    return {
+        'user_id': user_id,
+        'action': action,
+        'entity_type': entity_type,
+        'entity_id': entity_id,
+        'changes': changes or None,
+        'ip_address': ip_address,
+        'created_at': datetime.now()
+    }
+
+
+def record_action(action, entity_type=None, entity_id=None, changes=None, user_id=None, ip_address=None):
+    """
+    Agrega el registro a la sesión actual; lo guarda el commit de quien llama
+
+    Returns:
+        AuditLog: Registro agregado (sin commit)
+    """
+    from app.models import db, AuditLog
+
+    log_entry = AuditLog(**build_entry(action, entity_type, entity_id, changes, user_id, ip_address))
+    db.session.add(log_entry)
+    return log_entry
+
+
+def get_running_writer():
+    """AuditLogWriter de la aplicación actual si su hilo está activo, o None"""
+    if not has_app_context():
+        return None
+    writer = current_app.extensions.get('audit_writer')
+    return writer if writer is not None and writer.running else None
+
+
+def queue_action(action, entity_type=None, entity_id=None, changes=None, user_id=None, ip_address=None):
+    """Encola el registro para el hilo de escritura (o lo inserta ya si no está activo)"""
+    entry = build_entry(action, entity_type, entity_id, changes, user_id, ip_address)
+
+    writer = get_running_writer()
+    if writer is not None:
+        writer.enqueue(entry)
+        return
+
+    from app.models import db
+    try:
+        with db.engine.begin() as connection:
+            write_audit_entries(connection, [entry])
+    except Exception as e:
+        print(f"Error al registrar '{action}' en auditoría: {e}")
+
+
+def queue_counts(counts):
+    """
+    Encola conteos de registros ya confirmados para el hilo de escritura
+
+    Si el hilo se detuvo después del commit se suman en el momento, en una
+    transacción propia y corta (la de la petición ya terminó).
+    """
+    writer = get_running_writer()
+    if writer is not None:
+        writer.enqueue(CounterDelta(counts))
+        return
+
+    from app.models import db
+    from app.audit_log import increment_audit_log_counters
+    try:
+        with db.engine.begin() as connection:
+            increment_audit_log_counters(connection, counts)
+    except Exception as e:
+        print(f"Error actualizando los contadores de auditoría: {e}")
+
+
+def write_audit_entries(connection, entries, counts=None):
+    """
+    Inserta varias entradas con un solo executemany y actualiza los contadores
+
+    Args:
+        connection: Conexión en la transacción del lote
+        entries: Valores de AuditLog a insertar (puede estar vacía)
+        counts: Conteos adicionales {(day, action): cantidad} de registros ya
+                guardados por record_action()
+    """
+    from app.models import AuditLog
+    from app.audit_log import increment_audit_log_counters, merge_counts
+
+    if entries:
+        connection.execute(AuditLog.__table__.insert(), entries)
+
+    totals = dict(counts or {})
+    for entry in entries:
+        merge_counts(totals, {(entry['created_at'].date(), entry['action']): 1})
+    if totals:
+        increment_audit_log_counters(connection, totals)
+
+
+class AuditLogWriter:
+    """Hilo que junta las entradas encoladas y las inserta por lotes"""
+
+    def __init__(self, app):
+        self.app = app
+        self.batch_size = max(1, app.config.get('AUDIT_LOG_BATCH_SIZE', 100))
+        self.flush_seconds = app.config.get('AUDIT_LOG_FLUSH_SECONDS', 2)
+        self.queue = queue.Queue()
+        self.written = 0
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not self.running:
+            self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+            self._thread.start()
+        return self
+
+    def enqueue(self, entry):
+        self.queue.put(entry)
+
+    def stop(self, timeout=10):
+        """Detiene el hilo y escribe lo que quede en la cola"""
+        if self._thread is not None:
+            self.queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def flush(self):
+        """
+        Escribe en este hilo todas las entradas encoladas
+
+        Returns:
+            int: Entradas escritas
+        """
+        entries = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                entries.append(item)
+
+        written = 0
+        for start in range(0, len(entries), self.batch_size):
+            batch = entries[start:start + self.batch_size]
+            if self._write(batch):
+                written += sum(1 for item in batch if not isinstance(item, CounterDelta))
+            else:
+                print(f"⚠️ Se perdieron {len(entries) - written} registros de auditoría")
+                break
+        return written
+
+    def _write(self, batch):
+        from app.models import db
+        from app.audit_log import merge_counts
+
+        entries, counts = [], {}
+        for item in batch:
+            if isinstance(item, CounterDelta):
+                merge_counts(counts, item.counts)
+            else:
+                entries.append(item)
+
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as connection:
+                    write_audit_entries(connection, entries, counts)
+            self.written += len(entries)
+            return True
+        except Exception as e:
+            print(f"Error escribiendo {len(batch)} registros de auditoría: {e}")
+            return False
+
+    def _run(self):
+        batch = []
+        deadline = None
+
+        while True:
+            timeout = max(0, deadline - time.monotonic()) if batch else None
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                break
+            if item is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_seconds
+                batch.append(item)
+
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                if self._write(batch):
+                    batch = []
+                else:
+                    # Se conserva el lote y se reintenta en el siguiente intervalo
+                    deadline = time.monotonic() + self.flush_seconds
+
+        # Lote en curso al detener; el resto de la cola lo escribe stop()
+        if batch and not self._write(batch):
+            print(f"⚠️ Se perdieron {len(batch)} registros de auditoría")
+
+
+def init_audit_writer(app):
+    """Inicia el hilo de escritura si AUDIT_LOG_ASYNC está activo"""
+    if not app.config.get('AUDIT_LOG_ASYNC'):
+        return None
+
+    import atexit
+
+    writer = AuditLogWriter(app).start()
+    app.extensions['audit_writer'] = writer
+    atexit.register(writer.stop)
+    return writer
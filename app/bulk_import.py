@@ -0,0 +1,374 @@
+"""
+Importación masiva de certificaciones y auditorías desde Excel o CSV
+
+El archivo se procesa por lotes de IMPORT_BATCH filas, sin cargarlo completo:
+
+    1. Lectura: openpyxl en modo read_only (lee la hoja fila a fila) o
+       csv.reader sobre el archivo subido
+    2. Validación del lote: campos obligatorios, fechas y valores permitidos.
+       Los responsables se resuelven con un solo mapa {usuario/email/nombre: id}
+       cargado al empezar, sin una consulta por fila
+    3. Inserción: las filas válidas del lote se insertan con un solo INSERT de
+       Core (executemany) y un registro de auditoría, en su propia transacción
+
+Una fila con errores no detiene la importación: se informa su número y el
+motivo, y el resto del lote se guarda. Si falla la inserción de un lote se
+revierte solo ese lote.
+
+Los encabezados aceptan el nombre del campo (ej: expiration_date) o el texto
+de las columnas del reporte Excel (ej: "Fecha Vencimiento"), así que un
+reporte exportado se puede volver a importar.
+"""
+import csv
+import io
+import os
+import time
+import unicodedata
+from datetime import date, datetime
+
+# Filas validadas e insertadas por transacción
+IMPORT_BATCH = 500
+
+# Errores que se conservan para mostrar (el total se cuenta igual)
+IMPORT_MAX_ERRORS = 200
+
+IMPORT_EXTENSIONS = ('xlsx', 'csv')
+
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y')
+
+# campo → encabezados aceptados (normalizados: sin tildes, minúsculas, "_" en lugar de espacios)
+IMPORT_COLUMNS = {
+    'certifications': {
+        'name': ('name', 'nombre', 'certificacion'),
+        'norm': ('norm', 'norma'),
+        'issuing_entity': ('issuing_entity', 'emisor', 'entidad_emisora'),
+        'emission_date': ('emission_date', 'fecha_emision'),
+        'expiration_date': ('expiration_date', 'fecha_vencimiento'),
+        'responsible': ('responsible', 'responsible_id', 'responsable'),
+        'notes': ('notes', 'notas'),
+    },
+    'audits': {
+        'audit_type': ('audit_type', 'tipo'),
+        'evaluated_area': ('evaluated_area', 'area', 'area_evaluada'),
+        'scheduled_date': ('scheduled_date', 'fecha_programada'),
+        'executed_date': ('executed_date', 'fecha_ejecucion'),
+        'status': ('status', 'estado'),
+        'responsible': ('responsible', 'responsible_id', 'responsable'),
+        'description': ('description', 'descripcion'),
+    },
+}
+
+# Campos sin los que no se puede crear el registro
+REQUIRED_COLUMNS = {
+    'certifications': ('name', 'norm', 'issuing_entity', 'emission_date', 'expiration_date'),
+    'audits': ('audit_type', 'evaluated_area', 'scheduled_date'),
+}
+
+AUDIT_STATUSES = ('programada', 'en_ejecucion', 'completada')
+
+
+class ImportResult:
+    """Resumen de una importación: filas leídas, insertadas, errores y rendimiento"""
+
+    def __init__(self, entity_type, dry_run=False):
+        self.entity_type = entity_type
+        self.dry_run = dry_run
+        self.total = 0
+        self.inserted = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add_error(self, row_number, message):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append((row_number, message))
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    @property
+    def rows_per_second(self):
+        return int(self.total / self.elapsed) if self.elapsed > 0 else self.total
+
+    def to_dict(self):
+        return {
+            'entity_type': self.entity_type,
+            'dry_run': self.dry_run,
+            'total': self.total,
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'batches': self.batches,
+            'errors': [{'row': row, 'message': message} for row, message in self.errors],
+            'elapsed_ms': round(self.elapsed * 1000, 1),
+            'rows_per_second': self.rows_per_second
+        }
+
+
+def normalize_header(value):
+    """'Fecha Emisión' → 'fecha_emision'"""
+    text = unicodedata.normalize('NFKD', str(value or '')).encode('ascii', 'ignore').decode('ascii')
+    return '_'.join(text.strip().lower().split())
+
+
+def _map_headers(entity_type, headers):
+    """
+    Posición de cada campo en la fila de encabezados
+
+    Returns:
+        dict: {campo: índice}
+    """
+    aliases = {alias: field for field, names in IMPORT_COLUMNS[entity_type].items() for alias in names}
+    positions = {}
+    for index, header in enumerate(headers):
+        field = aliases.get(normalize_header(header))
+        if field and field not in positions:
+            positions[field] = index
+
+    missing = [field for field in REQUIRED_COLUMNS[entity_type] if field not in positions]
+    if missing:
+        raise ValueError(f"Faltan columnas obligatorias: {', '.join(missing)}")
+    return positions
+
+
+def _iter_excel(stream):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_csv(stream):
+    # utf-8-sig: Excel guarda los CSV con BOM; se detecta ";" como separador (configuración regional)
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    sample = text.read(4096)
+    text.seek(0)
+    delimiter = ';' if sample.count(';') > sample.count(',') else ','
+    yield from csv.reader(text, delimiter=delimiter)
+
+
+def read_rows(entity_type, stream, filename):
+    """
+    Filas del archivo como diccionarios {campo: valor}, leídas de a una
+
+    Yields:
+        tuple: (número de fila en el archivo, dict); las filas vacías se omiten
+    """
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension not in IMPORT_EXTENSIONS:
+        raise ValueError('Formato no válido: se acepta .xlsx o .csv')
+
+    rows = _iter_excel(stream) if extension == 'xlsx' else _iter_csv(stream)
+    headers = next(rows, None)
+    if headers is None:
+        raise ValueError('El archivo está vacío')
+    positions = _map_headers(entity_type, headers)
+
+    for row_number, row in enumerate(rows, start=2):
+        if not any(value not in (None, '') for value in row):
+            continue
+        yield row_number, {field: row[index] if index < len(row) else None for field, index in positions.items()}
+
+
+def load_responsible_lookup():
+    """
+    Mapa de usuarios activos para resolver la columna responsable, en una sola consulta
+
+    Acepta id, nombre de usuario, email o nombre completo (sin distinguir
+    mayúsculas). Un nombre completo compartido por varios usuarios queda
+    como ambiguo (None).
+
+    Returns:
+        dict: {clave: user_id o None}
+    """
+    from app.models import db, User
+
+    lookup, names = {}, {}
+    rows = db.session.execute(
+        db.select(User.id, User.username, User.email, User.full_name).where(User.is_active == True)
+    ).all()
+    for user_id, username, email, full_name in rows:
+        lookup[str(user_id)] = user_id
+        for key in (username, email):
+            if key:
+                lookup[key.strip().lower()] = user_id
+
+        key = (full_name or '').strip().lower()
+        if key:
+            names[key] = user_id if names.get(key, user_id) == user_id else None
+
+    # Usuario, email e id tienen prioridad sobre el nombre completo
+    for key, user_id in names.items():
+        lookup.setdefault(key, user_id)
+    return lookup
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _date(value, field, errors, required=True):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+
+    text = _text(value)
+    if not text:
+        if required:
+            errors.append(f'{field} es obligatorio')
+        return None
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            pass
+    errors.append(f'{field} no es una fecha válida: {text}')
+    return None
+
+
+def _responsible(value, lookup, default_user_id, errors):
+    key = _text(value).lower()
+    if not key:
+        return default_user_id
+    if key not in lookup:
+        errors.append(f'Responsable no encontrado: {_text(value)}')
+    elif lookup[key] is None:
+        errors.append(f'Responsable ambiguo (use usuario o email): {_text(value)}')
+    return lookup.get(key)
+
+
+def _certification_values(data, lookup, default_user_id):
+    """Valores de una certificación y la lista de errores de la fila"""
+    from app.models import Certification
+
+    errors = []
+    values = {field: _text(data.get(field))[:150] for field in ('name', 'issuing_entity')}
+    values['norm'] = _text(data.get('norm'))[:100]
+    for field in ('name', 'norm', 'issuing_entity'):
+        if not values[field]:
+            errors.append(f'{field} es obligatorio')
+
+    values['emission_date'] = _date(data.get('emission_date'), 'emission_date', errors)
+    values['expiration_date'] = _date(data.get('expiration_date'), 'expiration_date', errors)
+    if values['emission_date'] and values['expiration_date'] and values['expiration_date'] <= values['emission_date']:
+        errors.append('La fecha de vencimiento debe ser posterior a la de emisión')
+
+    values['responsible_id'] = _responsible(data.get('responsible'), lookup, default_user_id, errors)
+    values['notes'] = _text(data.get('notes'))
+    if values['expiration_date']:
+        values['status'] = Certification.compute_status(values['expiration_date'])
+    return values, errors
+
+
+def _audit_values(data, lookup, default_user_id):
+    """Valores de una auditoría y la lista de errores de la fila"""
+    from app.models import AuditType
+
+    errors = []
+    values = {
+        'audit_type': _text(data.get('audit_type')).lower(),
+        'evaluated_area': _text(data.get('evaluated_area'))[:150],
+        'description': _text(data.get('description')),
+        'status': normalize_header(data.get('status')) or 'programada'
+    }
+    if values['audit_type'] not in [audit_type.value for audit_type in AuditType]:
+        errors.append(f"Tipo no válido: {values['audit_type'] or '(vacío)'} (interna o externa)")
+    if not values['evaluated_area']:
+        errors.append('evaluated_area es obligatorio')
+    if values['status'] not in AUDIT_STATUSES:
+        errors.append(f"Estado no válido: {values['status']}")
+
+    values['scheduled_date'] = _date(data.get('scheduled_date'), 'scheduled_date', errors)
+    values['executed_date'] = _date(data.get('executed_date'), 'executed_date', errors, required=False)
+    values['responsible_id'] = _responsible(data.get('responsible'), lookup, default_user_id, errors)
+    return values, errors
+
+
+def _insert_batch(entity_type, rows, first_row, user_id, filename, result):
+    """
+    Inserta las filas válidas de un lote y su registro de auditoría en una transacción
+
+    El INSERT de Core no pasa por el flush de la sesión, así que el resumen del
+    dashboard se invalida aquí después de cada commit.
+    """
+    from app.models import db, Certification, Audit
+    from app.audit_writer import record_action
+    from app.dashboard import invalidate_dashboard_summary
+
+    model = Certification if entity_type == 'certifications' else Audit
+    try:
+        db.session.execute(db.insert(model.__table__), [values for _, values in rows])
+        record_action('import', entity_type=model.__name__.lower(), user_id=user_id,
+                      changes={'file': filename, 'rows': len(rows), 'first_row': first_row})
+        db.session.commit()
+        result.inserted += len(rows)
+        invalidate_dashboard_summary()
+    except Exception as e:
+        db.session.rollback()
+        for row_number, _ in rows:
+            result.add_error(row_number, f'Error al guardar el lote: {e}')
+        print(f"Error importando un lote de {entity_type}: {e}")
+
+
+def import_records(entity_type, stream, filename, user_id, dry_run=False, batch_size=IMPORT_BATCH):
+    """
+    Importa certificaciones o auditorías desde un archivo .xlsx o .csv
+
+    Args:
+        entity_type (str): 'certifications' o 'audits'
+        stream: Archivo abierto en modo binario (ej: FileStorage.stream)
+        filename (str): Nombre original, define el formato por su extensión
+        user_id (int): Usuario que importa; es el responsable de las filas sin responsable
+        dry_run (bool): Solo validar, sin insertar
+        batch_size (int): Filas por lote (validación e inserción)
+
+    Returns:
+        ImportResult
+
+    Raises:
+        ValueError: Si el formato, el tipo o los encabezados no son válidos
+    """
+    if entity_type not in IMPORT_COLUMNS:
+        raise ValueError(f'Tipo de importación no válido: {entity_type}')
+
+    result = ImportResult(entity_type, dry_run=dry_run)
+    build_values = _certification_values if entity_type == 'certifications' else _audit_values
+    lookup = load_responsible_lookup()
+    filename = os.path.basename(filename)
+
+    batch = []
+    for row_number, data in read_rows(entity_type, stream, filename):
+        batch.append((row_number, data))
+        if len(batch) >= batch_size:
+            _process_batch(entity_type, batch, build_values, lookup, user_id, filename, result)
+            batch = []
+    if batch:
+        _process_batch(entity_type, batch, build_values, lookup, user_id, filename, result)
+
+    return result.finish()
+
+
+def _process_batch(entity_type, batch, build_values, lookup, user_id, filename, result):
+    valid = []
+    for row_number, data in batch:
+        values, errors = build_values(data, lookup, user_id)
+        if errors:
+            result.add_error(row_number, '; '.join(errors))
+        else:
+            valid.append((row_number, values))
+
+    result.total += len(batch)
+    result.batches += 1
+    if valid and not result.dry_run:
+        _insert_batch(entity_type, valid, batch[0][0], user_id, filename, result)
@@ -0,0 +1,192 @@
+"""
+Comandos de línea de comandos (Flask CLI)
+
+Uso:
+    flask --app app init-db
+    flask --app app refresh-cert-status
+    flask --app app check-expiration-alerts [--dry-run] [--no-email]
+    flask --app app outbox-worker [--workers N]
+    flask --app app outbox-drain
+    flask --app app rebuild-audit-log-counters
+    flask --app app check-indexes [--user USUARIO]
+    flask --app app cleanup-reports [--dry-run] [--max-mb N] [--max-age-hours N]
+    flask --app app import-data {certifications|audits} ARCHIVO [--user USUARIO] [--dry-run]
+    flask --app app gc-documents [--dry-run] [--skip-legacy]
+"""
+import click
+
+
+def register_commands(app):
+    """Registra los comandos CLI de la aplicación"""
+
+    @app.cli.command('init-db')
+    def init_db():
+        """Crea las tablas que falten (necesario con FAST_BOOT activo)"""
+        from app import init_database
+
+        if not init_database(app):
+            raise SystemExit(1)
+        click.echo('✅ Tablas verificadas')
+
+    @app.cli.command('refresh-cert-status')
+    def refresh_cert_status():
+        """Sincroniza la columna status de las certificaciones con su fecha de vencimiento"""
+        from app.models import Certification
+
+        updated = Certification.refresh_stored_statuses()
+        click.echo(f'✅ Certificaciones actualizadas: {updated}')
+
+    @app.cli.command('check-expiration-alerts')
+    @click.option('--dry-run', is_flag=True, help='Muestra las alertas que se generarían sin escribir nada')
+    @click.option('--no-email', is_flag=True, help='Registra las alertas sin encolar correos')
+    def check_expiration_alerts(dry_run, no_email):
+        """Genera las alertas de vencimiento de certificaciones pendientes"""
+        from app.utils import check_certification_expiration_alerts
+
+        summary = check_certification_expiration_alerts(dry_run=dry_run, send_emails=not no_email)
+
+        if dry_run:
+            click.echo('🔎 Modo simulación: no se escribió ni se envió nada')
+            for cert_id, name, days, threshold in summary['planned']:
+                click.echo(f'   • [{cert_id}] {name}: vence en {days} días (umbral {threshold})')
+
+        click.echo(f"   Certificaciones evaluadas: {summary['candidates']}")
+        click.echo(f"   Alertas {'a generar' if dry_run else 'generadas'}: {summary['alerts']}")
+        if not dry_run:
+            click.echo(f"   Correos encolados: {summary['emails_queued']}")
+        click.echo('   Tiempos: ' + ', '.join(f'{step}={ms:.1f}ms' for step, ms in summary['timings'].items()))
+
+    @app.cli.command('outbox-worker')
+    @click.option('--workers', type=int, default=None, help='Número de hilos (por defecto MAIL_WORKERS)')
+    def outbox_worker(workers):
+        """Procesa el outbox de correos de forma continua hasta Ctrl+C"""
+        import time
+        from app.mailer import OutboxWorkerPool
+
+        pool = OutboxWorkerPool(app, workers=workers).start()
+        click.echo(f'📬 Outbox worker iniciado con {pool.workers} hilo(s). Ctrl+C para detener.')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            click.echo('Deteniendo workers...')
+            pool.stop()
+
+    @app.cli.command('outbox-drain')
+    def outbox_drain():
+        """Envía una vez todos los correos pendientes del outbox (para cron)"""
+        from app.mailer import OutboxWorkerPool
+
+        stats = OutboxWorkerPool(app).drain()
+        click.echo(f"✅ Correos enviados: {stats['sent']} (fallidos: {stats['failed']})")
+
+    @app.cli.command('rebuild-audit-log-counters')
+    def rebuild_audit_log_counters():
+        """Recalcula los contadores del registro de auditoría desde audit_logs"""
+        from app.audit_log import rebuild_audit_log_counters as rebuild
+
+        rows = rebuild()
+        click.echo(f'✅ Contadores recalculados: {rows} (día, acción)')
+
+    @app.cli.command('check-indexes')
+    @click.option('--user', 'username', default=None, help='Usuario con el que se recorren las páginas (por defecto el primer administrador)')
+    def check_indexes(username):
+        """Verifica con EXPLAIN que las consultas de listados y dashboard usan índices"""
+        from app.models import User, UserRole
+        from app.query_plans import check_query_plans
+
+        query = User.query.filter_by(is_active=True)
+        user = query.filter_by(username=username).first() if username else \
+            query.filter_by(role=UserRole.ADMINISTRADOR.value).first()
+        if user is None:
+            raise click.ClickException('No se encontró un usuario activo para recorrer las páginas')
+
+        problems, total = check_query_plans(app, user)
+        for problem in problems:
+            click.echo(f"❌ {problem['url']}: recorre {', '.join(problem['scans'])}")
+            click.echo('   ' + ' '.join(problem['statement'].split())[:300])
+
+        if problems:
+            click.echo(f'{len(problems)} de {total} consultas no usan índice')
+            raise SystemExit(1)
+        click.echo(f'✅ Las {total} consultas usan índices')
+
+    @app.cli.command('cleanup-reports')
+    @click.option('--dry-run', is_flag=True, help='Muestra lo que se eliminaría sin borrar nada')
+    @click.option('--max-mb', type=float, default=None, help='Límite de tamaño en MB (por defecto REPORT_STORE_MAX_BYTES)')
+    @click.option('--max-age-hours', type=float, default=None, help='Edad máxima sin uso (por defecto REPORT_STORE_MAX_AGE_HOURS)')
+    def cleanup_reports(dry_run, max_mb, max_age_hours):
+        """Aplica los límites del almacén de reportes y borra los reportes sueltos en UPLOAD_FOLDER"""
+        from app.report_store import ReportArtifactStore, remove_legacy_reports
+
+        store = ReportArtifactStore.from_config(app.config)
+        if max_mb is not None:
+            store.max_bytes = int(max_mb * 1024 * 1024)
+        if max_age_hours is not None:
+            store.max_age_seconds = max_age_hours * 3600
+
+        result = store.evict(dry_run=dry_run)
+        legacy, legacy_bytes = remove_legacy_reports(app.config['UPLOAD_FOLDER'], dry_run=dry_run)
+
+        if dry_run:
+            click.echo('🔎 Modo simulación: no se eliminó nada')
+            for path in result['paths']:
+                click.echo(f'   • {path}')
+        click.echo(f"   Reportes {'a eliminar' if dry_run else 'eliminados'}: {result['removed']} "
+                   f"({result['freed_bytes'] / 1024 / 1024:.1f} MB)")
+        click.echo(f"   Reportes conservados: {result['kept']} ({result['kept_bytes'] / 1024 / 1024:.1f} MB)")
+        click.echo(f"   Reportes antiguos en UPLOAD_FOLDER: {legacy} ({legacy_bytes / 1024 / 1024:.1f} MB)")
+
+    @app.cli.command('import-data')
+    @click.argument('entity_type', type=click.Choice(['certifications', 'audits']))
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--user', 'username', default=None, help='Usuario que importa y responsable por defecto (por defecto el primer administrador)')
+    @click.option('--dry-run', is_flag=True, help='Solo valida el archivo, sin insertar')
+    def import_data(entity_type, path, username, dry_run):
+        """Importa certificaciones o auditorías desde un archivo .xlsx o .csv"""
+        from app.models import User, UserRole
+        from app.bulk_import import import_records
+
+        query = User.query.filter_by(is_active=True)
+        user = query.filter_by(username=username).first() if username else \
+            query.filter_by(role=UserRole.ADMINISTRADOR.value).first()
+        if user is None:
+            raise click.ClickException('No se encontró un usuario activo para la importación')
+
+        with open(path, 'rb') as stream:
+            try:
+                result = import_records(entity_type, stream, path, user.id, dry_run=dry_run)
+            except ValueError as e:
+                raise click.ClickException(str(e))
+
+        for row, message in result.errors:
+            click.echo(f'❌ Fila {row}: {message}')
+        if dry_run:
+            click.echo('🔎 Modo simulación: no se insertó nada')
+            click.echo(f'   Filas válidas: {result.total - result.failed} de {result.total}')
+        else:
+            click.echo(f'✅ Filas importadas: {result.inserted} de {result.total}')
+        click.echo(f'   Con errores: {result.failed}')
+        click.echo(f'   Tiempo: {result.elapsed:.2f} s ({result.rows_per_second} filas/s, {result.batches} lotes)')
+
+    @app.cli.command('gc-documents')
+    @click.option('--dry-run', is_flag=True, help='Muestra lo que se haría sin mover ni borrar nada')
+    @click.option('--skip-legacy', is_flag=True, help='No mover al almacén los documentos guardados con nombre por fecha')
+    def gc_documents(dry_run, skip_legacy):
+        """Elimina los documentos sin referencias y mueve al almacén por contenido los anteriores"""
+        from app.document_store import adopt_legacy_documents, recount_references, collect_garbage
+
+        if not skip_legacy:
+            legacy = adopt_legacy_documents(dry_run=dry_run)
+            click.echo(f"   Documentos anteriores {'a mover' if dry_run else 'movidos'} al almacén: {legacy['adopted']}"
+                       f" (faltantes: {legacy['missing']})")
+        if not dry_run:
+            click.echo(f'   Referencias corregidas: {recount_references()}')
+
+        stats = collect_garbage(dry_run=dry_run)
+        if dry_run:
+            click.echo('🔎 Modo simulación: no se eliminó nada')
+        click.echo(f"   Documentos sin referencias {'a eliminar' if dry_run else 'eliminados'}: {stats['blobs']}")
+        click.echo(f"   Archivos huérfanos: {stats['orphans']}")
+        click.echo(f"   Espacio liberado: {stats['freed_bytes'] / 1024 / 1024:.1f} MB")
+        click.echo(f"   Documentos conservados: {stats['kept']} ({stats['kept_bytes'] / 1024 / 1024:.1f} MB)")
@@ -0,0 +1,154 @@
+"""
+Resumen del dashboard con caché
+
+Calcula todos los contadores del panel principal (certificaciones, auditorías
+y políticas) en una sola consulta agrupada y guarda el resultado en memoria
+durante DASHBOARD_CACHE_TTL segundos.
+
+La caché se invalida automáticamente cuando se confirma (commit) una escritura
+(insert, update o delete vía ORM) de una certificación, auditoría o política.
+Cada invalidación incrementa una generación: un resumen calculado antes de la
+invalidación no se guarda, aunque termine después.
+"""
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event, literal, union_all
+from sqlalchemy.orm import Session
+
+
+# Caché del proceso: {'expires': float, 'data': dict}
+_summary_cache = {}
+_cache_lock = threading.Lock()
+# Se incrementa en cada invalidación
+_generation = 0
+
+# Marca de la sesión: escribió entidades del dashboard y aún no hizo commit
+PENDING_INVALIDATION_KEY = 'dashboard_dirty'
+
+
+def empty_dashboard_summary():
+    """Resumen con todos los contadores en cero"""
+    return {
+        'total_certifications': 0,
+        'vigent_certifications': 0,
+        'expiring_certifications': 0,
+        'expired_certifications': 0,
+        'total_audits': 0,
+        'completed_audits': 0,
+        'scheduled_audits': 0,
+        'total_policies': 0,
+        'certification_percentage': 0,
+        'audit_percentage': 0
+    }
+
+
+def compute_dashboard_summary():
+    """
+    Calcula los contadores del dashboard en una sola consulta (UNION ALL de GROUP BY)
+
+    Returns:
+        dict: Contadores y porcentajes del panel principal
+    """
+    from app.models import db, Certification, Audit, Policy, CertificationStatus
+
+    # El estado de las certificaciones se deriva de expiration_date en SQL
+    cert_status = Certification.current_status
+    cert_counts = db.select(
+        literal('certification').label('entity'),
+        cert_status.label('status'),
+        db.func.count(Certification.id).label('total')
+    ).group_by(cert_status)
+
+    audit_counts = db.select(
+        literal('audit').label('entity'),
+        Audit.status.label('status'),
+        db.func.count(Audit.id).label('total')
+    ).group_by(Audit.status)
+
+    policy_counts = db.select(
+        literal('policy').label('entity'),
+        literal('activa').label('status'),
+        db.func.count(Policy.id).label('total')
+    ).where(Policy.is_active == True)
+
+    rows = db.session.execute(union_all(cert_counts, audit_counts, policy_counts)).all()
+
+    counts = {'certification': {}, 'audit': {}, 'policy': {}}
+    for entity, status, total in rows:
+        counts[entity][status] = total
+
+    summary = empty_dashboard_summary()
+    summary['total_certifications'] = sum(counts['certification'].values())
+    summary['vigent_certifications'] = counts['certification'].get(CertificationStatus.VIGENTE.value, 0)
+    summary['expiring_certifications'] = counts['certification'].get(CertificationStatus.PROXIMA_VENCER.value, 0)
+    summary['expired_certifications'] = counts['certification'].get(CertificationStatus.VENCIDA.value, 0)
+    summary['total_audits'] = sum(counts['audit'].values())
+    summary['completed_audits'] = counts['audit'].get('completada', 0)
+    summary['scheduled_audits'] = counts['audit'].get('programada', 0)
+    summary['total_policies'] = counts['policy'].get('activa', 0)
+
+    if summary['total_certifications'] > 0:
+        summary['certification_percentage'] = int(summary['vigent_certifications'] / summary['total_certifications'] * 100)
+    if summary['total_audits'] > 0:
+        summary['audit_percentage'] = int(summary['completed_audits'] / summary['total_audits'] * 100)
+
+    return summary
+
+
+def get_dashboard_summary():
+    """
+    Obtiene el resumen del dashboard desde la caché o lo recalcula si expiró
+
+    Returns:
+        dict: Copia del resumen (ver compute_dashboard_summary)
+    """
+    ttl = current_app.config.get('DASHBOARD_CACHE_TTL', 0)
+    now = time.monotonic()
+
+    with _cache_lock:
+        cached = _summary_cache.get('data')
+        expires = _summary_cache.get('expires', 0)
+        generation = _generation
+
+    if cached is None or expires <= now:
+        cached = compute_dashboard_summary()
+        if ttl > 0:
+            with _cache_lock:
+                # Si hubo una invalidación mientras se calculaba, el resultado puede ser anterior a ella
+                if generation == _generation:
+                    _summary_cache['data'] = cached
+                    _summary_cache['expires'] = now + ttl
+
+    return dict(cached)
+
+
+def invalidate_dashboard_summary():
+    """Descarta el resumen en caché; se recalcula en la siguiente petición"""
+    global _generation
+    with _cache_lock:
+        _summary_cache.clear()
+        _generation += 1
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_dirty_on_write(session, flush_context):
+    """Marca la sesión si se escribió alguna entidad que aparece en el dashboard"""
+    from app.models import Certification, Audit, Policy
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Certification, Audit, Policy)):
+            session.info[PENDING_INVALIDATION_KEY] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    """Invalida el resumen cuando los cambios ya son visibles para otras conexiones"""
+    if session.info.pop(PENDING_INVALIDATION_KEY, False):
+        invalidate_dashboard_summary()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_dirty_flag(session):
+    session.info.pop(PENDING_INVALIDATION_KEY, None)
@@ -0,0 +1,266 @@
+"""
+Exportación de datos en CSV y NDJSON
+
+Para integraciones (BI, hojas de cálculo) cada entidad se puede descargar
+completa, con los mismos filtros que su listado:
+
+    GET /reports/data/<entidad>/<formato>?<filtros>
+
+    entidad:  certifications, audits, findings, policy_confirmations, audit_logs
+    formato:  csv, ndjson (un objeto JSON por línea)
+
+Las filas nunca se cargan todas juntas:
+
+    • Se seleccionan columnas (no objetos del ORM) con yield_per, que abre un
+      cursor del lado del servidor y trae EXPORT_BATCH filas por viaje
+    • Cada lote se convierte en texto y se envía como un fragmento de la
+      respuesta (transferencia chunked, sin Content-Length)
+
+La memoria del worker no depende del tamaño de la tabla.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+
+# Filas leídas por cada viaje a la base de datos (y por fragmento de la respuesta)
+EXPORT_BATCH = 1000
+
+# formato → mimetype (Flask agrega charset=utf-8 a text/csv; NDJSON es UTF-8 por definición)
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+
+def _parse_bool(value):
+    if value in (None, '', 'all'):
+        return None
+    return value.lower() in ('true', '1', 'yes')
+
+
+def _certifications(args):
+    """Filtros de /certifications: status (estado calculado) y responsable"""
+    from app.models import db, User, Certification
+
+    stmt = db.select(
+        Certification.id,
+        Certification.name,
+        Certification.norm,
+        Certification.issuing_entity,
+        Certification.emission_date,
+        Certification.expiration_date,
+        Certification.current_status.label('status'),
+        Certification.responsible_id,
+        User.full_name.label('responsible'),
+        Certification.notes,
+        Certification.created_at,
+        Certification.updated_at
+    ).join(User, User.id == Certification.responsible_id)
+
+    status = args.get('status', 'all')
+    if status != 'all':
+        stmt = stmt.where(Certification.status_filter(status))
+    if args.get('responsible_id', type=int):
+        stmt = stmt.where(Certification.responsible_id == args.get('responsible_id', type=int))
+
+    return stmt.order_by(Certification.expiration_date, Certification.id)
+
+
+def _audits(args):
+    """Filtros de /audits: status y type"""
+    from app.models import db, User, Audit
+
+    stmt = db.select(
+        Audit.id,
+        Audit.audit_type,
+        Audit.evaluated_area,
+        Audit.scheduled_date,
+        Audit.executed_date,
+        Audit.status,
+        Audit.responsible_id,
+        User.full_name.label('responsible'),
+        Audit.description,
+        Audit.created_at,
+        Audit.updated_at
+    ).join(User, User.id == Audit.responsible_id)
+
+    status = args.get('status', 'all')
+    audit_type = args.get('type', 'all')
+    if status != 'all':
+        stmt = stmt.where(Audit.status == status)
+    if audit_type != 'all':
+        stmt = stmt.where(Audit.audit_type == audit_type)
+
+    return stmt.order_by(Audit.scheduled_date.desc(), Audit.id.desc())
+
+
+def _findings(args):
+    """Filtros de la vista de auditoría: audit_id, severity y status"""
+    from app.models import db, Audit, AuditFinding
+
+    stmt = db.select(
+        AuditFinding.id,
+        AuditFinding.audit_id,
+        Audit.evaluated_area.label('audit_area'),
+        AuditFinding.description,
+        AuditFinding.severity,
+        AuditFinding.status,
+        AuditFinding.corrective_action,
+        AuditFinding.responsible,
+        AuditFinding.deadline,
+        AuditFinding.notes,
+        AuditFinding.created_at,
+        AuditFinding.updated_at
+    ).join(Audit, Audit.id == AuditFinding.audit_id)
+
+    if args.get('audit_id', type=int):
+        stmt = stmt.where(AuditFinding.audit_id == args.get('audit_id', type=int))
+    for column in ('severity', 'status'):
+        value = args.get(column, 'all')
+        if value != 'all':
+            stmt = stmt.where(getattr(AuditFinding, column) == value)
+
+    return stmt.order_by(AuditFinding.audit_id, AuditFinding.id)
+
+
+def _policy_confirmations(args):
+    """Filtros del reporte de políticas: policy_id, confirmed y department"""
+    from app.models import db, User, Policy, PolicyConfirmation
+
+    stmt = db.select(
+        PolicyConfirmation.id,
+        PolicyConfirmation.policy_id,
+        Policy.title.label('policy'),
+        Policy.version.label('policy_version'),
+        PolicyConfirmation.user_id,
+        User.full_name.label('user'),
+        User.department,
+        PolicyConfirmation.confirmed,
+        PolicyConfirmation.confirmed_date,
+        PolicyConfirmation.ip_address,
+        PolicyConfirmation.created_at
+    ).join(Policy, Policy.id == PolicyConfirmation.policy_id).join(User, User.id == PolicyConfirmation.user_id)
+
+    if args.get('policy_id', type=int):
+        stmt = stmt.where(PolicyConfirmation.policy_id == args.get('policy_id', type=int))
+    confirmed = _parse_bool(args.get('confirmed'))
+    if confirmed is not None:
+        stmt = stmt.where(PolicyConfirmation.confirmed == confirmed)
+    if args.get('department'):
+        stmt = stmt.where(User.department == args.get('department'))
+
+    return stmt.order_by(PolicyConfirmation.policy_id, PolicyConfirmation.id)
+
+
+def _audit_logs(args):
+    """Filtros de /admin/audit-log: user_id, action, entity_type, date_from y date_to"""
+    from app.models import db, User, AuditLog
+    from app.audit_log import filter_audit_log
+
+    stmt = db.select(
+        AuditLog.id,
+        AuditLog.created_at,
+        AuditLog.user_id,
+        User.username,
+        AuditLog.action,
+        AuditLog.entity_type,
+        AuditLog.entity_id,
+        AuditLog.changes,
+        AuditLog.ip_address
+    ).outerjoin(User, User.id == AuditLog.user_id)
+
+    stmt = filter_audit_log(
+        stmt,
+        user_id=args.get('user_id', type=int),
+        action=args.get('action', type=str),
+        entity_type=args.get('entity_type', type=str),
+        date_from=_parse_date(args.get('date_from')),
+        date_to=_parse_date(args.get('date_to'))
+    )
+    # Mismo orden que el visor: recorre los índices (created_at, id)
+    return stmt.order_by(AuditLog.created_at.desc(), AuditLog.id.desc())
+
+
+# entidad → (consulta con los filtros, solo administrador)
+EXPORT_ENTITIES = {
+    'certifications': (_certifications, False),
+    'audits': (_audits, False),
+    'findings': (_findings, False),
+    'policy_confirmations': (_policy_confirmations, False),
+    'audit_logs': (_audit_logs, True),
+}
+
+
+def build_export_query(entity, args):
+    """
+    Consulta de una entidad con los filtros de la petición
+
+    Args:
+        entity (str): Clave de EXPORT_ENTITIES
+        args: request.args (MultiDict)
+
+    Returns:
+        Select
+    """
+    if entity not in EXPORT_ENTITIES:
+        raise ValueError(f'Entidad no válida: {entity}')
+    return EXPORT_ENTITIES[entity][0](args)
+
+
+def _json_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return '' if value is None else value
+
+
+def stream_export(stmt, format, batch_size=EXPORT_BATCH):
+    """
+    Ejecuta la consulta con un cursor del servidor y genera el archivo por fragmentos
+
+    Cada fragmento contiene un lote de batch_size filas; el CSV empieza con la
+    fila de encabezados.
+
+    Yields:
+        str
+    """
+    from app.models import db
+
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f'Formato no válido: {format}')
+
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    try:
+        columns = list(result.keys())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        if format == 'csv':
+            writer.writerow(columns)
+            yield buffer.getvalue()
+
+        for rows in result.partitions():
+            buffer.seek(0)
+            buffer.truncate()
+            if format == 'csv':
+                writer.writerows([_csv_value(value) for value in row] for row in rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(dict(zip(columns, row)), default=_json_value, ensure_ascii=False))
+                    buffer.write('\n')
+            yield buffer.getvalue()
+    finally:
+        result.close()
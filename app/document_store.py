@@ -0,0 +1,245 @@
+"""
+Almacén de documentos por contenido
+
+Los documentos de las certificaciones se guardan una sola vez por contenido:
+
+    1. store_document() copia la subida a un temporal de DOCUMENT_STORE_FOLDER
+       calculando el SHA-256 mientras escribe (el archivo no se vuelve a leer)
+    2. El temporal se renombra a <aa>/<sha256>.<ext>; si ese contenido ya
+       estaba guardado, con cualquier extensión, se descarta la copia y se usa
+       el archivo existente
+    3. Certification.set_document() suma una referencia al DocumentBlob del
+       hash y resta una al documento que reemplaza, en la misma transacción.
+       La certificación apunta siempre a la ruta guardada en el blob
+
+Los archivos no se borran al perder su última referencia (otra petición podría
+estar subiendo el mismo contenido). El recolector los elimina después de
+DOCUMENT_GC_GRACE_HOURS:
+
+    flask --app app gc-documents [--dry-run]
+
+El recolector también recalcula ref_count desde certifications, borra los
+archivos del almacén sin fila (subidas interrumpidas) y mueve al almacén los
+documentos anteriores, guardados con nombre por fecha en UPLOAD_FOLDER.
+"""
+import hashlib
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from werkzeug.utils import secure_filename
+
+COPY_CHUNK = 1024 * 1024
+
+
+def document_folder(config=None):
+    """DOCUMENT_STORE_FOLDER o, si está vacío, UPLOAD_FOLDER/documents"""
+    config = config or current_app.config
+    return config.get('DOCUMENT_STORE_FOLDER') or os.path.join(config['UPLOAD_FOLDER'], 'documents')
+
+
+def blob_path(folder, sha256, extension):
+    """Ruta de un contenido: dos caracteres del hash como subcarpeta para no llenar un solo directorio"""
+    name = f'{sha256}.{extension}' if extension else sha256
+    return os.path.join(folder, sha256[:2], name)
+
+
+def find_blob_file(folder, sha256):
+    """Archivo ya guardado con ese contenido (la extensión es la de la primera subida) o None"""
+    directory = os.path.join(folder, sha256[:2])
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return None
+    for name in sorted(names):
+        if name == sha256 or name.startswith(sha256 + '.'):
+            return os.path.join(directory, name)
+    return None
+
+
+def _extension(filename):
+    filename = secure_filename(filename or '')
+    return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+
+
+def store_stream(source, extension, folder=None):
+    """
+    Guarda el contenido de source (file-like) en el almacén
+
+    Returns:
+        tuple: (ruta, sha256, tamaño)
+    """
+    folder = folder or document_folder()
+    os.makedirs(folder, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    descriptor, temp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+
+    try:
+        with os.fdopen(descriptor, 'wb') as target:
+            for chunk in iter(lambda: source.read(COPY_CHUNK), b''):
+                digest.update(chunk)
+                target.write(chunk)
+                size += len(chunk)
+
+        sha256 = digest.hexdigest()
+        path = find_blob_file(folder, sha256)
+        if path is not None:
+            # Ya guardado: la fecha de modificación renovada lo protege del recolector
+            os.remove(temp_path)
+            os.utime(path, None)
+        else:
+            path = blob_path(folder, sha256, extension)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+        return path, sha256, size
+
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def store_document(file):
+    """
+    Guarda un archivo subido (FileStorage) en el almacén
+
+    Returns:
+        tuple: (ruta, sha256, tamaño) o None si no se envió archivo
+
+    Raises:
+        ValueError: Si la extensión no está en ALLOWED_EXTENSIONS
+    """
+    from app.utils import allowed_file
+
+    if not file or file.filename == '':
+        return None
+    if not allowed_file(file.filename):
+        raise ValueError('Tipo de archivo no permitido')
+    return store_stream(file.stream, _extension(file.filename))
+
+
+def recount_references():
+    """
+    Recalcula ref_count de todos los blobs desde certifications en un solo UPDATE
+
+    Returns:
+        int: Blobs actualizados
+    """
+    from app.models import db, Certification, DocumentBlob
+
+    references = db.select(db.func.count(Certification.id)).where(
+        Certification.document_hash == DocumentBlob.sha256
+    ).scalar_subquery()
+    result = db.session.execute(
+        db.update(DocumentBlob).where(DocumentBlob.ref_count != references).values(ref_count=references)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def adopt_legacy_documents(dry_run=False):
+    """
+    Mueve al almacén los documentos guardados fuera de él (save_upload_file)
+
+    Cada archivo se guarda por contenido, la certificación pasa a apuntar al
+    blob y el archivo anterior se elimina.
+
+    Returns:
+        dict: {'adopted', 'missing'}
+    """
+    from app.models import db, Certification
+
+    folder = document_folder()
+    stats = {'adopted': 0, 'missing': 0}
+    certifications = Certification.query.filter(Certification.document_path.isnot(None)).all()
+
+    for certification in certifications:
+        legacy_path = certification.document_path
+        if os.path.dirname(os.path.dirname(os.path.abspath(legacy_path))) == os.path.abspath(folder):
+            continue
+        if not os.path.exists(legacy_path):
+            stats['missing'] += 1
+            continue
+
+        stats['adopted'] += 1
+        if dry_run:
+            continue
+
+        with open(legacy_path, 'rb') as source:
+            path, sha256, size = store_stream(source, _extension(legacy_path), folder)
+        # El documento anterior no tenía blob: se cuenta solo la referencia nueva
+        certification.document_hash = None
+        certification.set_document(path, sha256, size)
+        db.session.commit()
+        os.remove(legacy_path)
+
+    return stats
+
+
+def collect_garbage(dry_run=False, now=None):
+    """
+    Elimina los blobs sin referencias y los archivos del almacén que no usa ningún blob ni certificación
+
+    Solo se eliminan si no se usaron en las últimas DOCUMENT_GC_GRACE_HOURS.
+    La fila se borra antes que el archivo, con la condición ref_count = 0: si
+    otra petición acaba de volver a usarlo, no se borra nada.
+
+    Returns:
+        dict: {'blobs', 'orphans', 'freed_bytes', 'kept', 'kept_bytes'}
+    """
+    from app.models import db, Certification, DocumentBlob
+
+    now = now or time.time()
+    grace = current_app.config.get('DOCUMENT_GC_GRACE_HOURS', 24) * 3600
+    cutoff = datetime.fromtimestamp(now) - timedelta(seconds=grace)
+    folder = document_folder()
+    stats = {'blobs': 0, 'orphans': 0, 'freed_bytes': 0}
+
+    def remove_file(path):
+        try:
+            # Un archivo tocado recién (store_stream) vuelve a estar en uso
+            if now - os.path.getmtime(path) <= grace:
+                return False
+            size = os.path.getsize(path)
+            if not dry_run:
+                os.remove(path)
+            stats['freed_bytes'] += size
+            return True
+        except OSError:
+            return False
+
+    # 1. Blobs sin referencias
+    unreferenced = db.session.execute(
+        db.select(DocumentBlob.id, DocumentBlob.path)
+        .where(DocumentBlob.ref_count == 0, DocumentBlob.updated_at < cutoff)
+    ).all()
+    for blob_id, path in unreferenced:
+        if not dry_run:
+            deleted = db.session.execute(
+                db.delete(DocumentBlob).where(DocumentBlob.id == blob_id, DocumentBlob.ref_count == 0)
+            ).rowcount
+            db.session.commit()
+            if not deleted:
+                continue
+        stats['blobs'] += 1
+        remove_file(path)
+
+    # 2. Archivos del almacén sin fila (subida cuyo commit falló) y temporales abandonados.
+    #    Se conservan también los que usa alguna certificación aunque su blob apunte a otro archivo
+    known = {os.path.abspath(path) for (path,) in db.session.execute(
+        db.select(DocumentBlob.path).union(
+            db.select(Certification.document_path).where(Certification.document_path.isnot(None))
+        )
+    )}
+    for root, _, files in os.walk(folder):
+        for name in files:
+            path = os.path.abspath(os.path.join(root, name))
+            if path not in known and remove_file(path):
+                stats['orphans'] += 1
+
+    stats['kept'], stats['kept_bytes'] = db.session.execute(
+        db.select(db.func.count(DocumentBlob.id), db.func.coalesce(db.func.sum(DocumentBlob.size), 0))
+    ).one()
+    return stats
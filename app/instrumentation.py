@@ -0,0 +1,195 @@
+"""
+Instrumentación de consultas SQL por petición
+
+Escucha los eventos del engine de SQLAlchemy y registra, para cada petición,
+cuántas sentencias se ejecutaron, el tiempo total en base de datos y las
+sentencias más lentas.
+
+Cómo se exponen los datos:
+    • Desarrollo (DEBUG): cabeceras X-SQL-Queries, X-SQL-Time-ms y Server-Timing
+    • Producción (sin DEBUG ni TESTING): una línea JSON por petición en el logger de la aplicación
+    • Siempre: página /admin/sql-stats con el historial reciente y las consultas lentas
+
+Configuración (config.py / .env):
+    SQL_INSTRUMENTATION   → activa o desactiva todo el módulo
+    SQL_SLOW_QUERY_MS     → umbral para considerar lenta una sentencia
+    SQL_STATS_HISTORY     → peticiones y consultas lentas que se conservan en memoria
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+from flask import g, request, has_request_context
+
+# Sentencias más lentas que se guardan por petición
+SLOWEST_PER_REQUEST = 5
+# Largo máximo del SQL guardado (no se guardan parámetros)
+STATEMENT_MAX_LENGTH = 500
+
+
+class SQLInstrumentation:
+    """Registro de consultas por petición para una aplicación"""
+
+    def __init__(self, app=None):
+        self.history = deque()
+        self.slow_queries = deque()
+        self.lock = threading.Lock()
+        self.slow_query_ms = 200
+        self.send_headers = False
+        self.log_requests = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Conecta los eventos del engine y los hooks de la petición"""
+        from sqlalchemy import event
+        from app.models import db
+
+        self.slow_query_ms = app.config.get('SQL_SLOW_QUERY_MS', 200)
+        history_size = app.config.get('SQL_STATS_HISTORY', 200)
+        self.history = deque(maxlen=history_size)
+        self.slow_queries = deque(maxlen=history_size)
+        self.send_headers = app.debug
+        self.log_requests = not app.debug and not app.testing
+
+        if self.log_requests and app.logger.level == logging.NOTSET:
+            app.logger.setLevel(logging.INFO)
+        self.logger = app.logger
+
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_execute)
+            event.listen(engine, 'handle_error', self._on_error)
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.extensions['sql_instrumentation'] = self
+
+    # ---------- Eventos del engine ----------
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['_query_started'].pop()
+        duration = (time.perf_counter() - started) * 1000
+
+        stats = g.get('_sql_stats') if has_request_context() else None
+        if stats is not None:
+            stats['count'] += 1
+            stats['total_ms'] += duration
+            slowest = stats['slowest']
+            if len(slowest) < SLOWEST_PER_REQUEST or duration > slowest[-1]['ms']:
+                slowest.append({'ms': round(duration, 2), 'statement': statement[:STATEMENT_MAX_LENGTH]})
+                slowest.sort(key=lambda item: item['ms'], reverse=True)
+                del slowest[SLOWEST_PER_REQUEST:]
+
+        if duration >= self.slow_query_ms:
+            entry = {
+                'at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'ms': round(duration, 2),
+                'path': request.path if has_request_context() else None,
+                'statement': statement[:STATEMENT_MAX_LENGTH]
+            }
+            with self.lock:
+                self.slow_queries.appendleft(entry)
+            self.logger.warning('Consulta lenta (%.1f ms): %s', duration, entry['statement'])
+
+    def _on_error(self, exception_context):
+        # La sentencia falló: after_cursor_execute no se llama, descartar su inicio
+        conn = exception_context.connection
+        if conn is not None and conn.info.get('_query_started'):
+            conn.info['_query_started'].pop()
+
+    # ---------- Hooks de la petición ----------
+
+    def _start_request(self):
+        g._sql_stats = {'count': 0, 'total_ms': 0.0, 'slowest': [], 'started': time.perf_counter()}
+
+    def _finish_request(self, response):
+        stats = g.pop('_sql_stats', None)
+        if stats is None or request.endpoint == 'static':
+            return response
+
+        summary = {
+            'at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'queries': stats['count'],
+            'db_ms': round(stats['total_ms'], 2),
+            'request_ms': round((time.perf_counter() - stats['started']) * 1000, 2),
+            'slowest': stats['slowest']
+        }
+        with self.lock:
+            self.history.appendleft(summary)
+
+        if self.send_headers:
+            response.headers['X-SQL-Queries'] = str(summary['queries'])
+            response.headers['X-SQL-Time-ms'] = f"{summary['db_ms']:.2f}"
+            response.headers['Server-Timing'] = (
+                f'db;dur={summary["db_ms"]:.2f};desc="{summary["queries"]} consultas", '
+                f'app;dur={summary["request_ms"]:.2f}'
+            )
+
+        if self.log_requests:
+            self.logger.info(json.dumps({key: value for key, value in summary.items() if key != 'slowest'}))
+
+        return response
+
+    # ---------- Consulta de estadísticas ----------
+
+    def snapshot(self):
+        """
+        Copia del historial para la página de administración
+
+        Returns:
+            dict: {'requests': [...], 'slow_queries': [...], 'endpoints': [...]}
+                  endpoints agrupa por endpoint, ordenado por consultas promedio
+        """
+        with self.lock:
+            history = list(self.history)
+            slow_queries = list(self.slow_queries)
+
+        endpoints = {}
+        for item in history:
+            entry = endpoints.setdefault(item['endpoint'] or item['path'], {
+                'endpoint': item['endpoint'] or item['path'],
+                'requests': 0,
+                'queries': 0,
+                'max_queries': 0,
+                'db_ms': 0.0,
+                'max_db_ms': 0.0
+            })
+            entry['requests'] += 1
+            entry['queries'] += item['queries']
+            entry['max_queries'] = max(entry['max_queries'], item['queries'])
+            entry['db_ms'] += item['db_ms']
+            entry['max_db_ms'] = max(entry['max_db_ms'], item['db_ms'])
+
+        for entry in endpoints.values():
+            entry['avg_queries'] = round(entry['queries'] / entry['requests'], 1)
+            entry['avg_db_ms'] = round(entry['db_ms'] / entry['requests'], 2)
+
+        return {
+            'requests': history,
+            'slow_queries': slow_queries,
+            'endpoints': sorted(endpoints.values(), key=lambda entry: entry['avg_queries'], reverse=True)
+        }
+
+    def reset(self):
+        """Vacía el historial"""
+        with self.lock:
+            self.history.clear()
+            self.slow_queries.clear()
+
+
+def init_instrumentation(app):
+    """Activa la instrumentación si SQL_INSTRUMENTATION está habilitado"""
+    if app.config.get('SQL_INSTRUMENTATION'):
+        return SQLInstrumentation(app)
+    return None
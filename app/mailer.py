@@ -0,0 +1,358 @@
+"""
+Outbox de correos con pool de workers
+
+Los correos no se envían dentro de la petición: enqueue_email() los guarda en
+la tabla email_outbox y retorna de inmediato. Un pool de hilos vacía la cola
+reutilizando unas pocas conexiones SMTP de larga duración, con reintentos
+con backoff exponencial y límite de envíos por segundo.
+
+Formas de ejecutar el worker:
+    • flask --app app outbox-worker   → proceso dedicado (servidor propio)
+    • flask --app app outbox-drain    → vacía la cola una vez (cron / serverless)
+    • MAIL_OUTBOX_AUTOSTART=true      → pool dentro del proceso web
+
+Para probar localmente sin un servidor real:
+    python -m aiosmtpd -n -l localhost:1025
+    MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_USE_TLS=false
+"""
+import smtplib
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+
+# Pool iniciado dentro del proceso (si MAIL_OUTBOX_AUTOSTART está activo)
+_pool = None
+
+
+def build_email_message(sender, recipient_email, subject, body, html_body=None):
+    """Construye el mensaje MIME (texto plano + HTML opcional)"""
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = sender
+    msg['To'] = recipient_email
+
+    # Agregar versión texto
+    msg.attach(MIMEText(body, 'plain'))
+
+    # Agregar versión HTML si existe
+    if html_body:
+        msg.attach(MIMEText(html_body, 'html'))
+
+    return msg
+
+
+def enqueue_email(recipient_email, subject, body, html_body=None, alert_id=None, commit=True):
+    """
+    Guarda un correo en el outbox para que lo envíe el worker
+
+    Args:
+        recipient_email: Destinatario
+        subject: Asunto
+        body: Cuerpo en texto plano
+        html_body: Cuerpo HTML (opcional)
+        alert_id: Alerta relacionada; se marca como enviada al entregar el correo
+        commit: Si es False el correo se agrega a la transacción del llamador
+
+    Returns:
+        EmailOutbox: Registro creado
+    """
+    from app.models import db, EmailOutbox
+
+    entry = EmailOutbox(
+        recipient_email=recipient_email,
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        alert_id=alert_id
+    )
+    db.session.add(entry)
+
+    if commit:
+        db.session.commit()
+        wake_outbox_worker()
+
+    return entry
+
+
+def wake_outbox_worker():
+    """Despierta al pool del proceso (si existe) para que procese la cola"""
+    if _pool is not None:
+        _pool.wake()
+
+
+class SMTPConnection:
+    """Conexión SMTP reutilizable: se abre una vez y se reconecta si el servidor la cierra"""
+
+    def __init__(self, config):
+        self.server = config['MAIL_SERVER']
+        self.port = config['MAIL_PORT']
+        self.use_tls = config['MAIL_USE_TLS']
+        self.username = config.get('MAIL_USERNAME')
+        self.password = config.get('MAIL_PASSWORD')
+        self.timeout = config.get('MAIL_TIMEOUT', 30)
+        self._smtp = None
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        if self.use_tls:
+            smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password)
+        self._smtp = smtp
+
+    def send(self, message):
+        """Envía un mensaje; si la conexión se había cerrado, reconecta una vez"""
+        if self._smtp is None:
+            self._connect()
+
+        try:
+            self._smtp.send_message(message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            self.close()
+            self._connect()
+            self._smtp.send_message(message)
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+
+class RateLimiter:
+    """Token bucket compartido por todos los workers (envíos por segundo)"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class OutboxWorkerPool:
+    """Pool de hilos que vacía el outbox usando una conexión SMTP por hilo"""
+
+    def __init__(self, app, workers=None):
+        self.app = app
+        self.workers = workers or app.config.get('MAIL_WORKERS', 2)
+        self.batch_size = app.config.get('MAIL_BATCH_SIZE', 20)
+        self.poll_interval = app.config.get('MAIL_POLL_SECONDS', 10)
+        self.max_attempts = app.config.get('MAIL_MAX_ATTEMPTS', 5)
+        self.retry_base = app.config.get('MAIL_RETRY_BASE_SECONDS', 30)
+        self.lock_timeout = timedelta(seconds=app.config.get('MAIL_LOCK_TIMEOUT_SECONDS', 600))
+        self.rate_limiter = RateLimiter(app.config.get('MAIL_RATE_LIMIT', 0))
+
+        self._claim_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    # ---------- Ciclo de vida ----------
+
+    def start(self):
+        """Inicia los hilos del pool"""
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'outbox-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=30):
+        """Detiene el pool; cada hilo termina el lote en curso antes de salir"""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self):
+        self._wake.set()
+
+    def drain(self):
+        """
+        Vacía la cola en el hilo actual (para cron, CLI y pruebas)
+
+        Returns:
+            dict: {'sent': int, 'failed': int}
+        """
+        stats = {'sent': 0, 'failed': 0}
+        connection = SMTPConnection(self.app.config)
+        try:
+            with self.app.app_context():
+                while True:
+                    batch = self._claim_batch()
+                    if not batch:
+                        break
+                    sent, failed = self._process_batch(connection, batch)
+                    stats['sent'] += sent
+                    stats['failed'] += failed
+        finally:
+            connection.close()
+        return stats
+
+    def _run(self):
+        connection = SMTPConnection(self.app.config)
+        try:
+            with self.app.app_context():
+                while not self._stop.is_set():
+                    try:
+                        batch = self._claim_batch()
+                    except Exception as e:
+                        print(f"Error leyendo el outbox: {e}")
+                        batch = []
+
+                    if not batch:
+                        # Cola vacía: liberar la conexión y esperar trabajo
+                        connection.close()
+                        self._wake.wait(self.poll_interval)
+                        self._wake.clear()
+                        continue
+
+                    self._process_batch(connection, batch)
+        finally:
+            connection.close()
+
+    # ---------- Acceso a la cola ----------
+
+    def _claim_batch(self):
+        """Reserva un lote de correos pendientes marcándolos como 'enviando'"""
+        from app.models import db, EmailOutbox
+
+        current = datetime.now()
+        # Identifica las filas de esta reserva: sin FOR UPDATE SKIP LOCKED (SQLite,
+        # MySQL < 8) otro proceso puede reservar en el mismo instante
+        token = uuid.uuid4().hex
+        claimable = db.or_(
+            db.and_(EmailOutbox.status == 'pendiente', EmailOutbox.next_attempt_at <= current),
+            # Reservas de workers que murieron a mitad de un lote
+            db.and_(EmailOutbox.status == 'enviando', EmailOutbox.locked_at < current - self.lock_timeout)
+        )
+
+        with self._claim_lock:
+            try:
+                ids = db.session.execute(
+                    db.select(EmailOutbox.id).where(claimable)
+                    .order_by(EmailOutbox.id).limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                ).scalars().all()
+                if not ids:
+                    db.session.rollback()
+                    return []
+
+                # La condición se repite en el UPDATE: si otro proceso reservó
+                # alguna fila entre medio, simplemente no se actualiza
+                db.session.execute(
+                    db.update(EmailOutbox)
+                    .where(EmailOutbox.id.in_(ids), claimable)
+                    .values(status='enviando', locked_at=current, claim_token=token)
+                    .execution_options(synchronize_session=False)
+                )
+                rows = db.session.execute(
+                    db.select(
+                        EmailOutbox.id, EmailOutbox.recipient_email, EmailOutbox.subject,
+                        EmailOutbox.body, EmailOutbox.html_body, EmailOutbox.alert_id, EmailOutbox.attempts
+                    ).where(EmailOutbox.claim_token == token)
+                ).mappings().all()
+                db.session.commit()
+                return [dict(row) for row in rows]
+            except Exception:
+                db.session.rollback()
+                raise
+
+    def _process_batch(self, connection, batch):
+        """Envía un lote por la conexión del hilo y registra el resultado"""
+        from app.models import db, EmailOutbox, Alert
+
+        sender = self.app.config['MAIL_DEFAULT_SENDER']
+        sent_ids, sent_alert_ids, failures = [], [], []
+
+        for item in batch:
+            self.rate_limiter.acquire()
+            try:
+                message = build_email_message(sender, item['recipient_email'], item['subject'],
+                                              item['body'], item['html_body'])
+                connection.send(message)
+                sent_ids.append(item['id'])
+                if item['alert_id']:
+                    sent_alert_ids.append(item['alert_id'])
+            except Exception as e:
+                connection.close()
+                failures.append((item, str(e)[:500]))
+
+        now = datetime.now()
+        try:
+            if sent_ids:
+                db.session.execute(
+                    db.update(EmailOutbox)
+                    .where(EmailOutbox.id.in_(sent_ids))
+                    .values(status='enviado', sent_at=now, locked_at=None, claim_token=None, last_error=None)
+                    .execution_options(synchronize_session=False)
+                )
+            if sent_alert_ids:
+                db.session.execute(
+                    db.update(Alert)
+                    .where(Alert.id.in_(sent_alert_ids))
+                    .values(sent=True, sent_date=now)
+                    .execution_options(synchronize_session=False)
+                )
+            for item, error in failures:
+                attempts = item['attempts'] + 1
+                values = {'attempts': attempts, 'last_error': error, 'locked_at': None, 'claim_token': None}
+                if attempts >= self.max_attempts:
+                    values['status'] = 'fallido'
+                else:
+                    # Backoff exponencial: base, 2×base, 4×base...
+                    values['status'] = 'pendiente'
+                    values['next_attempt_at'] = now + timedelta(seconds=self.retry_base * 2 ** (attempts - 1))
+                db.session.execute(
+                    db.update(EmailOutbox)
+                    .where(EmailOutbox.id == item['id'])
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+            db.session.commit()
+        except Exception as e:
+            # Los correos ya enviados quedan en 'enviando' y se reintentan al vencer
+            # MAIL_LOCK_TIMEOUT_SECONDS (entrega al menos una vez)
+            db.session.rollback()
+            print(f"Error registrando resultados del outbox: {e}")
+
+        return len(sent_ids), len(failures)
+
+
+def start_outbox_worker(app):
+    """Inicia el pool dentro del proceso web (MAIL_OUTBOX_AUTOSTART)"""
+    global _pool
+    if _pool is None:
+        _pool = OutboxWorkerPool(app).start()
+    return _pool
+
+
+def stop_outbox_worker():
+    """Detiene el pool del proceso, si está corriendo"""
+    global _pool
+    if _pool is not None:
+        _pool.stop()
+        _pool = None
@@ -2,7 +2,10 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
+import os
 from enum import Enum
+from sqlalchemy.ext.hybrid import hybrid_property
+from app.permissions import get_role_permissions
 
 db = SQLAlchemy()
 
@@ -25,6 +28,9 @@ class CertificationStatus(Enum):
     VENCIDA = 'vencida'
     RENOVACION = 'renovacion'
 
+# Días antes del vencimiento en que una certificación pasa a "próxima a vencer"
+EXPIRING_SOON_DAYS = 15
+
 class User(UserMixin, db.Model):
     """Modelo de usuario del sistema"""
     __tablename__ = 'users'
@@ -35,8 +41,10 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
     full_name = db.Column(db.String(120), nullable=False)
     department = db.Column(db.String(120))
-    role = db.Column(db.String(20), nullable=False, default=UserRole.USUARIO.value)
+    role = db.Column(db.String(20), nullable=False, default=UserRole.USUARIO.value, index=True)
     is_active = db.Column(db.Boolean, default=True)
+    # Se incrementa al editar el usuario; invalida la identidad guardada en las sesiones
+    session_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     created_at = db.Column(db.DateTime, default=datetime.now)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     
@@ -54,6 +62,10 @@ class User(UserMixin, db.Model):
     def get_role(self):
         return UserRole(self.role)
     
+    def bump_session_version(self):
+        """Invalida la identidad en caché de las sesiones del usuario (sin commit)"""
+        self.session_version = (self.session_version or 0) + 1
+    
     def get_role_object(self):
         """Obtiene el objeto Role completo del usuario"""
         return Role.query.filter_by(name=self.role).first()
@@ -76,11 +88,8 @@ class User(UserMixin, db.Model):
         if not self.is_active:
             return False
         
-        role_obj = self.get_role_object()
-        if not role_obj:
-            return False
-        
-        return role_obj.has_permission(module_name, action)
+        # La matriz del rol se carga una sola vez y se reutiliza desde caché
+        return get_role_permissions(self.role).has_permission(self.role, module_name, action)
     
     def get_accessible_modules(self):
         """
@@ -89,29 +98,7 @@ class User(UserMixin, db.Model):
         Returns:
             list: Lista de diccionarios con información de módulos accesibles
         """
-        role_obj = self.get_role_object()
-        if not role_obj:
-            return []
-        
-        permissions = RolePermission.query.filter(
-            RolePermission.role_id == role_obj.id,
-            RolePermission.can_view == True
-        ).join(Module).filter(Module.is_active == True).order_by(Module.display_order).all()
-        
-        modules = []
-        for perm in permissions:
-            modules.append({
-                'name': perm.module.name,
-                'display_name': perm.module.display_name,
-                'icon': perm.module.icon,
-                'can_create': perm.can_create,
-                'can_edit': perm.can_edit,
-                'can_delete': perm.can_delete,
-                'can_export': perm.can_export,
-                'can_approve': perm.can_approve
-            })
-        
-        return modules
+        return get_role_permissions(self.role).accessible_modules(self.role)
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -128,6 +115,8 @@ class Certification(db.Model):
     expiration_date = db.Column(db.Date, nullable=False)
     responsible_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     document_path = db.Column(db.String(255))
+    document_hash = db.Column(db.String(64))            # SHA-256 del documento, se usa como ETag
+    document_updated_at = db.Column(db.DateTime)
     status = db.Column(db.String(20), nullable=False, default=CertificationStatus.VIGENTE.value)
     alert_sent_15 = db.Column(db.Boolean, default=False)
     alert_sent_30 = db.Column(db.Boolean, default=False)
@@ -136,19 +125,116 @@ class Certification(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.now)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     
-    def get_status(self):
-        """Calcula el estado de la certificación basado en la fecha de vencimiento"""
-        today = datetime.now().date()
-        days_until_expiration = (self.expiration_date - today).days
+    # Los filtros por estado son rangos sobre expiration_date (ver status_filter)
+    __table_args__ = (
+        db.Index('idx_certifications_expiration', 'expiration_date', 'id'),
+        db.Index('idx_certifications_status', 'status'),
+        db.Index('idx_certifications_responsible_expiration', 'responsible_id', 'expiration_date'),
+        db.Index('idx_certifications_document_hash', 'document_hash'),
+    )
+    
+    def set_document(self, document_path, document_hash=None, size=None):
+        """
+        Asigna el documento (o lo quita con None) y actualiza las referencias de los blobs (sin commit)
+        
+        Con document_hash (calculado al guardarlo en app/document_store.py) no se
+        vuelve a leer el archivo. El documento anterior pierde una referencia; su
+        archivo lo elimina "flask --app app gc-documents" si nadie más lo usa.
+        """
+        from app.utils import file_content_hash
+        
+        if document_path and document_hash is None:
+            document_hash = file_content_hash(document_path)
+        if document_hash == self.document_hash and document_path == self.document_path:
+            return
+        
+        if self.document_hash:
+            DocumentBlob.release(self.document_hash)
+        if document_hash:
+            # Si el contenido ya estaba guardado (con otra extensión), se usa el archivo del blob
+            document_path = DocumentBlob.acquire(document_hash, document_path,
+                                                 size if size is not None else os.path.getsize(document_path))
+        
+        self.document_path = document_path
+        self.document_hash = document_hash
+        self.document_updated_at = datetime.now() if document_path else None
+    
+    @staticmethod
+    def compute_status(expiration_date, today=None):
+        """Calcula el estado correspondiente a una fecha de vencimiento"""
+        today = today or datetime.now().date()
+        days_until_expiration = (expiration_date - today).days
         
         if days_until_expiration < 0:
-            self.status = CertificationStatus.VENCIDA.value
-        elif days_until_expiration <= 15:
-            self.status = CertificationStatus.PROXIMA_VENCER.value
-        else:
-            self.status = CertificationStatus.VIGENTE.value
+            return CertificationStatus.VENCIDA.value
+        elif days_until_expiration <= EXPIRING_SOON_DAYS:
+            return CertificationStatus.PROXIMA_VENCER.value
+        return CertificationStatus.VIGENTE.value
+    
+    @hybrid_property
+    def current_status(self):
+        """
+        Estado actual derivado de expiration_date
         
-        return self.status
+        En Python se calcula sobre la instancia; en consultas se traduce a un
+        CASE de SQL, por lo que se puede agrupar y contar sin cargar filas.
+        """
+        return Certification.compute_status(self.expiration_date)
+    
+    @current_status.expression
+    def current_status(cls):
+        today = datetime.now().date()
+        return db.case(
+            (cls.expiration_date < today, CertificationStatus.VENCIDA.value),
+            (cls.expiration_date <= today + timedelta(days=EXPIRING_SOON_DAYS), CertificationStatus.PROXIMA_VENCER.value),
+            else_=CertificationStatus.VIGENTE.value
+        )
+    
+    @classmethod
+    def status_filter(cls, status):
+        """
+        Condición equivalente a current_status == status expresada como rango
+        sobre expiration_date, de modo que use el índice idx_expiration_date
+        
+        Args:
+            status (str): 'vigente', 'proxima_vencer' o 'vencida' (otros valores
+                          se comparan contra la columna status guardada)
+        """
+        today = datetime.now().date()
+        soon = today + timedelta(days=EXPIRING_SOON_DAYS)
+        
+        if status == CertificationStatus.VENCIDA.value:
+            return cls.expiration_date < today
+        if status == CertificationStatus.PROXIMA_VENCER.value:
+            return cls.expiration_date.between(today, soon)
+        if status == CertificationStatus.VIGENTE.value:
+            return cls.expiration_date > soon
+        return cls.status == status
+    
+    @classmethod
+    def refresh_stored_statuses(cls):
+        """
+        Sincroniza la columna status con el estado calculado en un solo UPDATE
+        
+        Pensado para ejecutarse una vez al día (flask refresh-cert-status) y
+        mantener la columna correcta para consultas externas a la aplicación.
+        
+        Returns:
+            int: Número de certificaciones actualizadas
+        """
+        status_expr = cls.current_status
+        result = db.session.execute(
+            db.update(cls)
+            .where(cls.status != status_expr)
+            .values(status=status_expr)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount
+    
+    def get_status(self):
+        """Calcula el estado de la certificación basado en la fecha de vencimiento"""
+        return self.current_status
     
     def days_to_expiration(self):
         """Retorna los días faltantes para el vencimiento"""
@@ -158,6 +244,18 @@ class Certification(db.Model):
     def __repr__(self):
         return f'<Certification {self.name}>'
 
+def _empty_findings_stats():
+    """Estadísticas de hallazgos para una auditoría sin hallazgos"""
+    return {
+        'total': 0,
+        'open': 0,
+        'closed': 0,
+        'by_severity': {'critica': 0, 'mayor': 0, 'menor': 0},
+        'open_by_severity': {'critica': 0, 'mayor': 0, 'menor': 0},
+        'compliance_percentage': 100,
+        'has_critical': False
+    }
+
 class Audit(db.Model):
     """Modelo para auditorías"""
     __tablename__ = 'audits'
@@ -176,17 +274,103 @@ class Audit(db.Model):
     # Relaciones
     findings = db.relationship('AuditFinding', backref='audit', lazy='dynamic', cascade='all, delete-orphan')
     
+    # El listado ordena por scheduled_date y filtra por estado y tipo
+    __table_args__ = (
+        db.Index('idx_audits_scheduled', 'scheduled_date', 'id'),
+        db.Index('idx_audits_status_scheduled', 'status', 'scheduled_date'),
+        db.Index('idx_audits_type_scheduled', 'audit_type', 'scheduled_date'),
+        db.Index('idx_audits_responsible_scheduled', 'responsible_id', 'scheduled_date'),
+        db.Index('idx_audits_created', 'created_at'),
+    )
+    
     def has_critical_findings(self):
         """Verifica si la auditoría tiene hallazgos críticos"""
-        return self.findings.filter_by(severity='critica').count() > 0
+        return self.get_findings_stats()['has_critical']
     
     def get_compliance_percentage(self):
         """Calcula el porcentaje de cumplimiento"""
-        total_findings = self.findings.count()
-        if total_findings == 0:
-            return 100
-        closed_findings = self.findings.filter_by(status='cerrado').count()
-        return int((closed_findings / total_findings) * 100)
+        return self.get_findings_stats()['compliance_percentage']
+    
+    def get_findings_stats(self):
+        """
+        Estadísticas de hallazgos de la auditoría (se calculan una sola vez por instancia)
+        
+        Returns:
+            dict: Ver Audit.get_findings_stats_bulk
+        """
+        stats = getattr(self, '_findings_stats', None)
+        if stats is None:
+            stats = Audit.get_findings_stats_bulk([self.id])[self.id]
+            self._findings_stats = stats
+        return stats
+    
+    @staticmethod
+    def preload_findings_stats(audits):
+        """
+        Precarga en un solo GROUP BY las estadísticas de las auditorías que aún no las tienen
+        
+        Después de llamarla, get_findings_stats() no consulta la base de datos.
+        """
+        pending = [audit for audit in audits if getattr(audit, '_findings_stats', None) is None]
+        if pending:
+            stats = Audit.get_findings_stats_bulk([audit.id for audit in pending])
+            for audit in pending:
+                audit._findings_stats = stats[audit.id]
+        return audits
+    
+    @staticmethod
+    def get_findings_stats_bulk(audit_ids):
+        """
+        Obtiene los conteos severidad × estado de varias auditorías en un solo GROUP BY
+        
+        Args:
+            audit_ids (list): IDs de las auditorías (ej: las de una página del listado)
+        
+        Returns:
+            dict: {audit_id: {
+                'total': int,
+                'open': int,
+                'closed': int,
+                'by_severity': {'critica': int, 'mayor': int, 'menor': int},
+                'open_by_severity': {'critica': int, 'mayor': int, 'menor': int},
+                'compliance_percentage': int,
+                'has_critical': bool
+            }}
+        """
+        audit_ids = [audit_id for audit_id in audit_ids if audit_id is not None]
+        stats = {audit_id: _empty_findings_stats() for audit_id in audit_ids}
+        if not audit_ids:
+            return stats
+        
+        rows = db.session.query(
+            AuditFinding.audit_id,
+            AuditFinding.severity,
+            AuditFinding.status,
+            db.func.count(AuditFinding.id)
+        ).filter(
+            AuditFinding.audit_id.in_(set(audit_ids))
+        ).group_by(
+            AuditFinding.audit_id,
+            AuditFinding.severity,
+            AuditFinding.status
+        ).all()
+        
+        for audit_id, severity, status, count in rows:
+            entry = stats[audit_id]
+            entry['total'] += count
+            entry['by_severity'][severity] = entry['by_severity'].get(severity, 0) + count
+            if status == 'cerrado':
+                entry['closed'] += count
+            else:
+                entry['open'] += count
+                entry['open_by_severity'][severity] = entry['open_by_severity'].get(severity, 0) + count
+        
+        for entry in stats.values():
+            if entry['total'] > 0:
+                entry['compliance_percentage'] = int((entry['closed'] / entry['total']) * 100)
+            entry['has_critical'] = entry['by_severity']['critica'] > 0
+        
+        return stats
     
     def __repr__(self):
         return f'<Audit {self.id} - {self.evaluated_area}>'
@@ -207,9 +391,23 @@ class AuditFinding(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.now)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     
+    # Cubre el GROUP BY de Audit.get_findings_stats_bulk sin leer la tabla
+    __table_args__ = (
+        db.Index('idx_audit_findings_audit_severity_status', 'audit_id', 'severity', 'status'),
+    )
+    
     def __repr__(self):
         return f'<AuditFinding {self.id}>'
 
+def _empty_confirmation_stats():
+    """Conteos de confirmaciones para una política sin confirmaciones"""
+    return {'total': 0, 'confirmed': 0, 'pending': 0, 'percentage': 0, 'by_department': {}}
+
+def _complete_confirmation_stats(entry):
+    """Calcula pendientes y porcentaje a partir de total y confirmadas"""
+    entry['pending'] = entry['total'] - entry['confirmed']
+    entry['percentage'] = int((entry['confirmed'] / entry['total']) * 100) if entry['total'] > 0 else 0
+
 class Policy(db.Model):
     """Modelo para políticas de cumplimiento"""
     __tablename__ = 'policies'
@@ -228,13 +426,103 @@ class Policy(db.Model):
     # Relaciones
     confirmations = db.relationship('PolicyConfirmation', backref='policy', lazy='dynamic', cascade='all, delete-orphan')
     
+    __table_args__ = (
+        db.Index('idx_policies_active_effective', 'is_active', 'effective_date'),
+    )
+    
     def get_confirmation_percentage(self):
         """Calcula el porcentaje de confirmaciones por unidad"""
-        total_confirmations = self.confirmations.count()
-        confirmed = self.confirmations.filter_by(confirmed=True).count()
-        if total_confirmations == 0:
-            return 0
-        return int((confirmed / total_confirmations) * 100)
+        return self.get_confirmation_stats()['percentage']
+    
+    def get_confirmation_stats(self):
+        """
+        Conteos de confirmaciones de la política (se calculan una sola vez por instancia)
+        
+        Returns:
+            dict: Ver Policy.get_confirmation_stats_bulk
+        """
+        stats = getattr(self, '_confirmation_stats', None)
+        if stats is None:
+            stats = Policy.get_confirmation_stats_bulk([self.id])[self.id]
+            self._confirmation_stats = stats
+        return stats
+    
+    @staticmethod
+    def preload_confirmation_stats(policies, by_department=False):
+        """
+        Precarga en un solo GROUP BY los conteos de confirmaciones de las políticas
+        
+        Después de llamarla, get_confirmation_stats() y get_confirmation_percentage()
+        no consultan la base de datos.
+        """
+        pending = [policy for policy in policies
+                   if by_department or getattr(policy, '_confirmation_stats', None) is None]
+        if pending:
+            stats = Policy.get_confirmation_stats_bulk([policy.id for policy in pending], by_department)
+            for policy in pending:
+                policy._confirmation_stats = stats[policy.id]
+        return policies
+    
+    @staticmethod
+    def get_confirmation_stats_bulk(policy_ids, by_department=False):
+        """
+        Obtiene total/confirmadas de varias políticas en un solo GROUP BY
+        
+        Args:
+            policy_ids (list): IDs de las políticas
+            by_department (bool): Agregar el desglose por departamento del usuario
+                                  (misma consulta, agrupada también por departamento)
+        
+        Returns:
+            dict: {policy_id: {
+                'total': int,
+                'confirmed': int,
+                'pending': int,
+                'percentage': int,
+                'by_department': {departamento: {'total', 'confirmed', 'pending', 'percentage'}}  # solo con by_department
+            }}
+        """
+        policy_ids = [policy_id for policy_id in policy_ids if policy_id is not None]
+        stats = {policy_id: _empty_confirmation_stats() for policy_id in policy_ids}
+        if not policy_ids:
+            return stats
+        
+        confirmed = db.case((PolicyConfirmation.confirmed == True, 1), else_=0)
+        columns = [PolicyConfirmation.policy_id]
+        if by_department:
+            columns.append(User.department)
+        
+        query = db.session.query(
+            *columns,
+            db.func.count(PolicyConfirmation.id),
+            db.func.sum(confirmed)
+        ).filter(
+            PolicyConfirmation.policy_id.in_(set(policy_ids))
+        )
+        if by_department:
+            query = query.join(User, User.id == PolicyConfirmation.user_id)
+        rows = query.group_by(*columns).all()
+        
+        for row in rows:
+            entry = stats[row[0]]
+            total, confirmed_count = row[-2], int(row[-1] or 0)
+            entry['total'] += total
+            entry['confirmed'] += confirmed_count
+            if by_department:
+                department = entry['by_department'].setdefault(row[1] or 'Sin departamento', _empty_confirmation_stats())
+                department['total'] += total
+                department['confirmed'] += confirmed_count
+        
+        for entry in stats.values():
+            _complete_confirmation_stats(entry)
+            if by_department:
+                for department in entry['by_department'].values():
+                    _complete_confirmation_stats(department)
+                    del department['by_department']
+            else:
+                del entry['by_department']
+        
+        return stats
     
     def __repr__(self):
         return f'<Policy {self.title}>'
@@ -254,11 +542,103 @@ class PolicyConfirmation(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.now)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     
+    # Una confirmación por usuario y política (también sirve de índice para los conteos)
+    __table_args__ = (
+        db.UniqueConstraint('policy_id', 'user_id', name='unique_policy_user'),
+    )
+    
     def mark_confirmed(self, ip_address=None):
         self.confirmed = True
         self.confirmed_date = datetime.now()
         self.ip_address = ip_address
     
+    @staticmethod
+    def confirm(policy_id, user_id, ip_address=None):
+        """
+        Marca la política como confirmada por el usuario con un solo upsert (sin commit)
+        
+        Crea la confirmación si no existe o actualiza la existente en la misma
+        sentencia (ON DUPLICATE KEY UPDATE en MySQL, ON CONFLICT en PostgreSQL y
+        SQLite), así dos confirmaciones simultáneas no duplican la fila.
+        """
+        now = datetime.now()
+        changes = {'confirmed': True, 'confirmed_date': now, 'ip_address': ip_address, 'updated_at': now}
+        values = dict(changes, policy_id=policy_id, user_id=user_id, created_at=now)
+        dialect = db.session.get_bind().dialect.name
+        
+        if dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import insert
+            statement = insert(PolicyConfirmation).values(**values).on_duplicate_key_update(**changes)
+        elif dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            statement = insert(PolicyConfirmation).values(**values).on_conflict_do_update(
+                index_elements=['policy_id', 'user_id'], set_=changes
+            )
+        else:
+            # Motor sin upsert: UPDATE y, si no había fila, INSERT (la clave única evita duplicados)
+            result = db.session.execute(
+                db.update(PolicyConfirmation)
+                .where(PolicyConfirmation.policy_id == policy_id, PolicyConfirmation.user_id == user_id)
+                .values(**changes)
+            )
+            if result.rowcount:
+                return
+            statement = db.insert(PolicyConfirmation).values(**values)
+        
+        db.session.execute(statement)
+    
+    @staticmethod
+    def _enroll(source):
+        """
+        Inserta confirmaciones pendientes con un solo INSERT ... SELECT
+        
+        Args:
+            source: Select de (policy_id, user_id); se omiten los pares que ya existen
+        
+        Returns:
+            int: Confirmaciones creadas
+        """
+        now = datetime.now()
+        pairs = source.subquery()
+        already_enrolled = db.select(PolicyConfirmation.id).where(
+            PolicyConfirmation.policy_id == pairs.c.policy_id,
+            PolicyConfirmation.user_id == pairs.c.user_id
+        ).exists()
+        
+        rows = db.select(
+            pairs.c.policy_id,
+            pairs.c.user_id,
+            db.literal(False, db.Boolean),
+            db.literal(now, db.DateTime),
+            db.literal(now, db.DateTime)
+        ).where(~already_enrolled)
+        
+        result = db.session.execute(
+            db.insert(PolicyConfirmation).from_select(
+                ['policy_id', 'user_id', 'confirmed', 'created_at', 'updated_at'], rows
+            )
+        )
+        return result.rowcount
+    
+    @staticmethod
+    def enroll_active_users(policy_id):
+        """Crea la confirmación pendiente de la política para cada usuario activo (sin commit)"""
+        return PolicyConfirmation._enroll(
+            db.select(db.literal(policy_id, db.Integer).label('policy_id'), User.id.label('user_id'))
+            .where(User.is_active == True)
+        )
+    
+    @staticmethod
+    def enroll_user(user_id):
+        """Crea las confirmaciones pendientes de un usuario en las políticas activas (sin commit)"""
+        return PolicyConfirmation._enroll(
+            db.select(Policy.id.label('policy_id'), db.literal(user_id, db.Integer).label('user_id'))
+            .where(Policy.is_active == True)
+        )
+    
     def __repr__(self):
         return f'<PolicyConfirmation Policy:{self.policy_id} User:{self.user_id}>'
 
@@ -278,9 +658,150 @@ class Alert(db.Model):
     sent_date = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.now)
     
+    # Alertas pendientes del dashboard y alertas ya generadas por certificación
+    __table_args__ = (
+        db.Index('idx_alerts_read_created', 'is_read', 'created_at'),
+        db.Index('idx_alerts_type_related', 'alert_type', 'related_id'),
+    )
+    
     def __repr__(self):
         return f'<Alert {self.title}>'
 
+class DocumentBlob(db.Model):
+    """Archivo subido guardado por contenido, compartido por los registros que lo usan (ver app/document_store.py)"""
+    __tablename__ = 'document_blobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False, unique=True)
+    path = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)   # Certificaciones con document_hash = sha256
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    # Blobs sin referencias para el recolector
+    __table_args__ = (
+        db.Index('idx_document_blobs_refs_updated', 'ref_count', 'updated_at'),
+    )
+    
+    @staticmethod
+    def acquire(sha256, path, size):
+        """
+        Suma una referencia al blob, creándolo si no existe, con un solo upsert (sin commit)
+        
+        Mismo esquema que PolicyConfirmation.confirm: dos subidas simultáneas del
+        mismo archivo no duplican la fila.
+        
+        Returns:
+            str: Ruta guardada en el blob (la del primer archivo con ese contenido)
+        """
+        now = datetime.now()
+        changes = {'ref_count': DocumentBlob.ref_count + 1, 'updated_at': now}
+        values = {'sha256': sha256, 'path': path, 'size': size, 'ref_count': 1, 'created_at': now, 'updated_at': now}
+        dialect = db.session.get_bind().dialect.name
+        
+        if dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import insert
+            statement = insert(DocumentBlob).values(**values).on_duplicate_key_update(**changes)
+        elif dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            statement = insert(DocumentBlob).values(**values).on_conflict_do_update(
+                index_elements=['sha256'], set_=changes
+            )
+        else:
+            result = db.session.execute(
+                db.update(DocumentBlob).where(DocumentBlob.sha256 == sha256).values(**changes)
+            )
+            if result.rowcount:
+                return DocumentBlob.stored_path(sha256)
+            statement = db.insert(DocumentBlob).values(**values)
+        
+        db.session.execute(statement)
+        return DocumentBlob.stored_path(sha256)
+    
+    @staticmethod
+    def stored_path(sha256):
+        """Ruta del archivo guardada en el blob"""
+        return db.session.execute(db.select(DocumentBlob.path).where(DocumentBlob.sha256 == sha256)).scalar_one()
+    
+    @staticmethod
+    def release(sha256):
+        """Resta una referencia al blob (sin commit); el archivo queda para el recolector"""
+        db.session.execute(
+            db.update(DocumentBlob)
+            .where(DocumentBlob.sha256 == sha256, DocumentBlob.ref_count > 0)
+            .values(ref_count=DocumentBlob.ref_count - 1, updated_at=datetime.now())
+        )
+    
+    def __repr__(self):
+        return f'<DocumentBlob {self.sha256[:12]} refs={self.ref_count}>'
+
+class EmailOutbox(db.Model):
+    """Cola persistente de correos salientes (la vacía el worker de app/mailer.py)"""
+    __tablename__ = 'email_outbox'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    recipient_email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    html_body = db.Column(db.Text)
+    alert_id = db.Column(db.Integer, db.ForeignKey('alerts.id', ondelete='SET NULL'))
+    status = db.Column(db.String(20), nullable=False, default='pendiente')  # pendiente, enviando, enviado, fallido
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    locked_at = db.Column(db.DateTime)
+    claim_token = db.Column(db.String(32))  # reserva del worker que tiene el correo en 'enviando'
+    last_error = db.Column(db.Text)
+    sent_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    
+    __table_args__ = (
+        db.Index('idx_outbox_status_next', 'status', 'next_attempt_at'),
+    )
+    
+    def __repr__(self):
+        return f'<EmailOutbox {self.id} {self.status} {self.recipient_email}>'
+
+class ReportJob(db.Model):
+    """Exportación de reporte generada en segundo plano (ver app/report_jobs.py)"""
+    __tablename__ = 'report_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    report_type = db.Column(db.String(30), nullable=False)    # certifications, audits
+    format = db.Column(db.String(10), nullable=False)         # pdf, excel
+    data_version = db.Column(db.String(64), nullable=False)   # Estado de los datos al pedir el reporte
+    status = db.Column(db.String(20), nullable=False, default='pendiente')  # pendiente, procesando, completado, fallido
+    progress = db.Column(db.Integer, nullable=False, default=0)             # 0 a 100
+    artifact_path = db.Column(db.String(255))
+    error = db.Column(db.Text)
+    requested_by = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'))
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    # Búsqueda de un reporte ya generado (o en curso) para los mismos datos
+    __table_args__ = (
+        db.Index('idx_report_jobs_artifact', 'report_type', 'format', 'data_version', 'status'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'report_type': self.report_type,
+            'format': self.format,
+            'status': self.status,
+            'progress': self.progress,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+    
+    def __repr__(self):
+        return f'<ReportJob {self.id} {self.report_type}.{self.format} {self.status}>'
+
 class AuditLog(db.Model):
     """Modelo para registro de auditoría del sistema"""
     __tablename__ = 'audit_logs'
@@ -292,14 +813,33 @@ class AuditLog(db.Model):
     entity_id = db.Column(db.Integer)
     changes = db.Column(db.Text)  # JSON con cambios
     ip_address = db.Column(db.String(50))
-    created_at = db.Column(db.DateTime, default=datetime.now, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.now)
     
     # Relación con usuario
     user = db.relationship('User', backref='audit_logs', foreign_keys=[user_id])
     
+    # Índices para la paginación por cursor (created_at, id) con cada filtro del visor
+    __table_args__ = (
+        db.Index('idx_audit_logs_created_id', 'created_at', 'id'),
+        db.Index('idx_audit_logs_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('idx_audit_logs_action_created', 'action', 'created_at', 'id'),
+        db.Index('idx_audit_logs_entity_created', 'entity_type', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f'<AuditLog {self.action} {self.entity_type}:{self.entity_id}>'
 
+class AuditLogCounter(db.Model):
+    """Registros de auditoría por día y acción (mantenido por app/audit_log.py)"""
+    __tablename__ = 'audit_log_counters'
+    
+    day = db.Column(db.Date, primary_key=True)
+    action = db.Column(db.String(100), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<AuditLogCounter {self.day} {self.action}: {self.total}>'
+
 class Role(db.Model):
     """Modelo para roles de usuario"""
     __tablename__ = 'roles'
@@ -326,51 +866,11 @@ class Role(db.Model):
         Returns:
             bool: True si tiene el permiso, False si no
         """
-        permission = RolePermission.query.join(Module).filter(
-            RolePermission.role_id == self.id,
-            Module.name == module_name,
-            Module.is_active == True
-        ).first()
-        
-        if not permission:
-            return False
-        
-        action_map = {
-            'view': permission.can_view,
-            'create': permission.can_create,
-            'edit': permission.can_edit,
-            'delete': permission.can_delete,
-            'export': permission.can_export,
-            'approve': permission.can_approve
-        }
-        
-        return action_map.get(action, False)
+        return get_role_permissions(self.name).has_permission(self.name, module_name, action)
     
     def get_module_permissions(self, module_name):
         """Obtiene todos los permisos del rol para un módulo específico"""
-        permission = RolePermission.query.join(Module).filter(
-            RolePermission.role_id == self.id,
-            Module.name == module_name
-        ).first()
-        
-        if not permission:
-            return {
-                'view': False,
-                'create': False,
-                'edit': False,
-                'delete': False,
-                'export': False,
-                'approve': False
-            }
-        
-        return {
-            'view': permission.can_view,
-            'create': permission.can_create,
-            'edit': permission.can_edit,
-            'delete': permission.can_delete,
-            'export': permission.can_export,
-            'approve': permission.can_approve
-        }
+        return get_role_permissions(self.name).module_permissions(self.name, module_name)
     
     def __repr__(self):
         return f'<Role {self.name}>'
@@ -0,0 +1,210 @@
+"""
+Permisos por rol: matriz rol × módulo y caché
+
+PermissionMatrix construye la matriz completa de permisos (rol × módulo ×
+acción) con una sola consulta. La usan la pantalla de administración de
+permisos, User.can, User.get_accessible_modules y Role.get_module_permissions.
+
+La matriz de cada rol se guarda en dos niveles de caché:
+    • Por request: guardado en flask.g, dura lo que dura la petición
+    • Por proceso: diccionario compartido con expiración (PERMISSION_CACHE_TTL)
+
+Las rutas que modifican permisos o usuarios deben llamar a
+invalidate_permissions() para descartar la caché.
+"""
+import threading
+import time
+from flask import g, current_app, has_app_context
+
+
+ACTIONS = ('view', 'create', 'edit', 'delete', 'export', 'approve')
+
+# Caché del proceso: {nombre_rol: (expira_en, PermissionMatrix)}
+_role_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _empty_cell():
+    """Celda de la matriz para un rol sin registro en role_permissions"""
+    cell = {'id': None}
+    for action in ACTIONS:
+        cell[f'can_{action}'] = False
+    return cell
+
+
+class PermissionMatrix:
+    """Matriz de permisos rol × módulo construida con una sola consulta"""
+    
+    def __init__(self, rows):
+        # {(role_id, module_id): celda} y {(role_name, module_name): (module_id, celda)}
+        self._by_id = {}
+        self._by_name = {}
+        # {module_id: datos del módulo}
+        self._modules = {}
+        
+        for row in rows:
+            cell = {'id': row.id}
+            for action in ACTIONS:
+                cell[f'can_{action}'] = bool(getattr(row, f'can_{action}'))
+            
+            self._by_id[(row.role_id, row.module_id)] = cell
+            self._by_name[(row.role_name, row.module_name)] = (row.module_id, cell)
+            self._modules[row.module_id] = {
+                'name': row.module_name,
+                'display_name': row.display_name,
+                'icon': row.icon,
+                'is_active': bool(row.module_is_active),
+                'display_order': row.display_order or 0
+            }
+    
+    @classmethod
+    def load(cls, role_name=None):
+        """
+        Carga la matriz desde la base de datos en una sola consulta
+        
+        Args:
+            role_name (str): Si se indica, solo se cargan los permisos de ese rol
+        
+        Returns:
+            PermissionMatrix
+        """
+        from app.models import db, Role, Module, RolePermission
+        
+        query = db.session.query(
+            RolePermission.id,
+            RolePermission.role_id,
+            RolePermission.module_id,
+            RolePermission.can_view,
+            RolePermission.can_create,
+            RolePermission.can_edit,
+            RolePermission.can_delete,
+            RolePermission.can_export,
+            RolePermission.can_approve,
+            Role.name.label('role_name'),
+            Module.name.label('module_name'),
+            Module.display_name,
+            Module.icon,
+            Module.is_active.label('module_is_active'),
+            Module.display_order
+        ).join(Role, Role.id == RolePermission.role_id).join(
+            Module, Module.id == RolePermission.module_id
+        )
+        
+        if role_name is not None:
+            query = query.filter(Role.name == role_name)
+        
+        return cls(query.all())
+    
+    def cell(self, role_id, module_id):
+        """Permisos de un rol en un módulo con el formato {'id', 'can_view', ...}"""
+        return self._by_id.get((role_id, module_id)) or _empty_cell()
+    
+    def as_dict(self, roles, modules):
+        """
+        Matriz anidada {role.id: {module.id: celda}} para los templates
+        
+        Args:
+            roles: Lista de objetos Role
+            modules: Lista de objetos Module
+        """
+        return {
+            role.id: {module.id: self.cell(role.id, module.id) for module in modules}
+            for role in roles
+        }
+    
+    def has_permission(self, role_name, module_name, action):
+        """Verifica un permiso; los módulos inactivos nunca otorgan acceso"""
+        entry = self._by_name.get((role_name, module_name))
+        if not entry:
+            return False
+        
+        module_id, cell = entry
+        if not self._modules[module_id]['is_active']:
+            return False
+        
+        return cell.get(f'can_{action}', False)
+    
+    def module_permissions(self, role_name, module_name):
+        """Todos los permisos de un rol en un módulo: {'view': bool, ...}"""
+        entry = self._by_name.get((role_name, module_name))
+        cell = entry[1] if entry else _empty_cell()
+        return {action: cell[f'can_{action}'] for action in ACTIONS}
+    
+    def accessible_modules(self, role_name):
+        """Módulos activos con can_view=True para un rol, ordenados por display_order"""
+        accessible = []
+        for (name, _), (module_id, cell) in self._by_name.items():
+            module = self._modules[module_id]
+            if name == role_name and module['is_active'] and cell['can_view']:
+                accessible.append((module, cell))
+        
+        accessible.sort(key=lambda item: item[0]['display_order'])
+        
+        return [{
+            'name': module['name'],
+            'display_name': module['display_name'],
+            'icon': module['icon'],
+            'can_create': cell['can_create'],
+            'can_edit': cell['can_edit'],
+            'can_delete': cell['can_delete'],
+            'can_export': cell['can_export'],
+            'can_approve': cell['can_approve']
+        } for module, cell in accessible]
+
+
+def get_role_permissions(role_name):
+    """
+    Obtiene la matriz de permisos de un rol usando la caché
+
+    Args:
+        role_name (str): Nombre del rol
+
+    Returns:
+        PermissionMatrix: Matriz cargada solo con los permisos de ese rol
+    """
+    if not has_app_context():
+        return PermissionMatrix.load(role_name)
+
+    # Nivel 1: caché de la petición actual
+    request_cache = g.setdefault('_role_permissions', {})
+    if role_name in request_cache:
+        return request_cache[role_name]
+
+    # Nivel 2: caché del proceso
+    ttl = current_app.config.get('PERMISSION_CACHE_TTL', 0)
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _role_cache.get(role_name)
+
+    if cached and cached[0] > now:
+        matrix = cached[1]
+    else:
+        matrix = PermissionMatrix.load(role_name)
+        if ttl > 0:
+            with _cache_lock:
+                _role_cache[role_name] = (now + ttl, matrix)
+
+    request_cache[role_name] = matrix
+    return matrix
+
+
+def invalidate_permissions(role_name=None):
+    """
+    Descarta los permisos en caché
+
+    Args:
+        role_name (str): Rol a invalidar. Si es None se invalidan todos los roles.
+    """
+    with _cache_lock:
+        if role_name is None:
+            _role_cache.clear()
+        else:
+            _role_cache.pop(role_name, None)
+
+    if has_app_context():
+        request_cache = g.get('_role_permissions')
+        if request_cache is not None:
+            if role_name is None:
+                request_cache.clear()
+            else:
+                request_cache.pop(role_name, None)
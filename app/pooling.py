@@ -0,0 +1,135 @@
+"""
+Estrategias de pool de conexiones
+
+En Vercel cada instancia de la función es un proceso de vida corta con su
+propio pool, así que la estrategia se elige por configuración
+(DB_POOL_STRATEGY):
+
+    • queue → QueuePool pequeño y LIFO que se reutiliza mientras la instancia
+              siga caliente (recomendado sin pooler externo)
+    • null  → NullPool: abre y cierra una conexión por petición, sin
+              conexiones ociosas que el servidor pueda cortar
+    • proxy → NullPool contra un pooler local (PgBouncer / ProxySQL) en
+              DB_PROXY_HOST:DB_PROXY_PORT; el pooler mantiene las conexiones
+              reales abiertas y conectarse a él es barato
+
+Si DB_POOL_STRATEGY está vacío se usa SQLALCHEMY_ENGINE_OPTIONS sin cambios.
+
+En lugar de pool_pre_ping (un SELECT 1 en cada checkout) la estrategia queue
+recicla las conexiones antes del timeout del servidor (DB_POOL_RECYCLE) y solo
+verifica una conexión si estuvo ociosa más de DB_PING_IDLE_SECONDS. Si el
+servidor la cerró igual, SQLAlchemy detecta el error de desconexión, invalida
+el pool y la siguiente petición abre conexiones nuevas.
+"""
+import time
+
+POOL_STRATEGIES = ('queue', 'null', 'proxy')
+
+# Puertos habituales del pooler local según el motor
+DEFAULT_PROXY_PORTS = {
+    'postgresql': 6432,  # PgBouncer
+    'mysql': 6033,       # ProxySQL
+}
+
+
+def build_engine_options(config):
+    """
+    Calcula la URI y las opciones del engine para la estrategia configurada
+
+    Args:
+        config: Configuración de la app (dict o app.config)
+
+    Returns:
+        tuple: (uri, engine_options)
+    """
+    from sqlalchemy.engine import make_url
+    from sqlalchemy.pool import NullPool
+
+    strategy = config.get('DB_POOL_STRATEGY')
+    uri = config.get('SQLALCHEMY_DATABASE_URI')
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+
+    if not strategy:
+        return uri, options
+
+    if strategy not in POOL_STRATEGIES:
+        raise ValueError(f"DB_POOL_STRATEGY no válido: {strategy} (opciones: {', '.join(POOL_STRATEGIES)})")
+
+    # Opciones de pool previas (ej: pool_size) no aplican a otra estrategia
+    for key in ('poolclass', 'pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping', 'pool_use_lifo'):
+        options.pop(key, None)
+
+    if strategy == 'queue':
+        options.update({
+            'pool_size': config.get('DB_POOL_SIZE', 1),
+            'max_overflow': config.get('DB_MAX_OVERFLOW', 2),
+            'pool_timeout': config.get('DB_POOL_TIMEOUT', 10),
+            'pool_recycle': config.get('DB_POOL_RECYCLE', 280),
+            # LIFO: se reutiliza siempre la conexión más reciente y las demás caducan
+            'pool_use_lifo': True,
+            'pool_pre_ping': False
+        })
+    else:
+        options['poolclass'] = NullPool
+
+    if strategy == 'proxy' and uri:
+        url = make_url(uri)
+        backend = url.get_backend_name()
+        port = config.get('DB_PROXY_PORT') or DEFAULT_PROXY_PORTS.get(backend)
+        url = url.set(host=config.get('DB_PROXY_HOST', '127.0.0.1'), port=int(port) if port else None)
+        uri = url.render_as_string(hide_password=False)
+
+    return uri, options
+
+
+def configure_pool(app):
+    """Aplica la estrategia de pool a la configuración (llamar antes de db.init_app)"""
+    if not app.config.get('DB_POOL_STRATEGY'):
+        return
+
+    uri, options = build_engine_options(app.config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def install_liveness_check(engine, idle_seconds):
+    """
+    Verifica solo las conexiones que estuvieron ociosas más de idle_seconds
+
+    Reemplaza pool_pre_ping: una instancia con tráfico constante no paga el
+    SELECT 1 en cada petición, solo la primera después de un periodo inactivo.
+    """
+    from sqlalchemy import event, exc
+
+    @event.listens_for(engine, 'checkin')
+    def _mark_idle(dbapi_connection, connection_record):
+        connection_record.info['idle_since'] = time.monotonic()
+
+    @event.listens_for(engine, 'checkout')
+    def _check_idle(dbapi_connection, connection_record, connection_proxy):
+        idle_since = connection_record.info.get('idle_since')
+        if idle_since is None or time.monotonic() - idle_since < idle_seconds:
+            return
+
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        except Exception:
+            # El pool descarta la conexión y reintenta con una nueva
+            raise exc.DisconnectionError('Conexión ociosa cerrada por el servidor')
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+
+def init_pool_events(app):
+    """Registra la verificación de conexiones ociosas (llamar después de db.init_app)"""
+    from app.models import db
+
+    if app.config.get('DB_POOL_STRATEGY') != 'queue':
+        return
+
+    with app.app_context():
+        install_liveness_check(db.engine, app.config.get('DB_PING_IDLE_SECONDS', 60))
@@ -0,0 +1,145 @@
+"""
+Verificación de índices con EXPLAIN
+
+Recorre las páginas de listados y del dashboard con un cliente de pruebas,
+captura cada SELECT que ejecutan y le pide al motor su plan (EXPLAIN). Una
+consulta falla la verificación si recorre completa una tabla que no es de
+catálogo (SCAN sin índice en SQLite, type=ALL en MySQL, Seq Scan en PostgreSQL).
+
+    flask --app app check-indexes [--user admin]
+
+Sale con código 1 si alguna consulta no usa índice, para usarlo en CI después
+de "flask db upgrade".
+"""
+import json
+import re
+from sqlalchemy import event
+
+# Páginas que se verifican (listados, filtros habituales y dashboard)
+INDEX_CHECK_URLS = (
+    '/dashboard/',
+    '/dashboard/summary',
+    '/certifications/',
+    '/certifications/?status=vigente',
+    '/certifications/?status=proxima_vencer',
+    '/certifications/?status=vencida',
+    '/audits/',
+    '/audits/?status=programada',
+    '/audits/?type=interna',
+    '/audits/?status=completada&type=externa',
+    '/policies/',
+    '/admin/users',
+    '/admin/audit-log',
+    '/admin/audit-log?action=login',
+    '/admin/audit-log?user_id=1',
+    '/admin/audit-log?entity_type=policy',
+    '/admin/audit-log?date_from=2025-01-01&date_to=2025-12-31',
+)
+
+# Tablas de catálogo (pocas filas): recorrerlas completas es lo esperado
+SMALL_TABLES = {'users', 'roles', 'modules', 'role_permissions', 'audit_log_counters'}
+
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+def capture_statements(app, user, urls=INDEX_CHECK_URLS):
+    """
+    Visita las páginas como el usuario indicado y captura los SELECT ejecutados
+
+    Returns:
+        list: [(url, statement, parameters)] sin repetir sentencias
+    """
+    from app.models import db
+    from app.dashboard import invalidate_dashboard_summary
+
+    captured = []
+    seen = set()
+    current = {'url': None}
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if executemany or not statement.lstrip().upper().startswith('SELECT') or statement in seen:
+            return
+        seen.add(statement)
+        captured.append((current['url'], statement, parameters))
+
+    # Sin caché, para que el dashboard ejecute sus consultas
+    invalidate_dashboard_summary()
+
+    client = app.test_client()
+    with client.session_transaction(base_url='https://localhost') as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', on_execute)
+    try:
+        for url in urls:
+            current['url'] = url
+            client.get(url, base_url='https://localhost')
+    finally:
+        event.remove(engine, 'before_cursor_execute', on_execute)
+
+    return captured
+
+
+def full_scans(connection, statement, parameters):
+    """
+    Tablas que el plan de la sentencia recorre completas
+
+    Returns:
+        list: Nombres de tabla (sin alias)
+    """
+    from app.models import db
+
+    dialect = connection.dialect.name
+    scans = []
+
+    if dialect == 'sqlite':
+        for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters):
+            match = SQLITE_SCAN.match(row[-1])
+            if match:
+                # Alias de SQLAlchemy (users_1) → tabla; las subconsultas (anon_1) no son tablas
+                table = re.sub(r'_\d+$', '', match.group(1))
+                if table in db.metadata.tables:
+                    scans.append(table)
+
+    elif dialect == 'mysql':
+        for row in connection.exec_driver_sql('EXPLAIN ' + statement, parameters).mappings():
+            if row.get('type') == 'ALL' and not str(row.get('table', '')).startswith('<'):
+                scans.append(row['table'])
+
+    elif dialect == 'postgresql':
+        plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()
+        nodes = [(plan if isinstance(plan, list) else json.loads(plan))[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            if node.get('Node Type') == 'Seq Scan':
+                scans.append(node['Relation Name'])
+            nodes.extend(node.get('Plans', []))
+
+    return scans
+
+
+def check_query_plans(app, user, urls=INDEX_CHECK_URLS):
+    """
+    Ejecuta la verificación completa
+
+    Returns:
+        tuple: ([{'url', 'statement', 'scans'}], consultas verificadas); la lista
+               tiene las consultas que recorren tablas completas
+    """
+    from app.models import db
+
+    problems = []
+
+    with app.app_context():
+        statements = capture_statements(app, user, urls)
+        connection = db.session.connection()
+        for url, statement, parameters in statements:
+            scans = [table for table in full_scans(connection, statement, parameters)
+                     if table not in SMALL_TABLES]
+            if scans:
+                problems.append({'url': url, 'statement': statement, 'scans': scans})
+        db.session.rollback()
+
+    return problems, len(statements)
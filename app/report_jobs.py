@@ -0,0 +1,294 @@
+"""
+Reportes en segundo plano
+
+Las exportaciones grandes no se generan dentro de la petición:
+
+    1. submit_report_job() registra un ReportJob y lo entrega al pool de hilos
+    2. El cliente consulta el avance (GET /reports/jobs/<id>) o lo recibe como
+       Server-Sent Events (GET /reports/jobs/<id>/events)
+    3. Al terminar, el archivo se descarga desde /reports/jobs/<id>/download
+
+Los archivos se guardan en el almacén de app/report_store.py (nombre por
+contenido, expulsión por edad y tamaño).
+
+Cada reporte se identifica por tipo, formato y una versión de los datos
+(report_data_version): si ya existe un archivo generado, o uno en curso, para
+los mismos datos se devuelve ese trabajo en lugar de volver a generarlo.
+
+Un trabajo que no terminó en REPORT_JOB_TIMEOUT_SECONDS (el hilo o la
+instancia que lo generaba se detuvo) se marca como fallido y deja de
+reutilizarse.
+
+Con REPORT_JOB_WORKERS=0 (ej: serverless, donde el proceso se congela al
+responder) el reporte se genera dentro de la petición que lo solicita y el
+archivo se envía en esa misma respuesta: el almacén está en el disco de la
+instancia y otra petición podría llegar a una instancia distinta.
+"""
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+
+# formato → (extensión, mimetype)
+REPORT_FORMATS = {
+    'pdf': ('pdf', 'application/pdf'),
+    'excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+REPORT_TYPES = ('certifications', 'audits')
+
+# Estados de un trabajo que ya no cambian
+FINISHED_STATUSES = ('completado', 'fallido')
+
+
+def report_data_version(report_type):
+    """
+    Versión de los datos de un reporte, calculada con una sola consulta
+
+    Combina la fecha (el estado de las certificaciones depende del día), y la
+    cantidad de filas y la última modificación de cada tabla que usa el reporte.
+
+    Returns:
+        str: Hash SHA-1 en hexadecimal
+    """
+    from app.models import db, User, Certification, Audit, AuditFinding
+
+    sources = {
+        'certifications': (Certification, User),
+        'audits': (Audit, AuditFinding, User),
+    }[report_type]
+
+    columns = []
+    for model in sources:
+        columns.append(db.select(db.func.count(model.id)).scalar_subquery())
+        columns.append(db.select(db.func.max(model.updated_at)).scalar_subquery())
+
+    values = db.session.execute(db.select(*columns)).one()
+    stamp = '|'.join([report_type, datetime.now().date().isoformat()] + [str(value) for value in values])
+    return hashlib.sha1(stamp.encode('utf-8')).hexdigest()
+
+
+def report_row_count(report_type):
+    """Filas que tendrá el reporte (para calcular el avance)"""
+    from app.models import db, Certification, Audit
+
+    model = Certification if report_type == 'certifications' else Audit
+    return db.session.execute(db.select(db.func.count(model.id))).scalar()
+
+
+def runs_inline():
+    """True si no hay pool de reportes y se generan dentro de la petición (REPORT_JOB_WORKERS=0)"""
+    return current_app.extensions.get('report_jobs') is None
+
+
+def expire_stale_jobs(*criteria):
+    """
+    Marca como fallidos los trabajos en curso desde hace más de REPORT_JOB_TIMEOUT_SECONDS
+
+    Un trabajo procesando se mide desde started_at y uno pendiente desde
+    created_at. Se actualiza en su propia transacción.
+
+    Args:
+        criteria: Condiciones adicionales (ej: ReportJob.id == job_id)
+
+    Returns:
+        int: Trabajos marcados
+    """
+    from app.models import db, ReportJob
+
+    now = datetime.now()
+    cutoff = now - timedelta(seconds=current_app.config.get('REPORT_JOB_TIMEOUT_SECONDS', 600))
+    stale = db.or_(
+        db.and_(ReportJob.status == 'procesando', ReportJob.started_at < cutoff),
+        db.and_(ReportJob.status == 'pendiente', ReportJob.created_at < cutoff)
+    )
+    with db.engine.begin() as connection:
+        return connection.execute(
+            ReportJob.__table__.update().where(stale, *criteria)
+            .values(status='fallido', error='El reporte no terminó a tiempo, solicítelo de nuevo', finished_at=now)
+        ).rowcount
+
+
+def find_reusable_job(report_type, format, data_version):
+    """
+    Trabajo existente para los mismos datos: terminado con su archivo aún en el
+    almacén, o en curso desde hace menos de REPORT_JOB_TIMEOUT_SECONDS
+
+    Returns:
+        ReportJob o None
+    """
+    from app.models import ReportJob
+    from app.report_store import ReportArtifactStore
+
+    criteria = (
+        ReportJob.report_type == report_type,
+        ReportJob.format == format,
+        ReportJob.data_version == data_version
+    )
+    # Los que quedaron en curso sin terminar no se vuelven a entregar
+    expire_stale_jobs(*criteria)
+
+    jobs = ReportJob.query.filter(
+        *criteria,
+        ReportJob.status.in_(('pendiente', 'procesando', 'completado'))
+    ).order_by(ReportJob.id.desc()).limit(5).all()
+
+    for job in jobs:
+        if job.status != 'completado':
+            return job
+        # Reutilizarlo lo vuelve el más reciente del LRU
+        if job.artifact_path and ReportArtifactStore.from_config().touch(job.artifact_path):
+            return job
+    return None
+
+
+def submit_report_job(report_type, format, user_id=None):
+    """
+    Solicita un reporte: reutiliza uno existente o crea un trabajo nuevo
+
+    Returns:
+        ReportJob: Trabajo (puede estar ya completado)
+    """
+    from app.models import db, ReportJob
+
+    if report_type not in REPORT_TYPES:
+        raise ValueError(f'Tipo de reporte no válido: {report_type}')
+    if format not in REPORT_FORMATS:
+        raise ValueError(f'Formato no válido: {format}')
+
+    data_version = report_data_version(report_type)
+    job = find_reusable_job(report_type, format, data_version)
+    if job is not None:
+        return job
+
+    job = ReportJob(report_type=report_type, format=format, data_version=data_version, requested_by=user_id)
+    db.session.add(job)
+    db.session.commit()
+
+    if runs_inline():
+        run_report_job(job.id)
+        db.session.refresh(job)
+    else:
+        current_app.extensions['report_jobs'].submit(job.id)
+    return job
+
+
+def _update_job(job_id, **values):
+    """Actualiza el trabajo en su propia transacción (no toca la sesión ni sus cursores)"""
+    from app.models import db, ReportJob
+
+    with db.engine.begin() as connection:
+        connection.execute(ReportJob.__table__.update().where(ReportJob.id == job_id).values(**values))
+
+
+def _progress_reporter(job):
+    """
+    Función de avance para generate_excel_report: registra el porcentaje cada 5 %
+
+    En SQLite no se registra avance intermedio: mientras el cursor del reporte
+    está abierto la base no acepta escrituras de otra conexión.
+    """
+    from app.models import db
+
+    if db.engine.dialect.name == 'sqlite':
+        return None
+
+    total = report_row_count(job.report_type) or 1
+    last = {'progress': 0}
+
+    def progress(rows):
+        value = min(99, rows * 100 // total)
+        if value - last['progress'] >= 5:
+            last['progress'] = value
+            try:
+                _update_job(job.id, progress=value)
+            except Exception as e:
+                print(f"Error registrando el avance del reporte {job.id}: {e}")
+
+    return progress
+
+
+def run_report_job(job_id):
+    """
+    Genera el archivo de un trabajo pendiente (requiere contexto de aplicación)
+
+    El reporte se arma en un SpooledTemporaryFile y después se copia al almacén,
+    que solo lo publica con su nombre final cuando está completo.
+    """
+    from app.models import db, ReportJob
+    from app.report_store import ReportArtifactStore
+    from app.utils import generate_pdf_report, generate_excel_report, new_report_spool
+
+    # Reserva del trabajo: si otro hilo ya lo tomó, el UPDATE no afecta filas
+    with db.engine.begin() as connection:
+        claimed = connection.execute(
+            ReportJob.__table__.update()
+            .where(ReportJob.id == job_id, ReportJob.status == 'pendiente')
+            .values(status='procesando', started_at=datetime.now(), progress=0)
+        ).rowcount
+    if not claimed:
+        return
+
+    job = db.session.get(ReportJob, job_id)
+    store = ReportArtifactStore.from_config()
+
+    try:
+        with new_report_spool() as output:
+            if job.format == 'pdf':
+                generate_pdf_report(job.report_type, output=output)
+            else:
+                generate_excel_report(job.report_type, output=output, progress=_progress_reporter(job))
+            db.session.rollback()
+            path = store.put(output, REPORT_FORMATS[job.format][0])
+
+        _update_job(job_id, status='completado', progress=100, artifact_path=path, finished_at=datetime.now())
+
+    except Exception as e:
+        db.session.rollback()
+        _update_job(job_id, status='fallido', error=str(e)[:500], finished_at=datetime.now())
+        print(f"Error generando el reporte {job_id}: {e}")
+        return
+
+    try:
+        store.evict()
+    except Exception as e:
+        print(f"Error limpiando el almacén de reportes: {e}")
+
+
+class ReportJobRunner:
+    """Pool de hilos que genera los reportes solicitados"""
+
+    def __init__(self, app, workers=None):
+        self.app = app
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers or app.config.get('REPORT_JOB_WORKERS', 2),
+            thread_name_prefix='report-job'
+        )
+
+    def submit(self, job_id):
+        return self.executor.submit(self._run, job_id)
+
+    def _run(self, job_id):
+        from app.models import db
+
+        with self.app.app_context():
+            try:
+                run_report_job(job_id)
+            finally:
+                db.session.remove()
+
+    def stop(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+def init_report_jobs(app):
+    """Crea el pool de reportes si REPORT_JOB_WORKERS es mayor que 0 (los hilos se inician al usarlo)"""
+    if app.config.get('REPORT_JOB_WORKERS', 0) <= 0:
+        return None
+
+    import atexit
+
+    runner = ReportJobRunner(app)
+    app.extensions['report_jobs'] = runner
+    atexit.register(runner.stop, wait=False)
+    return runner
@@ -0,0 +1,187 @@
+"""
+Almacén de archivos de reportes
+
+Los reportes de app/report_jobs.py se guardan en REPORT_ARTIFACT_FOLDER con el
+hash SHA-256 de su contenido como nombre: dos trabajos que producen el mismo
+archivo comparten una sola copia.
+
+El espacio se controla con dos límites:
+    • Edad: se eliminan los archivos sin usar hace más de REPORT_STORE_MAX_AGE_HOURS
+    • Tamaño: si la carpeta supera REPORT_STORE_MAX_BYTES se eliminan los usados
+      hace más tiempo (LRU) hasta quedar dentro del límite
+
+La fecha de modificación de cada archivo marca su último uso: se actualiza al
+reutilizarlo o descargarlo. La limpieza corre después de guardar cada reporte
+y con "flask --app app cleanup-reports".
+
+Las exportaciones directas (sin trabajo) no pasan por aquí: se generan en un
+SpooledTemporaryFile y se envían desde memoria (ver new_report_spool en app/utils.py).
+"""
+import hashlib
+import os
+import re
+import tempfile
+import time
+from flask import current_app
+
+COPY_CHUNK = 1024 * 1024
+
+# Temporales de escritura abandonados (proceso interrumpido a mitad de un reporte)
+STALE_TEMP_SECONDS = 3600
+
+# Reportes que generate_pdf_report dejaba en UPLOAD_FOLDER antes del almacén
+LEGACY_REPORT_NAME = re.compile(r'^reporte_[a-z]+_\d{8}_\d{6}\.(pdf|xlsx)$')
+
+
+class ReportArtifactStore:
+    """Carpeta de reportes con nombres por contenido y expulsión por edad y tamaño"""
+
+    def __init__(self, folder, max_bytes=0, max_age_seconds=0):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Almacén configurado con REPORT_ARTIFACT_FOLDER y los límites REPORT_STORE_*"""
+        config = config or current_app.config
+        folder = config.get('REPORT_ARTIFACT_FOLDER') or os.path.join(config['UPLOAD_FOLDER'], 'reports')
+        return cls(
+            folder,
+            max_bytes=config.get('REPORT_STORE_MAX_BYTES', 0),
+            max_age_seconds=config.get('REPORT_STORE_MAX_AGE_HOURS', 0) * 3600
+        )
+
+    def put(self, source, extension):
+        """
+        Guarda el contenido de source (file-like, desde su posición actual)
+
+        El hash se calcula mientras se copia a un temporal de la carpeta, que
+        luego se renombra a <hash>.<extension>. Si ese archivo ya existía se
+        descarta la copia y solo se marca como usado.
+
+        Returns:
+            str: Ruta del archivo en el almacén
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        digest = hashlib.sha256()
+        descriptor, temp_path = tempfile.mkstemp(dir=self.folder, suffix='.tmp')
+
+        try:
+            with os.fdopen(descriptor, 'wb') as target:
+                for chunk in iter(lambda: source.read(COPY_CHUNK), b''):
+                    digest.update(chunk)
+                    target.write(chunk)
+
+            path = os.path.join(self.folder, f'{digest.hexdigest()}.{extension}')
+            if os.path.exists(path):
+                os.remove(temp_path)
+                self.touch(path)
+            else:
+                os.replace(temp_path, path)
+            return path
+
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def touch(self, path):
+        """
+        Marca el archivo como usado ahora (posición más reciente del LRU)
+
+        Returns:
+            bool: False si el archivo ya no existe (fue expulsado)
+        """
+        try:
+            os.utime(path, None)
+            return True
+        except OSError:
+            return False
+
+    def entries(self):
+        """
+        Archivos del almacén
+
+        Returns:
+            tuple: ([(último_uso, tamaño, ruta)] de los reportes, [(último_uso, ruta)] de los temporales)
+        """
+        artifacts, temps = [], []
+        if not os.path.isdir(self.folder):
+            return artifacts, temps
+
+        with os.scandir(self.folder) as scan:
+            for entry in scan:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                if entry.name.endswith('.tmp'):
+                    temps.append((stat.st_mtime, entry.path))
+                else:
+                    artifacts.append((stat.st_mtime, stat.st_size, entry.path))
+        return artifacts, temps
+
+    def evict(self, dry_run=False, now=None):
+        """
+        Aplica los límites de edad y tamaño
+
+        Returns:
+            dict: {'removed', 'freed_bytes', 'kept', 'kept_bytes', 'paths'}
+        """
+        now = now or time.time()
+        artifacts, temps = self.entries()
+        doomed = [path for mtime, path in temps if now - mtime > STALE_TEMP_SECONDS]
+
+        # Los usados hace más tiempo primero
+        artifacts.sort()
+        kept = []
+        for mtime, size, path in artifacts:
+            if self.max_age_seconds and now - mtime > self.max_age_seconds:
+                doomed.append(path)
+            else:
+                kept.append((size, path))
+
+        total = sum(size for size, _ in kept)
+        while self.max_bytes and total > self.max_bytes and kept:
+            size, path = kept.pop(0)
+            doomed.append(path)
+            total -= size
+
+        freed = 0
+        for path in doomed:
+            try:
+                size = os.path.getsize(path)
+                if not dry_run:
+                    os.remove(path)
+                freed += size
+            except OSError:
+                pass
+
+        return {
+            'removed': len(doomed),
+            'freed_bytes': freed,
+            'kept': len(kept),
+            'kept_bytes': total,
+            'paths': doomed
+        }
+
+
+def remove_legacy_reports(upload_folder, dry_run=False):
+    """
+    Elimina los reporte_<tipo>_<fecha>.pdf/.xlsx sueltos en UPLOAD_FOLDER
+
+    Returns:
+        tuple: (archivos, bytes)
+    """
+    removed, freed = 0, 0
+    if not os.path.isdir(upload_folder):
+        return removed, freed
+
+    with os.scandir(upload_folder) as scan:
+        for entry in scan:
+            if entry.is_file() and LEGACY_REPORT_NAME.match(entry.name):
+                freed += entry.stat().st_size
+                removed += 1
+                if not dry_run:
+                    os.remove(entry.path)
+    return removed, freed
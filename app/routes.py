@@ -1,10 +1,16 @@
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, send_file, send_from_directory, current_app, abort
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, send_file, current_app, abort
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.utils import secure_filename
 from datetime import datetime, timedelta
 import os
-from app.models import db, User, Certification, Audit, AuditFinding, Policy, PolicyConfirmation, Alert, AuditLog, UserRole, CertificationStatus
-from app.utils import allowed_file, save_upload_file, send_email_alert, generate_pdf_report, generate_excel_report
+from app.models import db, User, Certification, Audit, AuditFinding, Policy, PolicyConfirmation, Alert, AuditLog, ReportJob, UserRole, CertificationStatus
+from app.utils import allowed_file, send_email_alert, generate_pdf_report, generate_excel_report, load_certification_report_data, load_audit_report_data
+from app.permissions import PermissionMatrix, invalidate_permissions
+from app.user_cache import invalidate_user_versions
+from app.dashboard import get_dashboard_summary, empty_dashboard_summary
+from app.audit_log import filter_audit_log, paginate_audit_log, get_audit_log_stats
+from app.audit_writer import record_action, queue_action
+from app.document_store import store_document
 
 # Blueprints
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
@@ -48,18 +54,8 @@ def login():
             
             login_user(user, remember=request.form.get('remember_me'))
             
-            # Registrar en audit log
-            try:
-                log_entry = AuditLog(
-                    user_id=user.id,
-                    action='login',
-                    ip_address=request.remote_addr
-                )
-                db.session.add(log_entry)
-                db.session.commit()
-            except Exception as e:
-                print(f"Error al registrar login en auditoría: {e}")
-                db.session.rollback()
+            # Registrar en audit log (se escribe por lotes, sin commit en la petición)
+            queue_action('login', user_id=user.id)
             
             next_page = request.args.get('next')
             if not next_page or not url_has_allowed_host_and_scheme(next_page):
@@ -86,17 +82,7 @@ def login():
 @login_required
 def logout():
     """Cerrar sesión"""
-    try:
-        log_entry = AuditLog(
-            user_id=current_user.id,
-            action='logout',
-            ip_address=request.remote_addr
-        )
-        db.session.add(log_entry)
-        db.session.commit()
-    except Exception as e:
-        print(f"Error al registrar logout: {e}")
-        db.session.rollback()
+    queue_action('logout')
     
     logout_user()
     flash('Has cerrado sesión exitosamente.', 'info')
@@ -118,17 +104,8 @@ def url_has_allowed_host_and_scheme(url, allowed_hosts=None, require_https=False
 def index():
     """Panel de control principal"""
     try:
-        # Datos para el dashboard
-        total_certifications = Certification.query.count()
-        vigent_certifications = Certification.query.filter_by(status=CertificationStatus.VIGENTE.value).count()
-        expiring_certifications = Certification.query.filter_by(status=CertificationStatus.PROXIMA_VENCER.value).count()
-        expired_certifications = Certification.query.filter_by(status=CertificationStatus.VENCIDA.value).count()
-        
-        total_audits = Audit.query.count()
-        completed_audits = Audit.query.filter_by(status='completada').count()
-        scheduled_audits = Audit.query.filter_by(status='programada').count()
-        
-        total_policies = Policy.query.filter_by(is_active=True).count()
+        # Contadores del dashboard (una consulta agrupada, con caché)
+        context = get_dashboard_summary()
         
         # Certificaciones próximas a vencer (próximos 30 días)
         upcoming_certifications = Certification.query.filter(
@@ -142,44 +119,34 @@ def index():
         # Alertas pendientes
         pending_alerts = Alert.query.filter_by(is_read=False).order_by(Alert.created_at.desc()).limit(5).all()
         
-        context = {
-            'total_certifications': total_certifications,
-            'vigent_certifications': vigent_certifications,
-            'expiring_certifications': expiring_certifications,
-            'expired_certifications': expired_certifications,
-            'total_audits': total_audits,
-            'completed_audits': completed_audits,
-            'scheduled_audits': scheduled_audits,
-            'total_policies': total_policies,
+        context.update({
             'upcoming_certifications': upcoming_certifications,
             'recent_audits': recent_audits,
-            'pending_alerts': pending_alerts,
-            'certification_percentage': int((vigent_certifications / total_certifications * 100) if total_certifications > 0 else 0),
-            'audit_percentage': int((completed_audits / total_audits * 100) if total_audits > 0 else 0)
-        }
+            'pending_alerts': pending_alerts
+        })
         
         return render_template('dashboard/index.html', **context)
     
     except Exception as e:
         # Si hay error de BD, mostrar dashboard vacío
         flash(f'Advertencia: Error al cargar datos. {str(e)}', 'warning')
-        context = {
-            'total_certifications': 0,
-            'vigent_certifications': 0,
-            'expiring_certifications': 0,
-            'expired_certifications': 0,
-            'total_audits': 0,
-            'completed_audits': 0,
-            'scheduled_audits': 0,
-            'total_policies': 0,
+        context = empty_dashboard_summary()
+        context.update({
             'upcoming_certifications': [],
             'recent_audits': [],
-            'pending_alerts': [],
-            'certification_percentage': 0,
-            'audit_percentage': 0
-        }
+            'pending_alerts': []
+        })
         return render_template('dashboard/index.html', **context)
 
+@dashboard_bp.route('/summary')
+@login_required
+def summary():
+    """Contadores del dashboard en JSON para refrescar la página sin recargarla"""
+    try:
+        return jsonify({'success': True, 'summary': get_dashboard_summary()})
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error al cargar datos: {str(e)}'}), 500
+
 @dashboard_bp.route('/alerts/mark-as-read/<int:alert_id>', methods=['POST'])
 @login_required
 def mark_alert_as_read(alert_id):
@@ -199,14 +166,11 @@ def list_certifications():
     
     query = Certification.query
     
+    # El estado se deriva de expiration_date (rango indexado, sin recalcular fila por fila)
     if status_filter != 'all':
-        query = query.filter_by(status=status_filter)
+        query = query.filter(Certification.status_filter(status_filter))
     
-    certifications = query.paginate(page=page, per_page=10)
-    
-    # Actualizar estados
-    for cert in certifications.items:
-        cert.get_status()
+    certifications = query.order_by(Certification.expiration_date, Certification.id).paginate(page=page, per_page=10)
     
     return render_template('certifications/list.html', certifications=certifications, status_filter=status_filter)
 
@@ -233,12 +197,12 @@ def new_certification():
                 flash('La fecha de vencimiento debe ser posterior a la de emisión.', 'danger')
                 return redirect(url_for('certifications.new_certification'))
             
-            # Guardar documento si se adjuntó
-            document_path = None
+            # Guardar documento si se adjuntó (por contenido, ver app/document_store.py)
+            document = None
             if 'document' in request.files:
                 file = request.files['document']
                 if file and allowed_file(file.filename):
-                    document_path = save_upload_file(file, 'certifications')
+                    document = store_document(file)
             
             certification = Certification(
                 name=name,
@@ -247,22 +211,17 @@ def new_certification():
                 emission_date=emission_date,
                 expiration_date=expiration_date,
                 responsible_id=responsible_id,
-                document_path=document_path,
                 notes=notes
             )
+            if document:
+                certification.set_document(*document)
             
-            certification.get_status()
+            certification.status = certification.current_status
             db.session.add(certification)
+            db.session.flush()
             
             # Audit log
-            log_entry = AuditLog(
-                user_id=current_user.id,
-                action='create',
-                entity_type='certification',
-                entity_id=certification.id if certification.id else 'new',
-                ip_address=request.remote_addr
-            )
-            db.session.add(log_entry)
+            record_action('create', entity_type='certification', entity_id=certification.id)
             db.session.commit()
             
             flash(f'Certificación "{name}" registrada exitosamente.', 'success')
@@ -275,11 +234,50 @@ def new_certification():
     users = User.query.filter_by(is_active=True).all()
     return render_template('certifications/new.html', users=users)
 
+def handle_import(entity_type, list_endpoint):
+    """
+    Formulario y resultado de la importación masiva (ver app/bulk_import.py)
+    
+    Compartido por certificaciones y auditorías.
+    """
+    from app.bulk_import import IMPORT_COLUMNS, REQUIRED_COLUMNS, import_records
+    
+    result = None
+    if request.method == 'POST':
+        file = request.files.get('file')
+        if not file or file.filename == '':
+            flash('Seleccione un archivo .xlsx o .csv.', 'danger')
+            return redirect(request.url)
+        
+        try:
+            result = import_records(entity_type, file.stream, file.filename, current_user.id,
+                                    dry_run=request.form.get('dry_run') == '1')
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(request.url)
+        
+        if result.dry_run:
+            flash(f'Validación terminada: {result.total - result.failed} de {result.total} filas son válidas.', 'info')
+        elif result.inserted:
+            flash(f'Se importaron {result.inserted} de {result.total} filas.', 'success' if not result.failed else 'warning')
+        else:
+            flash('No se importó ninguna fila.', 'danger')
+    
+    return render_template('imports/import.html', entity_type=entity_type, list_endpoint=list_endpoint,
+                           columns=IMPORT_COLUMNS[entity_type], required=REQUIRED_COLUMNS[entity_type],
+                           result=result)
+
+@certifications_bp.route('/import', methods=['GET', 'POST'])
+@login_required
+def import_certifications():
+    """Importar certificaciones desde Excel o CSV"""
+    return handle_import('certifications', 'certifications.list_certifications')
+
 @certifications_bp.route('/<int:cert_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_certification(cert_id):
     """Editar certificación"""
-    from app.utils import log_action, get_entity_changes
+    from app.utils import get_entity_changes
     
     certification = Certification.query.get_or_404(cert_id)
     
@@ -316,13 +314,13 @@ def edit_certification(cert_id):
             certification.responsible_id = new_data['responsible_id']
             certification.notes = new_data['notes']
             
-            # Guardar nuevo documento si se adjuntó
+            # Guardar nuevo documento si se adjuntó; el anterior pierde su referencia
             if 'document' in request.files:
                 file = request.files['document']
                 if file and allowed_file(file.filename):
-                    certification.document_path = save_upload_file(file, 'certifications')
+                    certification.set_document(*store_document(file))
             
-            certification.get_status()
+            certification.status = certification.current_status
             certification.updated_at = datetime.now()
             
             # Detectar cambios para audit log
@@ -333,14 +331,7 @@ def edit_certification(cert_id):
             )
             
             # Audit log con cambios específicos
-            log_action(
-                user_id=current_user.id,
-                action='update',
-                entity_type='certification',
-                entity_id=cert_id,
-                changes=changes,
-                ip_address=request.remote_addr
-            )
+            record_action('update', entity_type='certification', entity_id=cert_id, changes=changes)
             
             db.session.commit()
             
@@ -364,21 +355,14 @@ def delete_certification(cert_id):
         return redirect(url_for('certifications.list_certifications'))
     
     try:
-        # Eliminar archivo si existe
-        if certification.document_path and os.path.exists(certification.document_path):
-            os.remove(certification.document_path)
+        # El documento puede estar compartido: se quita la referencia y el
+        # recolector (flask gc-documents) borra el archivo si nadie más lo usa
+        certification.set_document(None)
         
         db.session.delete(certification)
         
         # Audit log
-        log_entry = AuditLog(
-            user_id=current_user.id,
-            action='delete',
-            entity_type='certification',
-            entity_id=cert_id,
-            ip_address=request.remote_addr
-        )
-        db.session.add(log_entry)
+        record_action('delete', entity_type='certification', entity_id=cert_id)
         db.session.commit()
         
         flash('Certificación eliminada exitosamente.', 'success')
@@ -390,17 +374,33 @@ def delete_certification(cert_id):
 @certifications_bp.route('/document/<int:cert_id>')
 @login_required
 def view_document(cert_id):
-    """Servir documento de certificación para vista previa"""
-    certification = Certification.query.get_or_404(cert_id)
+    """Servir documento de certificación para vista previa (ETag, 304 y Range)"""
+    from app.utils import send_document
     
-    if not certification.document_path or not os.path.exists(certification.document_path):
+    # Solo las columnas del documento; no se carga la certificación completa
+    document = db.session.query(
+        Certification.document_path,
+        Certification.document_hash,
+        Certification.document_updated_at
+    ).filter(Certification.id == cert_id).first()
+    
+    if document is None or not document.document_path:
         abort(404, description="Documento no encontrado")
     
-    # Obtener el directorio y nombre del archivo
-    directory = os.path.dirname(certification.document_path)
-    filename = os.path.basename(certification.document_path)
+    document_hash = document.document_hash
+    if document_hash is None:
+        # Documento subido antes de guardar hashes: se calcula una sola vez
+        if not os.path.exists(document.document_path):
+            abort(404, description="Documento no encontrado")
+        from app.utils import file_content_hash
+        document_hash = file_content_hash(document.document_path)
+        db.session.execute(
+            db.update(Certification).where(Certification.id == cert_id)
+            .values(document_hash=document_hash, updated_at=Certification.updated_at)
+        )
+        db.session.commit()
     
-    return send_from_directory(directory, filename)
+    return send_document(document.document_path, document_hash, document.document_updated_at)
 
 # ============ AUDITORÍAS ============
 @audits_bp.route('/')
@@ -420,7 +420,11 @@ def list_audits():
     
     audits = query.order_by(Audit.scheduled_date.desc()).paginate(page=page, per_page=10)
     
-    return render_template('audits/list.html', audits=audits, status_filter=status_filter, type_filter=type_filter)
+    # Conteo de hallazgos de toda la página en una sola consulta
+    findings_stats = Audit.get_findings_stats_bulk([audit.id for audit in audits.items])
+    
+    return render_template('audits/list.html', audits=audits, findings_stats=findings_stats,
+                         status_filter=status_filter, type_filter=type_filter)
 
 @audits_bp.route('/new', methods=['GET', 'POST'])
 @login_required
@@ -451,14 +455,7 @@ def new_audit():
             db.session.flush()
             
             # Audit log
-            log_entry = AuditLog(
-                user_id=current_user.id,
-                action='create',
-                entity_type='audit',
-                entity_id=audit.id,
-                ip_address=request.remote_addr
-            )
-            db.session.add(log_entry)
+            record_action('create', entity_type='audit', entity_id=audit.id)
             db.session.commit()
             
             flash('Auditoría programada exitosamente.', 'success')
@@ -470,15 +467,23 @@ def new_audit():
     users = User.query.filter_by(is_active=True).all()
     return render_template('audits/new.html', users=users)
 
+@audits_bp.route('/import', methods=['GET', 'POST'])
+@login_required
+def import_audits():
+    """Importar auditorías desde Excel o CSV"""
+    return handle_import('audits', 'audits.list_audits')
+
 @audits_bp.route('/<int:audit_id>/view')
 @login_required
 def view_audit(audit_id):
     """Ver detalles de auditoría"""
     audit = Audit.query.get_or_404(audit_id)
     findings = audit.findings.all()
+    findings_stats = audit.get_findings_stats()
     today = datetime.now().date()
     
-    return render_template('audits/view.html', audit=audit, findings=findings, today=today)
+    return render_template('audits/view.html', audit=audit, findings=findings,
+                         findings_stats=findings_stats, today=today)
 
 @audits_bp.route('/<int:audit_id>/edit', methods=['GET', 'POST'])
 @login_required
@@ -497,14 +502,7 @@ def edit_audit(audit_id):
             audit.status = request.form.get('status', 'programada')
             
             # Audit log
-            log_entry = AuditLog(
-                user_id=current_user.id,
-                action='update',
-                entity_type='audit',
-                entity_id=audit_id,
-                ip_address=request.remote_addr
-            )
-            db.session.add(log_entry)
+            record_action('update', entity_type='audit', entity_id=audit_id)
             db.session.commit()
             
             flash('Auditoría actualizada exitosamente.', 'success')
@@ -603,17 +601,8 @@ def close_finding(audit_id, finding_id):
         finding.status = 'cerrado'
         finding.notes = request.form.get('closure_notes', '')
         
-        db.session.commit()
-        
-        # Registrar en audit log
-        log_entry = AuditLog(
-            user_id=current_user.id,
-            action='close_finding',
-            entity_type='audit_finding',
-            entity_id=finding_id,
-            ip_address=request.remote_addr
-        )
-        db.session.add(log_entry)
+        # Registrar en audit log (mismo commit que el cambio)
+        record_action('close_finding', entity_type='audit_finding', entity_id=finding_id)
         db.session.commit()
         
         flash('Hallazgo cerrado exitosamente.', 'success')
@@ -637,17 +626,8 @@ def reopen_finding(audit_id, finding_id):
     try:
         finding.status = 'abierto'
         
-        db.session.commit()
-        
-        # Registrar en audit log
-        log_entry = AuditLog(
-            user_id=current_user.id,
-            action='reopen_finding',
-            entity_type='audit_finding',
-            entity_id=finding_id,
-            ip_address=request.remote_addr
-        )
-        db.session.add(log_entry)
+        # Registrar en audit log (mismo commit que el cambio)
+        record_action('reopen_finding', entity_type='audit_finding', entity_id=finding_id)
         db.session.commit()
         
         flash('Hallazgo reabierto exitosamente.', 'info')
@@ -685,7 +665,10 @@ def delete_finding(audit_id, finding_id):
 def list_policies():
     """Listar políticas"""
     page = request.args.get('page', 1, type=int)
-    policies = Policy.query.filter_by(is_active=True).paginate(page=page, per_page=10)
+    policies = Policy.query.filter_by(is_active=True).order_by(Policy.effective_date.desc()).paginate(page=page, per_page=10)
+    
+    # Porcentajes de confirmación de la página en una sola consulta
+    Policy.preload_confirmation_stats(policies.items)
     
     return render_template('policies/list.html', policies=policies)
 
@@ -720,24 +703,11 @@ def new_policy():
             db.session.add(policy)
             db.session.flush()
             
-            # Crear confirmaciones para todos los usuarios activos
-            users = User.query.filter_by(is_active=True).all()
-            for user in users:
-                confirmation = PolicyConfirmation(
-                    policy_id=policy.id,
-                    user_id=user.id
-                )
-                db.session.add(confirmation)
+            # Crear confirmaciones para todos los usuarios activos (un solo INSERT ... SELECT)
+            PolicyConfirmation.enroll_active_users(policy.id)
             
             # Audit log
-            log_entry = AuditLog(
-                user_id=current_user.id,
-                action='create',
-                entity_type='policy',
-                entity_id=policy.id,
-                ip_address=request.remote_addr
-            )
-            db.session.add(log_entry)
+            record_action('create', entity_type='policy', entity_id=policy.id)
             db.session.commit()
             
             flash('Política creada exitosamente.', 'success')
@@ -752,8 +722,6 @@ def new_policy():
 @login_required
 def view_policy(policy_id):
     """Ver detalles de política"""
-    from app.utils import log_action
-    
     policy = Policy.query.get_or_404(policy_id)
     confirmations = PolicyConfirmation.query.filter_by(policy_id=policy_id).all()
     confirmed_count = sum(1 for c in confirmations if c.confirmed)
@@ -768,14 +736,8 @@ def view_policy(policy_id):
         ).first()
         user_confirmed = user_confirmation.confirmed if user_confirmation else False
     
-    # Registrar que el usuario vio esta política
-    log_action(
-        user_id=current_user.id,
-        action='view_policy',
-        entity_type='policy',
-        entity_id=policy_id,
-        ip_address=request.remote_addr
-    )
+    # Registrar que el usuario vio esta política (lectura: se escribe por lotes)
+    queue_action('view_policy', entity_type='policy', entity_id=policy_id)
     
     # Obtener historial de cambios de esta política
     policy_history = AuditLog.query.filter_by(
@@ -797,29 +759,10 @@ def confirm_policy(policy_id):
     """Confirmar cumplimiento de política"""
     policy = Policy.query.get_or_404(policy_id)
     
-    confirmation = PolicyConfirmation.query.filter_by(
-        policy_id=policy_id,
-        user_id=current_user.id
-    ).first()
-    
-    if not confirmation:
-        confirmation = PolicyConfirmation(
-            policy_id=policy_id,
-            user_id=current_user.id
-        )
-        db.session.add(confirmation)
-    
-    confirmation.mark_confirmed(ip_address=request.remote_addr)
+    PolicyConfirmation.confirm(policy_id, current_user.id, ip_address=request.remote_addr)
     
     # Audit log
-    log_entry = AuditLog(
-        user_id=current_user.id,
-        action='confirm_policy',
-        entity_type='policy_confirmation',
-        entity_id=policy_id,
-        ip_address=request.remote_addr
-    )
-    db.session.add(log_entry)
+    record_action('confirm_policy', entity_type='policy_confirmation', entity_id=policy_id)
     db.session.commit()
     
     flash('Política confirmada exitosamente.', 'success')
@@ -829,7 +772,7 @@ def confirm_policy(policy_id):
 @login_required
 def edit_policy(policy_id):
     """Editar política existente"""
-    from app.utils import log_action, get_entity_changes
+    from app.utils import get_entity_changes
     
     if current_user.role != UserRole.ADMINISTRADOR.value:
         flash('Solo administradores pueden editar políticas.', 'danger')
@@ -883,14 +826,7 @@ def edit_policy(policy_id):
             )
             
             # Audit log
-            log_action(
-                user_id=current_user.id,
-                action='update',
-                entity_type='policy',
-                entity_id=policy_id,
-                changes=changes,
-                ip_address=request.remote_addr
-            )
+            record_action('update', entity_type='policy', entity_id=policy_id, changes=changes)
             
             db.session.commit()
             
@@ -907,8 +843,6 @@ def edit_policy(policy_id):
 @login_required
 def delete_policy(policy_id):
     """Eliminar política"""
-    from app.utils import log_action
-    
     if current_user.role != UserRole.ADMINISTRADOR.value:
         flash('Solo administradores pueden eliminar políticas.', 'danger')
         return redirect(url_for('policies.list_policies'))
@@ -918,14 +852,7 @@ def delete_policy(policy_id):
     
     try:
         # Audit log antes de eliminar
-        log_action(
-            user_id=current_user.id,
-            action='delete',
-            entity_type='policy',
-            entity_id=policy_id,
-            changes={'title': policy_title},
-            ip_address=request.remote_addr
-        )
+        record_action('delete', entity_type='policy', entity_id=policy_id, changes={'title': policy_title})
         
         db.session.delete(policy)
         db.session.commit()
@@ -948,57 +875,218 @@ def index():
 @login_required
 def certifications_report():
     """Reporte de certificaciones"""
-    certifications = Certification.query.all()
-    for cert in certifications:
-        cert.get_status()
+    certifications = load_certification_report_data()
     
     return render_template('reports/certifications.html', certifications=certifications)
 
+def send_report(report_type, format):
+    """
+    Genera y envía el reporte sin dejar archivos en disco
+    
+    El archivo queda en memoria si es pequeño (REPORT_SPOOL_MAX_SIZE) o en un
+    temporal anónimo que se elimina al cerrar la respuesta.
+    """
+    from app.report_jobs import REPORT_FORMATS
+    
+    extension, mimetype = REPORT_FORMATS[format]
+    output = generate_pdf_report(report_type) if format == 'pdf' else generate_excel_report(report_type)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return send_file(
+        output,
+        as_attachment=True,
+        download_name=f'reporte_{report_type}_{timestamp}.{extension}',
+        mimetype=mimetype
+    )
+
 @reports_bp.route('/certifications/export/<format>')
 @login_required
 def export_certifications(format):
     """Exportar reporte de certificaciones"""
-    certifications = Certification.query.all()
-    
-    if format == 'pdf':
-        file_path = generate_pdf_report('certifications', certifications)
-    elif format == 'excel':
-        file_path = generate_excel_report('certifications', certifications)
-    else:
+    if format not in ('pdf', 'excel'):
         flash('Formato no válido.', 'danger')
         return redirect(url_for('reports.certifications_report'))
     
-    return send_file(file_path, as_attachment=True)
+    return send_report('certifications', format)
 
 @reports_bp.route('/audits')
 @login_required
 def audits_report():
     """Reporte de auditorías"""
-    audits = Audit.query.all()
+    audits = load_audit_report_data()
     
     return render_template('reports/audits.html', audits=audits)
 
+@reports_bp.route('/audits/export/<format>')
+@login_required
+def export_audits(format):
+    """Exportar reporte de auditorías"""
+    if format not in ('pdf', 'excel'):
+        flash('Formato no válido.', 'danger')
+        return redirect(url_for('reports.audits_report'))
+    
+    return send_report('audits', format)
+
+# ---------- Reportes en segundo plano (ver app/report_jobs.py) ----------
+
+def report_job_response(job, status_code=200):
+    """Estado del trabajo en JSON con las URLs para seguirlo y descargarlo"""
+    data = job.to_dict()
+    data.update({
+        'status_url': url_for('reports.report_job_status', job_id=job.id),
+        'events_url': url_for('reports.report_job_events', job_id=job.id),
+        'download_url': url_for('reports.download_report', job_id=job.id)
+    })
+    return jsonify(data), status_code
+
+@reports_bp.route('/jobs', methods=['POST'])
+@login_required
+def submit_report():
+    """
+    Solicitar la exportación de un reporte (report_type, format)
+    
+    Responde con el estado del trabajo en JSON o, si el reporte se generó
+    dentro de la petición (REPORT_JOB_WORKERS=0), con el archivo.
+    """
+    from app.report_jobs import submit_report_job, runs_inline
+    
+    payload = request.get_json(silent=True) or request.form
+    
+    try:
+        job = submit_report_job(payload.get('report_type'), payload.get('format'), user_id=current_user.id)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    # Sin pool (serverless) el archivo está en el disco de esta instancia: se envía en esta respuesta
+    if runs_inline() and job.status == 'completado':
+        return send_report_artifact(job)
+    
+    return report_job_response(job, 200 if job.status == 'completado' else 202)
+
+@reports_bp.route('/jobs/<int:job_id>')
+@login_required
+def report_job_status(job_id):
+    """Estado y avance de un trabajo de reporte"""
+    from app.report_jobs import expire_stale_jobs
+    
+    expire_stale_jobs(ReportJob.id == job_id)
+    job = ReportJob.query.get_or_404(job_id)
+    return report_job_response(job)
+
+@reports_bp.route('/jobs/<int:job_id>/events')
+@login_required
+def report_job_events(job_id):
+    """Avance del trabajo como Server-Sent Events, hasta que termina"""
+    import json
+    import time
+    from flask import Response, stream_with_context
+    from app.report_jobs import FINISHED_STATUSES, expire_stale_jobs
+    
+    expire_stale_jobs(ReportJob.id == job_id)
+    ReportJob.query.get_or_404(job_id)
+    poll_seconds = current_app.config.get('REPORT_JOB_POLL_SECONDS', 1)
+    deadline = time.monotonic() + current_app.config.get('REPORT_JOB_TIMEOUT_SECONDS', 600)
+    
+    def events():
+        last = None
+        while True:
+            row = db.session.execute(
+                db.select(ReportJob.status, ReportJob.progress, ReportJob.error).where(ReportJob.id == job_id)
+            ).one()
+            # Cerrar la transacción para ver en la siguiente lectura lo que escribe el hilo del reporte
+            db.session.rollback()
+            
+            data = {'id': job_id, 'status': row.status, 'progress': row.progress, 'error': row.error}
+            if data != last:
+                yield f'data: {json.dumps(data)}\n\n'
+                last = data
+            
+            if row.status in FINISHED_STATUSES or time.monotonic() > deadline:
+                return
+            time.sleep(poll_seconds)
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@reports_bp.route('/jobs/<int:job_id>/download')
+@login_required
+def download_report(job_id):
+    """Descargar el archivo de un trabajo completado"""
+    job = ReportJob.query.get_or_404(job_id)
+    
+    if job.status != 'completado':
+        return jsonify({'success': False, 'message': 'El reporte todavía no está listo', 'status': job.status}), 409
+    
+    return send_report_artifact(job)
+
+def send_report_artifact(job):
+    """Envía el archivo de un trabajo completado, o 410 si ya no está en el almacén"""
+    from app.report_jobs import REPORT_FORMATS
+    from app.report_store import ReportArtifactStore
+    
+    # Descargarlo lo vuelve el más reciente del LRU; si fue expulsado hay que pedirlo de nuevo
+    if not job.artifact_path or not ReportArtifactStore.from_config().touch(job.artifact_path):
+        return jsonify({'success': False, 'message': 'El reporte expiró, solicítelo de nuevo', 'status': job.status}), 410
+    
+    extension, mimetype = REPORT_FORMATS[job.format]
+    timestamp = (job.finished_at or job.created_at).strftime('%Y%m%d_%H%M%S')
+    return send_file(
+        job.artifact_path,
+        as_attachment=True,
+        download_name=f'reporte_{job.report_type}_{timestamp}.{extension}',
+        mimetype=mimetype
+    )
+
 @reports_bp.route('/policies')
 @login_required
 def policies_report():
     """Reporte de políticas y confirmaciones"""
     policies = Policy.query.filter_by(is_active=True).all()
     
+    # Conteos de todas las políticas (y por departamento) en un solo GROUP BY
+    stats = Policy.get_confirmation_stats_bulk([policy.id for policy in policies], by_department=True)
+    
     policy_data = []
     for policy in policies:
-        total_confirmations = PolicyConfirmation.query.filter_by(policy_id=policy.id).count()
-        confirmed = PolicyConfirmation.query.filter_by(policy_id=policy.id, confirmed=True).count()
-        percentage = int((confirmed / total_confirmations * 100) if total_confirmations > 0 else 0)
-        
         policy_data.append({
             'policy': policy,
-            'total_confirmations': total_confirmations,
-            'confirmed': confirmed,
-            'percentage': percentage
+            'total_confirmations': stats[policy.id]['total'],
+            'confirmed': stats[policy.id]['confirmed'],
+            'percentage': stats[policy.id]['percentage'],
+            'by_department': stats[policy.id]['by_department']
         })
     
     return render_template('reports/policies.html', policy_data=policy_data)
 
+@reports_bp.route('/data/<entity>/<format>')
+@login_required
+def export_data(entity, format):
+    """
+    Exportar una entidad completa en CSV o NDJSON (ver app/data_export.py)
+    
+    Acepta los mismos filtros que el listado de la entidad; la respuesta se
+    envía por fragmentos mientras se lee la base de datos.
+    """
+    from flask import Response, stream_with_context
+    from app.data_export import EXPORT_ENTITIES, EXPORT_FORMATS, build_export_query, stream_export
+    
+    if entity not in EXPORT_ENTITIES or format not in EXPORT_FORMATS:
+        abort(404)
+    
+    if EXPORT_ENTITIES[entity][1] and current_user.role != UserRole.ADMINISTRADOR.value:
+        return jsonify({'success': False, 'message': 'No tienes permiso para exportar estos datos'}), 403
+    
+    stmt = build_export_query(entity, request.args)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return Response(
+        stream_with_context(stream_export(stmt, format)),
+        mimetype=EXPORT_FORMATS[format],
+        headers={
+            'Content-Disposition': f'attachment; filename={entity}_{timestamp}.{format}',
+            'Cache-Control': 'no-store',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
 # ============ ADMINISTRACIÓN ============
 @admin_bp.route('/users')
 @login_required
@@ -1108,15 +1196,12 @@ def new_user():
             db.session.add(user)
             db.session.flush()
             
+            # Confirmaciones pendientes de las políticas activas
+            if user.is_active:
+                PolicyConfirmation.enroll_user(user.id)
+            
             # Audit log
-            log_entry = AuditLog(
-                user_id=current_user.id,
-                action='create_user',
-                entity_type='user',
-                entity_id=user.id,
-                ip_address=request.remote_addr
-            )
-            db.session.add(log_entry)
+            record_action('create_user', entity_type='user', entity_id=user.id)
             db.session.commit()
             
             flash('Usuario creado exitosamente.', 'success')
@@ -1148,16 +1233,12 @@ def edit_user(user_id):
             if request.form.get('password'):
                 user.set_password(request.form.get('password'))
             
+            user.bump_session_version()
+            
             # Audit log
-            log_entry = AuditLog(
-                user_id=current_user.id,
-                action='update_user',
-                entity_type='user',
-                entity_id=user_id,
-                ip_address=request.remote_addr
-            )
-            db.session.add(log_entry)
+            record_action('update_user', entity_type='user', entity_id=user_id)
             db.session.commit()
+            invalidate_user_versions()
             
             flash('Usuario actualizado exitosamente.', 'success')
             return redirect(url_for('admin.list_users'))
@@ -1171,8 +1252,6 @@ def edit_user(user_id):
 @login_required
 def toggle_user_status(user_id):
     """Activar/Desactivar usuario"""
-    import json
-    
     if current_user.role != UserRole.ADMINISTRADOR.value:
         return jsonify({'success': False, 'message': 'No autorizado'}), 403
     
@@ -1189,23 +1268,18 @@ def toggle_user_status(user_id):
         # Cambiar estado
         old_status = user.is_active
         user.is_active = not user.is_active
+        user.bump_session_version()
         
         # Registrar en audit log
-        from app.utils import log_action
-        log_action(
-            user_id=current_user.id,
-            action='toggle_user_status',
-            entity_type='user',
-            entity_id=user.id,
-            changes=json.dumps({
-                'username': user.username,
-                'old_status': 'active' if old_status else 'inactive',
-                'new_status': 'active' if user.is_active else 'inactive'
-            }),
-            ip_address=request.remote_addr
-        )
+        record_action('toggle_user_status', entity_type='user', entity_id=user.id, changes={
+            'username': user.username,
+            'old_status': 'active' if old_status else 'inactive',
+            'new_status': 'active' if user.is_active else 'inactive'
+        })
         
         db.session.commit()
+        invalidate_permissions(user.role)
+        invalidate_user_versions()
         
         status_text = 'activado' if user.is_active else 'desactivado'
         return jsonify({
@@ -1224,66 +1298,90 @@ def toggle_user_status(user_id):
 @admin_bp.route('/audit-log')
 @login_required
 def audit_log():
-    """Ver registro de auditoría del sistema"""
-    from datetime import date, timedelta
-    from sqlalchemy import func
+    """Ver registro de auditoría del sistema (paginación por cursor)"""
+    from sqlalchemy.orm import joinedload
     
     if current_user.role != UserRole.ADMINISTRADOR.value:
         flash('No tienes permiso para acceder a esta sección.', 'danger')
         return redirect(url_for('dashboard.index'))
     
     # Parámetros de filtro
-    page = request.args.get('page', 1, type=int)
-    user_id = request.args.get('user_id', type=int)
-    action = request.args.get('action', type=str)
-    entity_type = request.args.get('entity_type', type=str)
-    date_from = request.args.get('date_from', type=str)
-    
-    # Query base
-    query = AuditLog.query
-    
-    # Aplicar filtros
-    if user_id:
-        query = query.filter_by(user_id=user_id)
-    if action:
-        query = query.filter_by(action=action)
-    if entity_type:
-        query = query.filter_by(entity_type=entity_type)
-    if date_from:
+    filters = {
+        'user_id': request.args.get('user_id', type=int),
+        'action': request.args.get('action', type=str),
+        'entity_type': request.args.get('entity_type', type=str),
+        'date_from': request.args.get('date_from', type=str),
+        'date_to': request.args.get('date_to', type=str)
+    }
+    
+    def parse_date(value):
         try:
-            from datetime import datetime
-            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
-            query = query.filter(AuditLog.created_at >= date_from_obj)
-        except:
-            pass
+            return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+        except ValueError:
+            return None
+    
+    query = filter_audit_log(
+        AuditLog.query.options(joinedload(AuditLog.user)),
+        user_id=filters['user_id'],
+        action=filters['action'],
+        entity_type=filters['entity_type'],
+        date_from=parse_date(filters['date_from']),
+        date_to=parse_date(filters['date_to'])
+    )
     
-    # Ordenar y paginar
-    logs = query.order_by(AuditLog.created_at.desc()).paginate(page=page, per_page=20, error_out=False)
+    # Página siguiente (before) o anterior (after) respecto a un cursor
+    logs = paginate_audit_log(query, before=request.args.get('before'), after=request.args.get('after'))
     
-    # Estadísticas
-    total_logs = AuditLog.query.count()
-    logs_today = AuditLog.query.filter(
-        func.date(AuditLog.created_at) == date.today()
-    ).count()
+    # Estadísticas desde los contadores (sin COUNT(*) sobre audit_logs)
+    stats = get_audit_log_stats()
     active_users = User.query.filter_by(is_active=True).count()
-    actions_count = db.session.query(func.count(func.distinct(AuditLog.action))).scalar()
     
     # Obtener todos los usuarios para el filtro
     users = User.query.filter_by(is_active=True).order_by(User.full_name).all()
     
     return render_template('admin/audit_log.html', 
                          logs=logs,
-                         total_logs=total_logs,
-                         logs_today=logs_today,
+                         filter_args={key: value for key, value in filters.items() if value},
+                         total_logs=stats['total_logs'],
+                         logs_today=stats['logs_today'],
                          active_users=active_users,
-                         actions_count=actions_count,
+                         actions_count=stats['actions_count'],
                          users=users)
 
+@admin_bp.route('/sql-stats')
+@login_required
+def sql_stats():
+    """Consultas SQL por petición: endpoints más costosos y consultas lentas"""
+    if current_user.role != UserRole.ADMINISTRADOR.value:
+        flash('No tienes permiso para acceder a esta sección.', 'danger')
+        return redirect(url_for('dashboard.index'))
+    
+    instrumentation = current_app.extensions.get('sql_instrumentation')
+    stats = instrumentation.snapshot() if instrumentation else None
+    
+    return render_template('admin/sql_stats.html',
+                         stats=stats,
+                         slow_query_ms=current_app.config.get('SQL_SLOW_QUERY_MS'))
+
+@admin_bp.route('/sql-stats/reset', methods=['POST'])
+@login_required
+def reset_sql_stats():
+    """Vaciar el historial de instrumentación SQL"""
+    if current_user.role != UserRole.ADMINISTRADOR.value:
+        return jsonify({'success': False, 'message': 'No autorizado'}), 403
+    
+    instrumentation = current_app.extensions.get('sql_instrumentation')
+    if instrumentation:
+        instrumentation.reset()
+    
+    flash('Historial de consultas SQL reiniciado.', 'success')
+    return redirect(url_for('admin.sql_stats'))
+
 @admin_bp.route('/permissions')
 @login_required
 def permissions():
     """Gestión de permisos por rol"""
-    from app.models import Role, Module, RolePermission
+    from app.models import Role, Module
     
     if current_user.role != UserRole.ADMINISTRADOR.value:
         flash('No tienes permiso para acceder a esta sección.', 'danger')
@@ -1293,38 +1391,8 @@ def permissions():
     roles = Role.query.order_by(Role.id).all()
     modules = Module.query.filter_by(is_active=True).order_by(Module.display_order).all()
     
-    # Construir matriz de permisos
-    permissions_matrix = {}
-    for role in roles:
-        permissions_matrix[role.id] = {}
-        for module in modules:
-            # Buscar permiso existente
-            perm = RolePermission.query.filter_by(
-                role_id=role.id, 
-                module_id=module.id
-            ).first()
-            
-            if perm:
-                permissions_matrix[role.id][module.id] = {
-                    'id': perm.id,
-                    'can_view': perm.can_view,
-                    'can_create': perm.can_create,
-                    'can_edit': perm.can_edit,
-                    'can_delete': perm.can_delete,
-                    'can_export': perm.can_export,
-                    'can_approve': perm.can_approve
-                }
-            else:
-                # No existe permiso, todos en False
-                permissions_matrix[role.id][module.id] = {
-                    'id': None,
-                    'can_view': False,
-                    'can_create': False,
-                    'can_edit': False,
-                    'can_delete': False,
-                    'can_export': False,
-                    'can_approve': False
-                }
+    # Construir matriz de permisos con una sola consulta
+    permissions_matrix = PermissionMatrix.load().as_dict(roles, modules)
     
     return render_template('admin/permissions.html',
                          roles=roles,
@@ -1336,7 +1404,6 @@ def permissions():
 def update_permission():
     """Actualizar un permiso específico"""
     from app.models import RolePermission
-    import json
     
     if current_user.role != UserRole.ADMINISTRADOR.value:
         return jsonify({'success': False, 'message': 'No autorizado'}), 403
@@ -1382,22 +1449,16 @@ def update_permission():
         elif permission_type == 'can_approve':
             perm.can_approve = value
         
-        db.session.commit()
+        db.session.flush()
         
-        # Registrar en audit log
-        from app.utils import log_action
-        log_action(
-            user_id=current_user.id,
-            action='update_permission',
-            entity_type='role_permission',
-            entity_id=perm.id,
-            changes=json.dumps({
-                'role_id': role_id,
-                'module_id': module_id,
-                permission_type: value
-            }),
-            ip_address=request.remote_addr
-        )
+        # Registrar en audit log (mismo commit que el permiso)
+        record_action('update_permission', entity_type='role_permission', entity_id=perm.id, changes={
+            'role_id': role_id,
+            'module_id': module_id,
+            permission_type: value
+        })
+        db.session.commit()
+        invalidate_permissions()
         
         return jsonify({
             'success': True, 
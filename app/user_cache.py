@@ -0,0 +1,141 @@
+"""
+Caché de identidad de usuario para Flask-Login
+
+Flask-Login llama a load_user() en cada petición autenticada. En lugar de leer
+la fila de users cada vez, los datos que usan las vistas y los templates (rol,
+estado activo, nombre, departamento...) se guardan en la sesión junto con el
+session_version del usuario y se reutilizan mientras esa versión siga vigente:
+
+    • Sesión: la identidad viaja en la cookie firmada de la sesión
+    • Proceso: las versiones vigentes {user_id: session_version} de todos los
+      usuarios se cargan con una sola consulta cada USER_CACHE_TTL segundos
+
+edit_user y toggle_user_status incrementan la versión con
+User.bump_session_version() y llaman a invalidate_user_versions(); la identidad
+guardada con la versión anterior se descarta y se vuelve a leer el usuario.
+En otros procesos el cambio se nota al vencer USER_CACHE_TTL.
+
+Los permisos del rol siguen en la caché de app/permissions.py.
+"""
+import threading
+import time
+from flask import current_app, session
+from flask_login import UserMixin, user_logged_in, user_logged_out
+from app.models import db, User
+
+# Clave de la identidad en la sesión
+SESSION_KEY = '_user_identity'
+
+# Columnas de users que se guardan en la sesión
+IDENTITY_FIELDS = ('id', 'username', 'email', 'full_name', 'department', 'role', 'is_active', 'session_version')
+
+# Caché del proceso: {'expires': instante, 'data': {user_id: session_version}}
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+class CachedUser(UserMixin):
+    """
+    Usuario reconstruido desde la sesión, sin consultar la base de datos
+
+    Los atributos de IDENTITY_FIELDS están disponibles directamente; cualquier
+    otro (relaciones, password_hash...) carga el modelo User la primera vez.
+    """
+
+    def __init__(self, identity):
+        self.__dict__.update(identity)
+
+    # Misma lógica que el modelo (usa solo role e is_active)
+    get_role = User.get_role
+    get_role_object = User.get_role_object
+    can = User.can
+    get_accessible_modules = User.get_accessible_modules
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+
+        user = self.__dict__.get('_user')
+        if user is None:
+            user = db.session.get(User, self.id)
+            if user is None:
+                raise AttributeError(name)
+            self.__dict__['_user'] = user
+        return getattr(user, name)
+
+    def __repr__(self):
+        return f'<User {self.username}>'
+
+
+def current_versions():
+    """
+    Versiones vigentes de todos los usuarios usando la caché del proceso
+
+    Returns:
+        dict: {user_id: session_version}
+    """
+    ttl = current_app.config.get('USER_CACHE_TTL', 0)
+    now = time.monotonic()
+    with _versions_lock:
+        if _versions.get('expires', 0) > now:
+            return _versions['data']
+
+    data = dict(db.session.query(User.id, User.session_version).all())
+    with _versions_lock:
+        _versions['data'] = data
+        _versions['expires'] = now + ttl
+    return data
+
+
+def invalidate_user_versions():
+    """Descarta las versiones en caché; llamar después del commit que las cambia"""
+    with _versions_lock:
+        _versions.clear()
+
+
+def remember_identity(user):
+    """Guarda en la sesión la identidad del usuario y registra su versión en la caché"""
+    session[SESSION_KEY] = {field: getattr(user, field) for field in IDENTITY_FIELDS}
+    with _versions_lock:
+        if 'data' in _versions:
+            _versions['data'][user.id] = user.session_version
+
+
+def load_user_identity(user_id):
+    """
+    user_loader de Flask-Login
+
+    Returns:
+        CachedUser si la identidad de la sesión sigue vigente, el modelo User
+        leído de la base si no, o None si el usuario no existe
+    """
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    cache_enabled = current_app.config.get('USER_CACHE_TTL', 0) > 0
+    identity = session.get(SESSION_KEY)
+    if (cache_enabled and identity and identity.get('id') == user_id
+            and current_versions().get(user_id) == identity.get('session_version')):
+        return CachedUser(identity)
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        session.pop(SESSION_KEY, None)
+        return None
+
+    if cache_enabled:
+        remember_identity(user)
+    return user
+
+
+@user_logged_in.connect
+def _on_login(app, user):
+    if app.config.get('USER_CACHE_TTL', 0) > 0:
+        remember_identity(user)
+
+
+@user_logged_out.connect
+def _on_logout(app, user):
+    session.pop(SESSION_KEY, None)
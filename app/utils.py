@@ -2,16 +2,10 @@ import os
 from werkzeug.utils import secure_filename
 from datetime import datetime
 from flask import current_app
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-import io
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 # ============ GESTIÓN DE ARCHIVOS ============
 
@@ -41,6 +35,62 @@ def save_upload_file(file, subfolder='uploads'):
     
     return filepath
 
+def file_content_hash(filepath, chunk_size=1024 * 1024):
+    """SHA-256 del contenido de un archivo, leído por bloques"""
+    import hashlib
+    
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def send_document(filepath, etag, last_modified=None):
+    """
+    Sirve un archivo subido para vista previa con caché HTTP
+    
+    • If-None-Match con el mismo ETag → 304 sin tocar el archivo
+    • If-Modified-Since y Range (PDF grandes) los resuelve send_file
+    • USE_X_SENDFILE → el servidor web envía el archivo (X-Sendfile)
+    • DOCUMENT_ACCEL_REDIRECT_PREFIX → nginx lo envía (X-Accel-Redirect)
+    
+    Args:
+        filepath: Ruta del archivo dentro de UPLOAD_FOLDER
+        etag: Hash del contenido guardado al subirlo
+        last_modified: Fecha de la última subida
+    """
+    from flask import request, send_file
+    
+    max_age = current_app.config.get('DOCUMENT_CACHE_MAX_AGE', 0)
+    accel_prefix = current_app.config.get('DOCUMENT_ACCEL_REDIRECT_PREFIX')
+    
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    elif not os.path.exists(filepath):
+        from flask import abort
+        abort(404, description="Documento no encontrado")
+    elif accel_prefix:
+        import mimetypes
+        
+        relative = os.path.relpath(filepath, current_app.config['UPLOAD_FOLDER']).replace(os.sep, '/')
+        response = current_app.response_class(mimetype=mimetypes.guess_type(filepath)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + relative
+    else:
+        response = send_file(filepath, etag=etag, last_modified=last_modified, max_age=max_age, conditional=True)
+    
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    
+    # Documentos privados: solo el navegador del usuario los guarda
+    response.cache_control.public = False
+    response.cache_control.private = True
+    if max_age > 0:
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True
+    return response
+
 def delete_upload_file(filepath):
     """Elimina un archivo subido"""
     try:
@@ -53,38 +103,32 @@ def delete_upload_file(filepath):
 
 # ============ ENVÍO DE CORREOS ============
 
-def send_email_alert(recipient_email, subject, body, html_body=None):
-    """Envía un email de alerta"""
+def send_email_alert(recipient_email, subject, body, html_body=None, alert_id=None):
+    """
+    Envía un email de alerta
+    
+    El correo se guarda en el outbox (app/mailer.py) y lo entrega el worker en
+    segundo plano, por lo que esta función retorna de inmediato.
+    
+    Returns:
+        bool: True si el correo quedó en cola
+    """
+    from app.mailer import enqueue_email
+    
     try:
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = current_app.config['MAIL_DEFAULT_SENDER']
-        msg['To'] = recipient_email
-        
-        # Agregar versión texto
-        part1 = MIMEText(body, 'plain')
-        msg.attach(part1)
-        
-        # Agregar versión HTML si existe
-        if html_body:
-            part2 = MIMEText(html_body, 'html')
-            msg.attach(part2)
-        
-        # Enviar
-        with smtplib.SMTP(current_app.config['MAIL_SERVER'], current_app.config['MAIL_PORT']) as server:
-            if current_app.config['MAIL_USE_TLS']:
-                server.starttls()
-            if current_app.config['MAIL_USERNAME']:
-                server.login(current_app.config['MAIL_USERNAME'], current_app.config['MAIL_PASSWORD'])
-            server.send_message(msg)
-        
+        enqueue_email(recipient_email, subject, body, html_body, alert_id=alert_id)
         return True
     except Exception as e:
-        print(f"Error enviando email: {e}")
+        print(f"Error encolando email: {e}")
         return False
 
-def send_certification_expiration_alert(certification, days_until_expiration):
-    """Envía alerta de vencimiento de certificación"""
+def build_certification_expiration_email(certification, days_until_expiration):
+    """
+    Arma el correo de alerta de vencimiento de certificación
+    
+    Returns:
+        tuple: (destinatario, asunto, cuerpo en texto, cuerpo HTML)
+    """
     user = certification.responsible
     
     subject = f"ALERTA: Certificación '{certification.name}' vence en {days_until_expiration} días"
@@ -127,20 +171,110 @@ Agroindustria Frutos de Oro S.A.C.
 </html>
 """
     
-    return send_email_alert(user.email, subject, body, html_body)
+    return user.email, subject, body, html_body
+
+def send_certification_expiration_alert(certification, days_until_expiration):
+    """Envía alerta de vencimiento de certificación"""
+    return send_email_alert(*build_certification_expiration_email(certification, days_until_expiration))
 
 # ============ GENERACIÓN DE REPORTES ============
 
-def generate_pdf_report(report_type, data):
-    """Genera un reporte en PDF"""
-    from app.models import Certification, Audit
+# Contador del bloque count_queries() activo en el contexto actual (hilo o tarea)
+_query_counter = ContextVar('query_counter', default=None)
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    # Listener permanente: count_queries() no agrega ni quita listeners del engine
+    counter = _query_counter.get()
+    if counter is not None:
+        counter['count'] += 1
+
+@contextmanager
+def count_queries():
+    """
+    Cuenta las sentencias SQL que el contexto actual ejecuta dentro del bloque
+    
+    Uso:
+        with count_queries() as counter:
+            generate_pdf_report('audits')
+        counter['count']
+    """
+    counter = {'count': 0}
+    token = _query_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _query_counter.reset(token)
+
+def load_certification_report_data():
+    """
+    Certificaciones para reportes con su responsable (1 consulta, JOIN)
+    
+    Returns:
+        list: Certificaciones con Certification.responsible ya cargado
+    """
+    from app.models import Certification
+    from sqlalchemy.orm import joinedload
+    
+    return Certification.query.options(
+        joinedload(Certification.responsible)
+    ).order_by(Certification.id).all()
+
+def load_audit_report_data():
+    """
+    Auditorías para reportes con responsable y estadísticas de hallazgos (2 consultas)
+    
+    Las estadísticas quedan precargadas en cada auditoría, así que
+    get_findings_stats(), has_critical_findings() y get_compliance_percentage()
+    no vuelven a consultar la base de datos.
+    
+    Returns:
+        list: Auditorías con Audit.responsible ya cargado
+    """
+    from app.models import Audit
+    from sqlalchemy.orm import joinedload
+    
+    audits = Audit.query.options(
+        joinedload(Audit.responsible)
+    ).order_by(Audit.id).all()
+    
+    return Audit.preload_findings_stats(audits)
+
+# Los reportes generados se mantienen en memoria hasta este tamaño y luego pasan
+# a un temporal anónimo que el sistema elimina al cerrarlo (nunca a UPLOAD_FOLDER)
+REPORT_SPOOL_MAX_SIZE = 10 * 1024 * 1024
+
+def new_report_spool():
+    """Archivo temporal para un reporte: en memoria si es pequeño, en disco si no"""
+    import tempfile
+    
+    return tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_MAX_SIZE)
+
+def generate_pdf_report(report_type, data=None, output=None):
+    """
+    Genera un reporte en PDF
+    
+    Args:
+        report_type: 'certifications' o 'audits'
+        data: Registros a incluir. Por defecto se usan los loaders de reportes
+        output: Archivo destino (file-like). Por defecto un SpooledTemporaryFile
+    
+    Returns:
+        Archivo con el PDF, posicionado al inicio
+    """
+    # reportlab se importa al generar el primer PDF, no al arrancar la aplicación
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from app.models import Audit
     
-    # Crear buffer en memoria
-    buffer = io.BytesIO()
+    if output is None:
+        output = new_report_spool()
     
     # Crear documento PDF
     doc = SimpleDocTemplate(
-        buffer,
+        output,
         pagesize=letter,
         rightMargin=50,
         leftMargin=50,
@@ -168,15 +302,16 @@ def generate_pdf_report(report_type, data):
         
         # Datos de certificaciones
         cert_data = [['Certificación', 'Norma', 'Emisor', 'Vencimiento', 'Estado']]
+        if data is None:
+            data = load_certification_report_data()
         
         for cert in data:
-            cert.get_status()
             cert_data.append([
                 cert.name,
                 cert.norm,
                 cert.issuing_entity,
                 cert.expiration_date.strftime('%d/%m/%Y'),
-                cert.status.upper()
+                cert.current_status.upper()
             ])
         
         # Crear tabla
@@ -203,9 +338,13 @@ def generate_pdf_report(report_type, data):
         
         # Datos de auditorías
         audit_data = [['Tipo', 'Área', 'Fecha Programada', 'Estado', 'Hallazgos']]
+        if data is None:
+            data = load_audit_report_data()
+        else:
+            Audit.preload_findings_stats(data)
         
         for audit in data:
-            critical_findings = sum(1 for f in audit.findings if f.severity == 'critica')
+            critical_findings = audit.get_findings_stats()['by_severity']['critica']
             audit_data.append([
                 audit.audit_type.upper(),
                 audit.evaluated_area,
@@ -233,144 +372,308 @@ def generate_pdf_report(report_type, data):
     
     # Construir PDF
     doc.build(elements)
-    buffer.seek(0)
+    output.seek(0)
+    return output
+
+# Filas usadas para estimar el ancho de las columnas antes de escribir
+EXCEL_WIDTH_SAMPLE_ROWS = 500
+EXCEL_MAX_COLUMN_WIDTH = 60
+# Filas leídas por cada viaje a la base de datos (cursor del servidor)
+EXCEL_STREAM_BATCH = 1000
+
+EXCEL_REPORT_SHEETS = {
+    'certifications': ('Certificaciones', ['Certificación', 'Norma', 'Emisor', 'Fecha Emisión', 'Fecha Vencimiento', 'Estado', 'Responsable']),
+    'audits': ('Auditorías', ['Tipo', 'Área Evaluada', 'Responsable', 'Fecha Programada', 'Fecha Ejecución', 'Estado', 'Hallazgos Críticos']),
+}
+
+def _excel_report_rows(report_type):
+    """
+    Genera las filas del reporte leyendo la base de datos por lotes
     
-    # Guardar en archivo temporal
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], f'reporte_{report_type}_{timestamp}.pdf')
+    Se seleccionan solo columnas (no objetos del ORM) con yield_per, que usa un
+    cursor del lado del servidor: la memoria no crece con el número de filas.
+    """
+    from app.models import db, User, Certification, Audit, AuditFinding
     
-    with open(filepath, 'wb') as f:
-        f.write(buffer.getvalue())
+    if report_type == 'certifications':
+        stmt = db.select(
+            Certification.name,
+            Certification.norm,
+            Certification.issuing_entity,
+            Certification.emission_date,
+            Certification.expiration_date,
+            Certification.current_status,
+            User.full_name
+        ).join(User, User.id == Certification.responsible_id).order_by(Certification.id)
     
-    return filepath
+    elif report_type == 'audits':
+        # Hallazgos críticos agregados en la misma consulta: con un cursor del
+        # servidor abierto no se pueden ejecutar otras consultas en la conexión
+        critical = db.select(
+            AuditFinding.audit_id,
+            db.func.count(AuditFinding.id).label('total')
+        ).where(AuditFinding.severity == 'critica').group_by(AuditFinding.audit_id).subquery()
+        
+        stmt = db.select(
+            Audit.audit_type,
+            Audit.evaluated_area,
+            User.full_name,
+            Audit.scheduled_date,
+            Audit.executed_date,
+            Audit.status,
+            db.func.coalesce(critical.c.total, 0)
+        ).join(User, User.id == Audit.responsible_id).outerjoin(
+            critical, critical.c.audit_id == Audit.id
+        ).order_by(Audit.id)
+    
+    else:
+        raise ValueError(f'Tipo de reporte no válido: {report_type}')
+    
+    result = db.session.execute(stmt.execution_options(yield_per=EXCEL_STREAM_BATCH))
+    for row in result:
+        yield [value.strftime('%d/%m/%Y') if hasattr(value, 'strftime') else ('' if value is None else value)
+               for value in row]
 
-def generate_excel_report(report_type, data):
-    """Genera un reporte en Excel"""
-    wb = Workbook()
-    ws = wb.active
+def generate_excel_report(report_type, output=None, progress=None):
+    """
+    Genera un reporte en Excel en modo streaming
     
-    # Estilos
+    Usa un libro write-only de openpyxl: cada fila se escribe al llegar y no se
+    conserva en memoria. El ancho de las columnas se calcula con las primeras
+    EXCEL_WIDTH_SAMPLE_ROWS filas (openpyxl exige fijarlo antes de la primera fila).
+    
+    Args:
+        report_type: 'certifications' o 'audits'
+        output: Archivo destino (file-like). Por defecto un SpooledTemporaryFile
+        progress: Función opcional que recibe las filas escritas cada EXCEL_STREAM_BATCH filas
+    
+    Returns:
+        Archivo con el .xlsx, posicionado al inicio
+    """
+    from itertools import islice
+    # openpyxl se importa al generar el primer Excel, no al arrancar la aplicación
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.utils import get_column_letter
+    
+    title, headers = EXCEL_REPORT_SHEETS[report_type]
+    rows = _excel_report_rows(report_type)
+    
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    
+    # Ajustar ancho de columnas con una muestra de filas
+    sample = list(islice(rows, EXCEL_WIDTH_SAMPLE_ROWS))
+    widths = [len(header) for header in headers]
+    for row in sample:
+        for i, value in enumerate(row):
+            widths[i] = max(widths[i], len(str(value)))
+    for i, width in enumerate(widths):
+        ws.column_dimensions[get_column_letter(i + 1)].width = min(width + 2, EXCEL_MAX_COLUMN_WIDTH)
+    
+    # Estilos (en modo write-only se aplican por celda)
     header_fill = PatternFill(start_color='1a472a', end_color='1a472a', fill_type='solid')
     header_font = Font(bold=True, color='FFFFFF', size=12)
     header_alignment = Alignment(horizontal='center', vertical='center')
     
-    if report_type == 'certifications':
-        ws.title = 'Certificaciones'
-        ws.append(['Certificación', 'Norma', 'Emisor', 'Fecha Emisión', 'Fecha Vencimiento', 'Estado', 'Responsable'])
-        
-        for row in ws.iter_rows(min_row=1, max_row=1):
-            for cell in row:
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = header_alignment
-        
-        for cert in data:
-            cert.get_status()
-            ws.append([
-                cert.name,
-                cert.norm,
-                cert.issuing_entity,
-                cert.emission_date.strftime('%d/%m/%Y'),
-                cert.expiration_date.strftime('%d/%m/%Y'),
-                cert.status,
-                cert.responsible.full_name
-            ])
-    
-    elif report_type == 'audits':
-        ws.title = 'Auditorías'
-        ws.append(['Tipo', 'Área Evaluada', 'Responsable', 'Fecha Programada', 'Fecha Ejecución', 'Estado', 'Hallazgos Críticos'])
-        
-        for row in ws.iter_rows(min_row=1, max_row=1):
-            for cell in row:
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = header_alignment
-        
-        for audit in data:
-            critical_count = sum(1 for f in audit.findings if f.severity == 'critica')
-            ws.append([
-                audit.audit_type,
-                audit.evaluated_area,
-                audit.responsible.full_name,
-                audit.scheduled_date.strftime('%d/%m/%Y'),
-                audit.executed_date.strftime('%d/%m/%Y') if audit.executed_date else '',
-                audit.status,
-                critical_count
-            ])
-    
-    # Ajustar ancho de columnas
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # Guardar en archivo temporal
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], f'reporte_{report_type}_{timestamp}.xlsx')
-    
-    wb.save(filepath)
-    return filepath
+    header_row = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = header_alignment
+        header_row.append(cell)
+    ws.append(header_row)
+    
+    for row in sample:
+        ws.append(row)
+    written = len(sample)
+    for row in rows:
+        ws.append(row)
+        written += 1
+        if progress is not None and written % EXCEL_STREAM_BATCH == 0:
+            progress(written)
+    
+    if output is None:
+        output = new_report_spool()
+    wb.save(output)
+    output.seek(0)
+    return output
 
 # ============ VERIFICACIÓN DE ALERTAS ============
 
-def check_certification_expiration_alerts():
-    """Verifica certificaciones próximas a vencer y envía alertas"""
-    from app.models import Certification, Alert
-    from datetime import timedelta
+# Umbrales de alerta de vencimiento, del más urgente al menos urgente
+# (días, columna bandera, severidad, título, mensaje)
+EXPIRATION_ALERT_THRESHOLDS = (
+    (15, 'alert_sent_15', 'critical', 'URGENTE: Certificación próxima a vencer', 'Vencimiento en {days} días - Acción requerida'),
+    (30, 'alert_sent_30', 'warning', 'Certificación próxima a vencer', 'Vencimiento en {days} días'),
+    (60, 'alert_sent_60', 'info', 'Certificación próxima a vencer', 'Vencimiento en {days} días'),
+)
+
+def _pending_expiration_threshold(cert, days_to_expiration):
+    """
+    Retorna el umbral que corresponde alertar para una certificación, o None
     
-    today = datetime.now().date()
+    Se usa lógica de cruce de umbral: si la certificación ya está dentro de la
+    ventana de un umbral (días <= umbral) y esa alerta no se envió, se alerta
+    aunque el día exacto ya haya pasado. Solo se considera el umbral más urgente.
+    """
+    for threshold in EXPIRATION_ALERT_THRESHOLDS:
+        days, flag = threshold[0], threshold[1]
+        if days_to_expiration <= days:
+            return None if getattr(cert, flag) else threshold
+    return None
+
+def check_certification_expiration_alerts(dry_run=False, send_emails=True, today=None):
+    """
+    Verifica certificaciones próximas a vencer y genera las alertas pendientes
     
-    # Verificar certificaciones próximas a vencer
-    certifications = Certification.query.all()
+    Selecciona con una sola consulta (rango sobre expiration_date) solo las
+    certificaciones dentro de las ventanas de alerta con alguna bandera sin
+    enviar, y escribe alertas y banderas en una única transacción. Es
+    idempotente: ejecutarlo varias veces el mismo día no duplica alertas.
     
+    Args:
+        dry_run: Si es True solo calcula lo que haría, sin escribir ni encolar correos
+        send_emails: Si es False se registran las alertas sin encolar correos
+        today: Fecha de referencia (por defecto, hoy)
+    
+    Returns:
+        dict: Resumen con certificaciones evaluadas, alertas, correos y tiempos (ms)
+    """
+    from app.models import db, Certification, Alert, EmailOutbox
+    from app.mailer import wake_outbox_worker
+    from sqlalchemy.orm import joinedload
+    from datetime import timedelta
+    import time
+    
+    today = today or datetime.now().date()
+    max_days = max(threshold[0] for threshold in EXPIRATION_ALERT_THRESHOLDS)
+    timings = {}
+    
+    # 1. Una sola consulta indexada: solo certificaciones en ventana con alertas pendientes
+    started = time.perf_counter()
+    pending_flags = db.or_(*[
+        db.and_(
+            Certification.expiration_date <= today + timedelta(days=days),
+            getattr(Certification, flag).isnot(True)
+        )
+        for days, flag, *_ in EXPIRATION_ALERT_THRESHOLDS
+    ])
+    certifications = Certification.query.options(
+        joinedload(Certification.responsible)
+    ).filter(
+        Certification.expiration_date >= today,
+        Certification.expiration_date <= today + timedelta(days=max_days),
+        pending_flags
+    ).all()
+    timings['select'] = (time.perf_counter() - started) * 1000
+    
+    # 2. Calcular alertas a generar
+    started = time.perf_counter()
+    planned = []
     for cert in certifications:
-        days_to_expiration = cert.days_to_expiration()
+        days_to_expiration = (cert.expiration_date - today).days
+        threshold = _pending_expiration_threshold(cert, days_to_expiration)
+        if threshold:
+            planned.append((cert, days_to_expiration, threshold))
+    timings['plan'] = (time.perf_counter() - started) * 1000
+    
+    summary = {
+        'dry_run': dry_run,
+        'candidates': len(certifications),
+        'alerts': len(planned),
+        'emails_queued': 0,
+        'planned': [(cert.id, cert.name, days, threshold[0]) for cert, days, threshold in planned],
+        'timings': timings
+    }
+    
+    if dry_run or not planned:
+        return summary
+    
+    # 3. Preparar filas para inserción masiva
+    started = time.perf_counter()
+    now = datetime.now()
+    alert_rows = []
+    emails = {}
+    flag_ids = {}
+    for cert, days_to_expiration, threshold in planned:
+        threshold_days, flag, severity, title, message = threshold
         
-        # Alerta a 60 días
-        if days_to_expiration == 60 and not cert.alert_sent_60:
-            send_certification_expiration_alert(cert, 60)
-            cert.alert_sent_60 = True
-            create_alert(
-                alert_type='expiration',
-                related_id=cert.id,
-                title=f'Certificación próxima a vencer: {cert.name}',
-                message=f'Vencimiento en 60 días',
-                severity='info',
-                recipient_email=cert.responsible.email
-            )
+        alert_rows.append({
+            'alert_type': 'expiration',
+            'related_id': cert.id,
+            'title': f'{title}: {cert.name}',
+            'message': message.format(days=days_to_expiration),
+            'severity': severity,
+            'recipient_email': cert.responsible.email,
+            'sent': False,
+            'created_at': now
+        })
         
-        # Alerta a 30 días
-        elif days_to_expiration == 30 and not cert.alert_sent_30:
-            send_certification_expiration_alert(cert, 30)
-            cert.alert_sent_30 = True
-            create_alert(
-                alert_type='expiration',
-                related_id=cert.id,
-                title=f'Certificación próxima a vencer: {cert.name}',
-                message=f'Vencimiento en 30 días',
-                severity='warning',
-                recipient_email=cert.responsible.email
-            )
+        if send_emails:
+            emails[cert.id] = build_certification_expiration_email(cert, days_to_expiration)
+        
+        # Se marca el umbral alertado y todos los menos urgentes
+        for days, other_flag, *_ in EXPIRATION_ALERT_THRESHOLDS:
+            if days >= threshold_days:
+                flag_ids.setdefault(other_flag, []).append(cert.id)
+    timings['prepare'] = (time.perf_counter() - started) * 1000
+    
+    # 4. Escribir alertas, correos (outbox) y banderas en una sola transacción.
+    #    Los correos los envía el worker del outbox (app/mailer.py), que marca
+    #    la alerta como enviada al entregarlos.
+    started = time.perf_counter()
+    try:
+        # Ids de las alertas desde el propio INSERT: RETURNING en un solo
+        # executemany (PostgreSQL, SQLite, MariaDB) o, si el motor no lo
+        # soporta (MySQL), objetos del ORM a los que el flush asigna el id
+        if db.session.get_bind().dialect.insert_executemany_returning:
+            alert_ids = db.session.execute(
+                db.insert(Alert).returning(Alert.related_id, Alert.id), alert_rows
+            ).all()
+        else:
+            alerts = [Alert(**row) for row in alert_rows]
+            db.session.add_all(alerts)
+            db.session.flush()
+            alert_ids = [(alert.related_id, alert.id) for alert in alerts]
+        
+        if emails:
+            outbox_rows = []
+            for cert_id, alert_id in alert_ids:
+                recipient, subject, body, html_body = emails[cert_id]
+                outbox_rows.append({
+                    'recipient_email': recipient,
+                    'subject': subject,
+                    'body': body,
+                    'html_body': html_body,
+                    'alert_id': alert_id,
+                    'status': 'pendiente',
+                    'attempts': 0,
+                    'next_attempt_at': now,
+                    'created_at': now
+                })
+            db.session.execute(db.insert(EmailOutbox), outbox_rows)
+            summary['emails_queued'] = len(outbox_rows)
         
-        # Alerta a 15 días
-        elif days_to_expiration == 15 and not cert.alert_sent_15:
-            send_certification_expiration_alert(cert, 15)
-            cert.alert_sent_15 = True
-            create_alert(
-                alert_type='expiration',
-                related_id=cert.id,
-                title=f'URGENTE: Certificación próxima a vencer: {cert.name}',
-                message=f'Vencimiento en 15 días - Acción requerida',
-                severity='critical',
-                recipient_email=cert.responsible.email
+        for flag, ids in flag_ids.items():
+            db.session.execute(
+                db.update(Certification)
+                .where(Certification.id.in_(ids))
+                .values({flag: True})
+                .execution_options(synchronize_session=False)
             )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    timings['write'] = (time.perf_counter() - started) * 1000
+    
+    if summary['emails_queued']:
+        wake_outbox_worker()
+    
+    return summary
 
 def create_alert(alert_type, related_id, title, message, severity='info', recipient_email=None):
     """Crea una alerta en el sistema"""
@@ -397,6 +700,9 @@ def log_action(user_id, action, entity_type=None, entity_id=None, changes=None,
     """
     Registra una acción en el sistema de auditoría
     
+    El registro se agrega a la sesión actual y se guarda con el commit de quien
+    llama (ver app/audit_writer.py).
+    
     Args:
         user_id: ID del usuario que realiza la acción
         action: Acción realizada (create, update, delete, view, etc.)
@@ -405,23 +711,10 @@ def log_action(user_id, action, entity_type=None, entity_id=None, changes=None,
         changes: Diccionario con los cambios realizados (opcional)
         ip_address: Dirección IP del usuario
     """
-    from app.models import AuditLog
-    from app import db
-    import json
-    
-    log_entry = AuditLog(
-        user_id=user_id,
-        action=action,
-        entity_type=entity_type,
-        entity_id=entity_id,
-        changes=json.dumps(changes, ensure_ascii=False) if changes else None,
-        ip_address=ip_address
-    )
-    
-    db.session.add(log_entry)
-    db.session.commit()
+    from app.audit_writer import record_action
     
-    return log_entry
+    return record_action(action, entity_type=entity_type, entity_id=entity_id, changes=changes,
+                         user_id=user_id, ip_address=ip_address)
 
 def get_entity_changes(old_obj, new_data, fields):
     """
@@ -0,0 +1,70 @@
+"""
+Benchmark: job de alertas de vencimiento
+
+Crea miles de certificaciones con fechas de vencimiento repartidas en el
+próximo año y mide el job check_certification_expiration_alerts en modo
+simulación, en la primera ejecución real y en una segunda ejecución (que
+debe ser idempotente y no generar alertas nuevas).
+
+    python benchmarks/benchmark_alertas.py
+"""
+from datetime import date, timedelta
+from comun import crear_app_benchmark, QueryCounter, cronometro, imprimir_tabla
+
+CERTIFICACIONES = (1000, 5000, 20000)
+
+
+def poblar(db, total):
+    """Crea un usuario responsable y total certificaciones"""
+    from app.models import User, Certification, Alert
+
+    db.drop_all()
+    db.create_all()
+
+    user = User(username='responsable', email='responsable@frutosoro.com', full_name='Responsable', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+
+    today = date.today()
+    db.session.execute(db.insert(Certification), [{
+        'name': f'Certificación {i}',
+        'norm': 'ISO 22000',
+        'issuing_entity': 'Entidad',
+        'emission_date': today - timedelta(days=365),
+        'expiration_date': today + timedelta(days=i % 365),
+        'responsible_id': user.id,
+        'status': 'vigente'
+    } for i in range(total)])
+    db.session.commit()
+
+
+def medir(db, **kwargs):
+    from app.utils import check_certification_expiration_alerts
+
+    with QueryCounter(db.engine) as contador, cronometro() as tiempo:
+        resumen = check_certification_expiration_alerts(send_emails=False, **kwargs)
+    return resumen, contador.count, tiempo['ms']
+
+
+def main():
+    from app.models import db
+
+    app = crear_app_benchmark()
+    filas = []
+
+    with app.app_context():
+        for total in CERTIFICACIONES:
+            poblar(db, total)
+            for etapa, kwargs in (('simulación', {'dry_run': True}), ('1ª ejecución', {}), ('2ª ejecución', {})):
+                resumen, consultas, ms = medir(db, **kwargs)
+                filas.append((total, etapa, resumen['candidates'], resumen['alerts'], consultas, f'{ms:.1f}'))
+
+    imprimir_tabla(
+        'ALERTAS DE VENCIMIENTO - job por lotes',
+        ('Certificaciones', 'Etapa', 'Evaluadas', 'Alertas', 'Consultas', 'ms'),
+        filas
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: arranque en frío
+
+Cada medición se ejecuta en un proceso nuevo de Python (como una instancia
+nueva en Vercel) con `python -X importtime`, y registra:
+
+    • Tiempo total de imports y los módulos más costosos
+    • Tiempo de create_app() (con FAST_BOOT activo no se ejecuta db.create_all())
+    • Latencia de la primera petición (/auth/login)
+
+    python benchmarks/benchmark_arranque.py
+"""
+import os
+import re
+import subprocess
+import sys
+from comun import ROOT_DIR, imprimir_tabla
+
+REPETICIONES = 3
+MODULOS_TOP = 8
+MODULOS_PESADOS = ('openpyxl', 'reportlab')
+
+# Código que se ejecuta en el proceso hijo; imprime los tiempos en la última línea
+SCRIPT = """
+import time
+inicio = time.perf_counter()
+from app import create_app
+from config import config, TestingConfig
+importado = time.perf_counter()
+config['arranque'] = type('ArranqueConfig', (TestingConfig,), {{'FAST_BOOT': {fast_boot}, 'SQL_INSTRUMENTATION': False}})
+app = create_app('arranque')
+creada = time.perf_counter()
+app.test_client().get('/auth/login')
+fin = time.perf_counter()
+print('TIEMPOS', (importado - inicio) * 1000, (creada - importado) * 1000, (fin - creada) * 1000)
+"""
+
+LINEA_IMPORTTIME = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def ejecutar(fast_boot):
+    """Ejecuta el arranque en un proceso nuevo y devuelve (tiempos, imports)"""
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SCRIPT.format(fast_boot=fast_boot)],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    )
+
+    tiempos = next(linea for linea in proceso.stdout.splitlines() if linea.startswith('TIEMPOS'))
+    imports = {}
+    for linea in proceso.stderr.splitlines():
+        coincidencia = LINEA_IMPORTTIME.match(linea)
+        if coincidencia:
+            # (acumulado µs, profundidad); la sangría crece dos espacios por nivel
+            imports[coincidencia.group(4)] = (int(coincidencia.group(2)), (len(coincidencia.group(3)) - 1) // 2)
+
+    return [float(valor) for valor in tiempos.split()[1:]], imports
+
+
+def main():
+    filas = []
+    imports_fast_boot = {}
+
+    for fast_boot in (False, True):
+        mediciones = []
+        for _ in range(REPETICIONES):
+            tiempos, imports = ejecutar(fast_boot)
+            total_imports = sum(us for us, profundidad in imports.values() if profundidad == 0) / 1000
+            mediciones.append((total_imports, *tiempos))
+        if fast_boot:
+            imports_fast_boot = imports
+
+        # Mediana de cada columna
+        medianas = [sorted(columna)[len(columna) // 2] for columna in zip(*mediciones)]
+        filas.append(('sí' if fast_boot else 'no', *(f'{valor:.0f}' for valor in medianas)))
+
+    imprimir_tabla(
+        f'ARRANQUE EN FRÍO - mediana de {REPETICIONES} procesos',
+        ('FAST_BOOT', 'Imports ms', 'from app ms', 'create_app ms', '1a petición ms'),
+        filas
+    )
+
+    modulos = sorted(
+        ((modulo, us) for modulo, (us, profundidad) in imports_fast_boot.items() if profundidad == 1),
+        key=lambda item: item[1], reverse=True
+    )[:MODULOS_TOP]
+    imprimir_tabla(
+        'IMPORTS MÁS COSTOSOS (acumulado, segundo nivel, FAST_BOOT activo)',
+        ('Módulo', 'ms'),
+        [(modulo, f'{us / 1000:.1f}') for modulo, us in modulos]
+    )
+
+    cargados = [modulo for modulo in MODULOS_PESADOS if modulo in imports_fast_boot]
+    print(f"Librerías de reportes cargadas al arrancar: {', '.join(cargados) if cargados else 'ninguna'}")
+
+
+if __name__ == '__main__':
+    main()
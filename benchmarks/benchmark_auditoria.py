@@ -0,0 +1,100 @@
+"""
+Benchmark: escritura del registro de auditoría
+
+Registra ENTRADAS acciones de auditoría con tres estrategias y mide el tiempo
+que espera quien registra (la petición) y los commits realizados:
+
+    • anterior → AuditLog + db.session.commit() por cada acción
+    • cola     → queue_action(): el hilo de app/audit_writer.py inserta por lotes
+    • sesión   → record_action() + el commit que la mutación ya hacía
+                 (se compara con la mutación anterior: cambio + commit + log + commit)
+
+    python benchmarks/benchmark_auditoria.py
+"""
+import os
+import tempfile
+from comun import crear_app_benchmark, cronometro, imprimir_tabla
+
+ENTRADAS = 2000
+
+
+def contar_commits(engine):
+    """Cuenta los COMMIT del engine: devuelve un dict que se actualiza en cada commit"""
+    from sqlalchemy import event
+
+    contador = {'commits': 0}
+
+    @event.listens_for(engine, 'commit')
+    def _on_commit(conn):
+        contador['commits'] += 1
+
+    return contador
+
+
+def main():
+    from app.models import db, AuditLog, Policy
+    from app.audit_writer import queue_action, record_action
+
+    archivo = os.path.join(tempfile.mkdtemp(), 'auditoria.db')
+    app = crear_app_benchmark(
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{archivo}',
+        SQL_INSTRUMENTATION=False,
+        AUDIT_LOG_ASYNC=True
+    )
+    writer = app.extensions['audit_writer']
+    filas = []
+
+    with app.app_context():
+        db.create_all()
+        contador = contar_commits(db.engine)
+        policy = Policy(title='Política', description='Descripción', version='1.0')
+        db.session.add(policy)
+        db.session.commit()
+
+        # Acciones sin cambios propios (login, ver política)
+        contador['commits'] = 0
+        with cronometro() as tiempo:
+            for _ in range(ENTRADAS):
+                db.session.add(AuditLog(action='login'))
+                db.session.commit()
+        filas.append(('login anterior', f"{tiempo['ms'] / ENTRADAS:.3f}", contador['commits'] / ENTRADAS))
+
+        contador['commits'] = 0
+        with cronometro() as tiempo:
+            for _ in range(ENTRADAS):
+                queue_action('login')
+        writer.stop()
+        filas.append(('login en cola', f"{tiempo['ms'] / ENTRADAS:.3f}", contador['commits'] / ENTRADAS))
+
+        # Mutaciones: close_finding / reopen_finding hacían dos commits.
+        # Los contadores de los registros se suman en los lotes del hilo
+        writer.start()
+        contador['commits'] = 0
+        with cronometro() as tiempo:
+            for i in range(ENTRADAS):
+                policy.version = str(i)
+                db.session.commit()
+                db.session.add(AuditLog(action='update', entity_type='policy', entity_id=policy.id))
+                db.session.commit()
+        filas.append(('mutación anterior', f"{tiempo['ms'] / ENTRADAS:.3f}", contador['commits'] / ENTRADAS))
+
+        contador['commits'] = 0
+        with cronometro() as tiempo:
+            for i in range(ENTRADAS):
+                policy.version = str(i)
+                record_action('update', entity_type='policy', entity_id=policy.id)
+                db.session.commit()
+        filas.append(('mutación + sesión', f"{tiempo['ms'] / ENTRADAS:.3f}", contador['commits'] / ENTRADAS))
+        writer.stop()
+
+        total = db.session.query(db.func.count(AuditLog.id)).scalar()
+
+    imprimir_tabla(
+        f'REGISTRO DE AUDITORÍA - {ENTRADAS} acciones por estrategia ({total} filas escritas)',
+        ('Estrategia', 'ms por acción', 'Commits por acción'),
+        filas
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: visor del registro de auditoría
+
+Compara, sobre REGISTROS filas de audit_logs:
+    • Paginación OFFSET (anterior) vs. paginación por cursor en páginas profundas
+    • COUNT(*) + date(created_at) = hoy (anterior) vs. audit_log_counters
+
+    python benchmarks/benchmark_bitacora.py
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta
+from comun import crear_app_benchmark, cronometro, imprimir_tabla
+
+REGISTROS = 200000
+POR_PAGINA = 20
+PAGINAS = (1, 100, 5000)
+ACCIONES = ('login', 'logout', 'update', 'create', 'view_policy')
+
+
+def poblar(db):
+    from app.models import User, AuditLog
+    from app.audit_log import rebuild_audit_log_counters
+
+    db.create_all()
+    user = User(username='admin', email='admin@frutosoro.com', full_name='Admin', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+
+    inicio = datetime.now() - timedelta(days=365)
+    paso = timedelta(days=365) / REGISTROS
+    for desde in range(0, REGISTROS, 10000):
+        db.session.execute(db.insert(AuditLog), [{
+            'user_id': user.id,
+            'action': ACCIONES[i % len(ACCIONES)],
+            'entity_type': 'policy',
+            'created_at': inicio + paso * i
+        } for i in range(desde, min(desde + 10000, REGISTROS))])
+    db.session.commit()
+    rebuild_audit_log_counters()
+
+
+def main():
+    from sqlalchemy import func
+    from app.models import db, AuditLog
+    from app.audit_log import paginate_audit_log, get_audit_log_stats
+
+    archivo = os.path.join(tempfile.mkdtemp(), 'bitacora.db')
+    app = crear_app_benchmark(SQLALCHEMY_DATABASE_URI=f'sqlite:///{archivo}', SQL_INSTRUMENTATION=False)
+    filas = []
+
+    with app.app_context():
+        poblar(db)
+
+        for pagina in PAGINAS:
+            with cronometro() as offset:
+                AuditLog.query.order_by(AuditLog.created_at.desc()).offset((pagina - 1) * POR_PAGINA).limit(POR_PAGINA).all()
+
+            # El cursor de la página anterior se obtiene fuera de la medición
+            cursor = None
+            if pagina > 1:
+                ultimo = AuditLog.query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).offset(
+                    (pagina - 1) * POR_PAGINA - 1).first()
+                cursor = f"{ultimo.created_at.strftime('%Y%m%d%H%M%S%f')}-{ultimo.id}"
+            with cronometro() as keyset:
+                paginate_audit_log(AuditLog.query, before=cursor, per_page=POR_PAGINA)
+
+            filas.append((f'página {pagina}', f"{offset['ms']:.2f}", f"{keyset['ms']:.2f}"))
+
+        with cronometro() as conteo:
+            AuditLog.query.count()
+            AuditLog.query.filter(func.date(AuditLog.created_at) == datetime.now().date()).count()
+            db.session.query(func.count(func.distinct(AuditLog.action))).scalar()
+        with cronometro() as contadores:
+            get_audit_log_stats()
+        filas.append(('estadísticas', f"{conteo['ms']:.2f}", f"{contadores['ms']:.2f}"))
+
+    imprimir_tabla(
+        f'REGISTRO DE AUDITORÍA - {REGISTROS} filas, {POR_PAGINA} por página',
+        ('Consulta', 'Anterior ms', 'Nuevo ms'),
+        filas
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: exportación de reportes a Excel
+
+Mide el tiempo, las consultas y el pico de memoria de Python (tracemalloc) de
+generate_excel_report('audits') al aumentar el número de auditorías. Con el
+libro write-only y yield_per el pico de memoria debe mantenerse casi plano.
+
+    python benchmarks/benchmark_excel.py
+"""
+import tracemalloc
+from datetime import date, timedelta
+from comun import crear_app_benchmark, QueryCounter, cronometro, imprimir_tabla
+
+AUDITORIAS = (1000, 10000, 50000)
+
+
+def poblar(db, total):
+    """Crea un responsable, total auditorías y un hallazgo crítico cada 3 auditorías"""
+    from app.models import User, Audit, AuditFinding
+
+    db.drop_all()
+    db.create_all()
+
+    user = User(username='auditor', email='auditor@frutosoro.com', full_name='Auditor', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+
+    today = date.today()
+    db.session.execute(db.insert(Audit), [{
+        'audit_type': 'interna' if i % 2 else 'externa',
+        'evaluated_area': f'Área {i % 40}',
+        'scheduled_date': today - timedelta(days=i % 700),
+        'status': 'programada',
+        'responsible_id': user.id
+    } for i in range(total)])
+    db.session.execute(db.insert(AuditFinding), [{
+        'audit_id': audit_id,
+        'description': 'Hallazgo',
+        'severity': 'critica',
+        'status': 'abierto'
+    } for audit_id in range(1, total + 1, 3)])
+    db.session.commit()
+
+
+def main():
+    from app.models import db
+    from app.utils import generate_excel_report
+
+    app = crear_app_benchmark()
+    filas = []
+
+    with app.app_context():
+        for total in AUDITORIAS:
+            poblar(db, total)
+            db.session.expunge_all()
+
+            with QueryCounter(db.engine) as contador, cronometro() as tiempo:
+                archivo = generate_excel_report('audits')
+            archivo.seek(0, 2)
+            tamano = archivo.tell()
+            archivo.close()
+
+            # Segunda ejecución solo para la memoria (tracemalloc hace todo más lento)
+            tracemalloc.start()
+            generate_excel_report('audits').close()
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            filas.append((total, contador.count, f"{tiempo['ms']:.0f}", f'{pico / 1024 / 1024:.1f}', f'{tamano / 1024:.0f}'))
+
+    imprimir_tabla(
+        'REPORTE EXCEL DE AUDITORÍAS - streaming (write-only + yield_per)',
+        ('Auditorías', 'Consultas', 'ms', 'Pico MB', 'XLSX KB'),
+        filas
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: importación masiva de certificaciones
+
+Compara el registro fila a fila (como el formulario: un INSERT, un AuditLog y
+un commit por certificación) con import_records, que valida por lotes y usa un
+INSERT con executemany por lote. Se importa el mismo archivo en CSV y Excel.
+
+    python benchmarks/benchmark_importacion.py
+"""
+import csv
+import io
+from datetime import date, timedelta
+from comun import crear_app_benchmark, cronometro, imprimir_tabla, QueryCounter
+
+REGISTROS = (500, 5000, 20000)
+ENCABEZADOS = ['Nombre', 'Norma', 'Entidad Emisora', 'Fecha Emisión', 'Fecha Vencimiento', 'Responsable']
+
+
+def preparar(db):
+    """Tablas vacías y 20 usuarios"""
+    from app.models import User
+
+    db.drop_all()
+    db.create_all()
+    db.session.add_all([User(username=f'user{i}', email=f'user{i}@frutosoro.com', full_name=f'Usuario {i}', password_hash='x')
+                        for i in range(20)])
+    db.session.commit()
+
+
+def filas_archivo(total):
+    today = date.today()
+    for i in range(total):
+        yield [f'Certificación {i}', 'ISO 22000', 'Entidad', today - timedelta(days=365),
+               today + timedelta(days=i % 400 + 1), f'user{i % 20}']
+
+
+def archivo_csv(total):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(ENCABEZADOS)
+    writer.writerows([value.isoformat() if isinstance(value, date) else value for value in row]
+                     for row in filas_archivo(total))
+    return io.BytesIO(buffer.getvalue().encode('utf-8'))
+
+
+def archivo_excel(total):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(ENCABEZADOS)
+    for row in filas_archivo(total):
+        sheet.append(row)
+    output = io.BytesIO()
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+
+def fila_a_fila(db, total):
+    """Equivalente a enviar el formulario de nueva certificación total veces"""
+    from app.models import User, Certification
+    from app.audit_writer import record_action
+
+    for row in filas_archivo(total):
+        name, norm, issuing_entity, emission_date, expiration_date, username = row
+        responsible = User.query.filter_by(username=username).first()
+        certification = Certification(name=name, norm=norm, issuing_entity=issuing_entity,
+                                      emission_date=emission_date, expiration_date=expiration_date,
+                                      responsible_id=responsible.id)
+        certification.status = certification.current_status
+        db.session.add(certification)
+        db.session.flush()
+        record_action('create', entity_type='certification', entity_id=certification.id)
+        db.session.commit()
+
+
+def main():
+    from app.models import db
+    from app.bulk_import import import_records
+
+    app = crear_app_benchmark()
+    filas = []
+
+    with app.app_context():
+        for total in REGISTROS:
+            # Los archivos se arman antes de medir
+            datos_csv, datos_excel = archivo_csv(total), archivo_excel(total)
+            metodos = [('csv', lambda: import_records('certifications', datos_csv, 'datos.csv', 1)),
+                       ('xlsx', lambda: import_records('certifications', datos_excel, 'datos.xlsx', 1))]
+            # Fila a fila solo con volúmenes pequeños (es lineal)
+            if total <= 5000:
+                metodos.insert(0, ('fila a fila', lambda: fila_a_fila(db, total)))
+
+            for metodo, importar in metodos:
+                preparar(db)
+                with QueryCounter(db.engine) as consultas, cronometro() as tiempo:
+                    importar()
+                filas.append((total, metodo, consultas.count, f"{tiempo['ms']:.0f}",
+                              int(total / (tiempo['ms'] / 1000)) if tiempo['ms'] else total))
+
+    imprimir_tabla(
+        'IMPORTACIÓN DE CERTIFICACIONES',
+        ('Registros', 'Método', 'Consultas', 'ms', 'Filas/s'),
+        filas
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark: envío de correos desde el outbox
+
+Levanta un servidor SMTP local (aiosmtpd) con una latencia simulada por
+mensaje y compara:
+    • Una conexión SMTP nueva por correo (comportamiento anterior)
+    • drain(): un solo hilo reutilizando la conexión
+    • Pool de workers: varios hilos, una conexión por hilo
+
+Requiere aiosmtpd (solo para el benchmark):
+
+    pip install aiosmtpd
+    python benchmarks/benchmark_outbox.py
+"""
+import os
+import smtplib
+import tempfile
+import time
+from comun import crear_app_benchmark, cronometro, imprimir_tabla
+
+CORREOS = 200
+LATENCIA_CONEXION = 0.02   # Segundos simulados de handshake por conexión
+LATENCIA_MENSAJE = 0.005   # Segundos simulados por mensaje
+PUERTO = 10259
+
+
+class HandlerLento:
+    """Handler de aiosmtpd que simula la latencia de un servidor real"""
+
+    def __init__(self):
+        self.recibidos = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        import asyncio
+        await asyncio.sleep(LATENCIA_CONEXION)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        import asyncio
+        await asyncio.sleep(LATENCIA_MENSAJE)
+        self.recibidos += 1
+        return '250 OK'
+
+
+def encolar(db, total):
+    from app.models import EmailOutbox
+    from app.mailer import enqueue_email
+
+    EmailOutbox.query.delete()
+    db.session.commit()
+    for i in range(total):
+        enqueue_email(f'usuario{i}@frutosoro.com', f'Alerta {i}', 'Cuerpo de prueba', commit=False)
+    db.session.commit()
+
+
+def conexion_por_correo(app, total):
+    """Como el send_email_alert original: abre y cierra una conexión por mensaje"""
+    from app.mailer import build_email_message
+
+    for i in range(total):
+        with smtplib.SMTP(app.config['MAIL_SERVER'], app.config['MAIL_PORT']) as smtp:
+            smtp.send_message(build_email_message(
+                app.config['MAIL_DEFAULT_SENDER'], f'usuario{i}@frutosoro.com', f'Alerta {i}', 'Cuerpo de prueba'
+            ))
+
+
+def pool(app, workers):
+    """Inicia el pool y espera a que la cola quede vacía"""
+    from app.models import EmailOutbox
+    from app.mailer import OutboxWorkerPool
+
+    workers_pool = OutboxWorkerPool(app, workers=workers).start()
+    limite = time.monotonic() + 60
+    while EmailOutbox.query.filter(EmailOutbox.status.in_(('pendiente', 'enviando'))).count():
+        if time.monotonic() > limite:
+            print('⚠️  Tiempo agotado esperando al pool')
+            break
+        time.sleep(0.05)
+    workers_pool.stop()
+
+
+def main():
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        print('Este benchmark necesita aiosmtpd: pip install aiosmtpd')
+        return
+
+    from app.models import db
+    from app.mailer import OutboxWorkerPool
+
+    handler = HandlerLento()
+    controller = Controller(handler, hostname='127.0.0.1', port=PUERTO)
+    controller.start()
+
+    # Archivo SQLite (no :memory:) para que los hilos del pool compartan la base
+    archivo = os.path.join(tempfile.mkdtemp(), 'outbox.db')
+    app = crear_app_benchmark(
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{archivo}',
+        SQLALCHEMY_ENGINE_OPTIONS={'connect_args': {'timeout': 30}},
+        MAIL_SERVER='127.0.0.1', MAIL_PORT=PUERTO, MAIL_USE_TLS=False,
+        MAIL_USERNAME=None, MAIL_RATE_LIMIT=0, MAIL_POLL_SECONDS=0.1
+    )
+    filas = []
+
+    try:
+        with app.app_context():
+            db.create_all()
+
+            with cronometro() as tiempo:
+                conexion_por_correo(app, CORREOS)
+            filas.append(('Conexión por correo', 1, CORREOS, f"{tiempo['ms']:.0f}", f"{CORREOS / tiempo['ms'] * 1000:.0f}"))
+
+            encolar(db, CORREOS)
+            with cronometro() as tiempo:
+                enviados = OutboxWorkerPool(app).drain()['sent']
+            filas.append(('drain()', 1, enviados, f"{tiempo['ms']:.0f}", f"{enviados / tiempo['ms'] * 1000:.0f}"))
+
+            for workers in (2, 4):
+                encolar(db, CORREOS)
+                with cronometro() as tiempo:
+                    pool(app, workers)
+                filas.append(('Pool de workers', workers, CORREOS, f"{tiempo['ms']:.0f}", f"{CORREOS / tiempo['ms'] * 1000:.0f}"))
+    finally:
+        controller.stop()
+
+    imprimir_tabla(
+        f'OUTBOX DE CORREOS - {CORREOS} correos, {LATENCIA_MENSAJE * 1000:.0f} ms/mensaje',
+        ('Estrategia', 'Hilos', 'Enviados', 'ms', 'Correos/s'),
+        filas
+    )
+
+
+if __name__ == '__main__':
+    main()
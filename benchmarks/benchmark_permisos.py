@@ -0,0 +1,69 @@
+"""
+Benchmark: matriz de permisos en /admin/permissions
+
+Mide cuántas consultas ejecuta la construcción de la matriz rol × módulo al
+aumentar el número de módulos. Con PermissionMatrix el número de consultas
+debe mantenerse constante (roles + módulos + una consulta de permisos).
+
+    python benchmarks/benchmark_permisos.py
+"""
+from comun import crear_app_benchmark, QueryCounter, cronometro, imprimir_tabla
+
+ROLES = 7
+MODULOS = (5, 20, 80, 320)
+
+
+def poblar(db, total_modulos):
+    """Crea ROLES roles, total_modulos módulos y un permiso por cada par"""
+    from app.models import Role, Module, RolePermission
+
+    db.drop_all()
+    db.create_all()
+
+    roles = [Role(name=f'rol_{i}', display_name=f'Rol {i}') for i in range(ROLES)]
+    modules = [Module(name=f'modulo_{i}', display_name=f'Módulo {i}', display_order=i) for i in range(total_modulos)]
+    db.session.add_all(roles + modules)
+    db.session.flush()
+
+    for role in roles:
+        for module in modules:
+            db.session.add(RolePermission(role_id=role.id, module_id=module.id, can_view=True))
+    db.session.commit()
+
+
+def construir_matriz():
+    """Mismo trabajo que la vista admin.permissions"""
+    from app.models import Role, Module
+    from app.permissions import PermissionMatrix
+
+    roles = Role.query.order_by(Role.id).all()
+    modules = Module.query.filter_by(is_active=True).order_by(Module.display_order).all()
+    return PermissionMatrix.load().as_dict(roles, modules)
+
+
+def main():
+    from app.models import db
+
+    app = crear_app_benchmark()
+    filas = []
+
+    with app.app_context():
+        for total_modulos in MODULOS:
+            poblar(db, total_modulos)
+            db.session.expunge_all()
+
+            with QueryCounter(db.engine) as contador, cronometro() as tiempo:
+                matriz = construir_matriz()
+
+            celdas = sum(len(fila) for fila in matriz.values())
+            filas.append((ROLES, total_modulos, celdas, contador.count, f"{tiempo['ms']:.1f}"))
+
+    imprimir_tabla(
+        'MATRIZ DE PERMISOS - consultas por carga de /admin/permissions',
+        ('Roles', 'Módulos', 'Celdas', 'Consultas', 'ms'),
+        filas
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: confirmaciones al crear una política
+
+Compara la creación de las confirmaciones pendientes para USUARIOS usuarios
+activos:
+
+    • anterior → cargar cada User como objeto ORM y agregar un PolicyConfirmation por usuario
+    • bulk     → PolicyConfirmation.enroll_active_users(): un solo INSERT ... SELECT
+
+    python benchmarks/benchmark_politicas.py
+"""
+from comun import crear_app_benchmark, QueryCounter, cronometro, imprimir_tabla
+
+USUARIOS = (100, 1000, 5000)
+
+
+def poblar(db, total):
+    from app.models import User
+
+    db.drop_all()
+    db.create_all()
+    db.session.execute(db.insert(User), [{
+        'username': f'user{i}',
+        'email': f'user{i}@frutosoro.com',
+        'full_name': f'Usuario {i}',
+        'password_hash': 'x',
+        'is_active': True
+    } for i in range(total)])
+    db.session.commit()
+
+
+def crear_politica(db, titulo):
+    from app.models import Policy
+
+    policy = Policy(title=titulo, description='Descripción')
+    db.session.add(policy)
+    db.session.flush()
+    return policy
+
+
+def main():
+    from app.models import db, User, PolicyConfirmation
+
+    app = crear_app_benchmark(SQL_INSTRUMENTATION=False)
+    filas = []
+
+    with app.app_context():
+        for total in USUARIOS:
+            poblar(db, total)
+
+            with QueryCounter(db.engine) as consultas, cronometro() as tiempo:
+                policy = crear_politica(db, 'Anterior')
+                for user in User.query.filter_by(is_active=True).all():
+                    db.session.add(PolicyConfirmation(policy_id=policy.id, user_id=user.id))
+                db.session.commit()
+            filas.append((total, 'anterior', consultas.count, f"{tiempo['ms']:.0f}"))
+            db.session.expunge_all()
+
+            with QueryCounter(db.engine) as consultas, cronometro() as tiempo:
+                policy = crear_politica(db, 'Bulk')
+                PolicyConfirmation.enroll_active_users(policy.id)
+                db.session.commit()
+            filas.append((total, 'bulk', consultas.count, f"{tiempo['ms']:.0f}"))
+
+    imprimir_tabla(
+        'CONFIRMACIONES AL CREAR UNA POLÍTICA',
+        ('Usuarios', 'Estrategia', 'Consultas', 'ms'),
+        filas
+    )
+
+
+if __name__ == '__main__':
+    main()
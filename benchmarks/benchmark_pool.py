@@ -0,0 +1,151 @@
+"""
+Benchmark: estrategias de pool de conexiones en serverless
+
+Simula una base de datos remota sobre SQLite agregando latencia de red:
+abrir una conexión cuesta CONEXION_MS (TCP + TLS + autenticación) y cada
+sentencia cuesta RTT_MS. El pooler local (estrategia proxy) se simula con
+conexiones baratas (PROXY_CONEXION_MS) y un salto extra por sentencia.
+
+Cada "petición" abre un contexto de aplicación, ejecuta CONSULTAS sentencias y
+devuelve la conexión. El tráfico llega en ráfagas separadas por pausas, y cada
+INSTANCIA_PETICIONES peticiones se simula un arranque en frío (pool nuevo).
+
+Estrategias:
+    • anterior → QueuePool 5+2 con pool_pre_ping (configuración previa de producción)
+    • queue / null / proxy → ver app/pooling.py
+
+    python benchmarks/benchmark_pool.py
+"""
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from comun import crear_app_benchmark, imprimir_tabla
+
+CONEXION_MS = 30
+PROXY_CONEXION_MS = 1
+RTT_MS = 2
+PROXY_RTT_MS = 0.3
+CONSULTAS = 3
+PETICIONES = 300
+RAFAGA = 10                 # Peticiones seguidas antes de una pausa
+PAUSA_SEGUNDOS = 0.15       # Pausa entre ráfagas
+INSTANCIA_PETICIONES = 100  # Peticiones por instancia antes de un arranque en frío
+
+# Contadores de la red simulada
+RED = {'conexiones': 0, 'pings': 0}
+
+
+class CursorRemoto:
+    """Cursor que agrega el RTT de red a cada sentencia"""
+
+    def __init__(self, cursor, rtt):
+        self._cursor = cursor
+        self._rtt = rtt
+
+    def execute(self, statement, *args):
+        if statement.strip().upper() == 'SELECT 1':
+            RED['pings'] += 1
+        time.sleep(self._rtt / 1000)
+        return self._cursor.execute(statement, *args)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class ConexionRemota:
+    """Conexión sqlite3 con el costo de conexión y la latencia de una base remota"""
+
+    def __init__(self, path, costo_ms, rtt):
+        RED['conexiones'] += 1
+        time.sleep(costo_ms / 1000)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._rtt = rtt
+
+    def cursor(self, *args):
+        return CursorRemoto(self._conn.cursor(*args), self._rtt)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def opciones_engine(estrategia, archivo):
+    """Opciones del engine para la estrategia, con la red simulada"""
+    from sqlalchemy.pool import QueuePool
+    from app.pooling import build_engine_options
+
+    if estrategia == 'anterior':
+        opciones = {'poolclass': QueuePool, 'pool_size': 5, 'max_overflow': 2,
+                    'pool_recycle': 3600, 'pool_pre_ping': True}
+    else:
+        _, opciones = build_engine_options({
+            'DB_POOL_STRATEGY': estrategia,
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{archivo}',
+            'DB_PING_IDLE_SECONDS': PAUSA_SEGUNDOS / 2
+        })
+        if estrategia == 'queue':
+            opciones['poolclass'] = QueuePool
+
+    costo, rtt = (PROXY_CONEXION_MS, RTT_MS + PROXY_RTT_MS) if estrategia == 'proxy' else (CONEXION_MS, RTT_MS)
+    opciones['creator'] = lambda: ConexionRemota(archivo, costo, rtt)
+    return opciones
+
+
+def medir(estrategia, archivo):
+    from app.models import db
+    from app.pooling import install_liveness_check
+
+    RED['conexiones'] = RED['pings'] = 0
+    app = crear_app_benchmark(
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{archivo}',
+        SQLALCHEMY_ENGINE_OPTIONS=opciones_engine(estrategia, archivo),
+        SQL_INSTRUMENTATION=False
+    )
+    with app.app_context():
+        engine = db.engine
+    if estrategia == 'queue':
+        install_liveness_check(engine, PAUSA_SEGUNDOS / 2)
+
+    latencias = []
+    for i in range(PETICIONES):
+        if i and i % INSTANCIA_PETICIONES == 0:
+            engine.dispose()  # Arranque en frío: instancia nueva sin conexiones
+        if i and i % RAFAGA == 0:
+            time.sleep(PAUSA_SEGUNDOS)
+
+        inicio = time.perf_counter()
+        with app.app_context():
+            for _ in range(CONSULTAS):
+                db.session.execute(db.text('SELECT count(*) FROM users')).scalar()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+
+    engine.dispose()
+    latencias.sort()
+    return (
+        estrategia,
+        f'{statistics.median(latencias):.1f}',
+        f'{latencias[int(len(latencias) * 0.99) - 1]:.1f}',
+        RED['conexiones'],
+        RED['pings']
+    )
+
+
+def main():
+    archivo = os.path.join(tempfile.mkdtemp(), 'pool.db')
+    app = crear_app_benchmark(SQLALCHEMY_DATABASE_URI=f'sqlite:///{archivo}')
+    from app.models import db
+    with app.app_context():
+        db.create_all()
+
+    filas = [medir(estrategia, archivo) for estrategia in ('anterior', 'queue', 'null', 'proxy')]
+
+    imprimir_tabla(
+        f'POOL DE CONEXIONES - {PETICIONES} peticiones, conexión {CONEXION_MS} ms, RTT {RTT_MS} ms',
+        ('Estrategia', 'p50 ms', 'p99 ms', 'Conexiones', 'Pings'),
+        filas
+    )
+
+
+if __name__ == '__main__':
+    main()
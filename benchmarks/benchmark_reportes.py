@@ -0,0 +1,88 @@
+"""
+Benchmark: consultas de las exportaciones de reportes
+
+Genera los reportes PDF y Excel de certificaciones y auditorías con distintos
+volúmenes y muestra las consultas que cuenta count_queries(). Con los
+loaders de reportes el número de consultas no depende del número de filas.
+
+    python benchmarks/benchmark_reportes.py
+"""
+from datetime import date, timedelta
+from comun import crear_app_benchmark, cronometro, imprimir_tabla
+
+REGISTROS = (50, 500, 2000)
+EXPORTACIONES = (
+    ('pdf', 'certifications'),
+    ('pdf', 'audits'),
+    ('excel', 'certifications'),
+    ('excel', 'audits'),
+)
+
+
+def poblar(db, total):
+    """Crea total certificaciones y total auditorías con dos hallazgos cada una, con varios responsables"""
+    from app.models import User, Certification, Audit, AuditFinding
+
+    db.drop_all()
+    db.create_all()
+
+    users = [User(username=f'user{i}', email=f'user{i}@frutosoro.com', full_name=f'Usuario {i}', password_hash='x')
+             for i in range(20)]
+    db.session.add_all(users)
+    db.session.flush()
+
+    today = date.today()
+    db.session.execute(db.insert(Certification), [{
+        'name': f'Certificación {i}',
+        'norm': 'ISO 22000',
+        'issuing_entity': 'Entidad',
+        'emission_date': today - timedelta(days=365),
+        'expiration_date': today + timedelta(days=i % 400 - 30),
+        'responsible_id': users[i % len(users)].id,
+        'status': 'vigente'
+    } for i in range(total)])
+    db.session.execute(db.insert(Audit), [{
+        'audit_type': 'interna',
+        'evaluated_area': f'Área {i}',
+        'scheduled_date': today,
+        'status': 'programada',
+        'responsible_id': users[i % len(users)].id
+    } for i in range(total)])
+    db.session.execute(db.insert(AuditFinding), [{
+        'audit_id': audit_id,
+        'description': 'Hallazgo',
+        'severity': severity,
+        'status': 'abierto'
+    } for audit_id in range(1, total + 1) for severity in ('critica', 'menor')])
+    db.session.commit()
+
+
+def main():
+    from app.models import db
+    from app.utils import generate_pdf_report, generate_excel_report, count_queries
+
+    app = crear_app_benchmark()
+    filas = []
+
+    with app.app_context():
+        for total in REGISTROS:
+            poblar(db, total)
+            for formato, tipo in EXPORTACIONES:
+                # Sesión limpia: nada precargado de la exportación anterior
+                db.session.expunge_all()
+                with cronometro() as tiempo, count_queries() as consultas:
+                    if formato == 'pdf':
+                        generate_pdf_report(tipo).close()
+                    else:
+                        generate_excel_report(tipo).close()
+                filas.append((total, formato, tipo, consultas['count'], f"{tiempo['ms']:.0f}"))
+
+    imprimir_tabla(
+        'EXPORTACIÓN DE REPORTES - consultas por exportación',
+        ('Registros', 'Formato', 'Reporte', 'Consultas', 'ms'),
+        filas
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Utilidades compartidas por los benchmarks
+
+Todos los benchmarks usan la configuración 'testing' (SQLite en memoria),
+así que se pueden ejecutar sin MySQL:
+
+    python benchmarks/benchmark_permisos.py
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# Agregar el directorio raíz al path para importar la aplicación
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def crear_app_benchmark(**overrides):
+    """
+    Crea la aplicación en modo testing con la configuración adicional indicada
+
+    La configuración se aplica antes de crear la app para que también afecte
+    al engine (SQLALCHEMY_DATABASE_URI, SQLALCHEMY_ENGINE_OPTIONS).
+    """
+    from app import create_app
+    from config import config, TestingConfig
+
+    config['benchmark'] = type('BenchmarkConfig', (TestingConfig,), overrides)
+    return create_app('benchmark')
+
+
+class QueryCounter:
+    """Cuenta las sentencias SQL ejecutadas por el engine mientras está activo"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+        return False
+
+
+@contextmanager
+def cronometro():
+    """Mide el tiempo transcurrido en milisegundos: with cronometro() as t: ...; t['ms']"""
+    resultado = {'ms': 0.0}
+    inicio = time.perf_counter()
+    try:
+        yield resultado
+    finally:
+        resultado['ms'] = (time.perf_counter() - inicio) * 1000
+
+
+def imprimir_tabla(titulo, columnas, filas):
+    """Imprime una tabla simple de resultados"""
+    print("=" * 70)
+    print(titulo)
+    print("=" * 70)
+    anchos = [max(len(str(c)), *(len(str(f[i])) for f in filas)) for i, c in enumerate(columnas)]
+    print("  ".join(str(c).rjust(anchos[i]) for i, c in enumerate(columnas)))
+    print("-" * 70)
+    for fila in filas:
+        print("  ".join(str(v).rjust(anchos[i]) for i, v in enumerate(fila)))
+    print()
@@ -31,13 +31,73 @@ class Config:
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
     ALLOWED_EXTENSIONS = {'pdf', 'jpg', 'jpeg', 'png', 'doc', 'docx', 'xls', 'xlsx'}
     
+    # Vista previa de documentos (ver send_document en app/utils.py)
+    DOCUMENT_CACHE_MAX_AGE = int(os.environ.get('DOCUMENT_CACHE_MAX_AGE', 0))  # 0 = revalidar siempre (304)
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'false').lower() in ('true', '1', 'yes')  # Apache/lighttpd
+    DOCUMENT_ACCEL_REDIRECT_PREFIX = os.environ.get('DOCUMENT_ACCEL_REDIRECT_PREFIX', '')  # nginx: location interna de UPLOAD_FOLDER
+    
+    # Almacén de documentos por contenido (ver app/document_store.py)
+    DOCUMENT_STORE_FOLDER = os.environ.get('DOCUMENT_STORE_FOLDER', '')   # Vacío = UPLOAD_FOLDER/documents
+    DOCUMENT_GC_GRACE_HOURS = float(os.environ.get('DOCUMENT_GC_GRACE_HOURS', 24))  # Espera antes de borrar un archivo sin referencias
+    
     # Configuración de correo (lee desde .env)
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
     MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
-    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', True)
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'true').lower() in ('true', '1', 'yes')
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@frutosoro.com')
+    
+    # Outbox de correos (ver app/mailer.py)
+    MAIL_OUTBOX_AUTOSTART = os.environ.get('MAIL_OUTBOX_AUTOSTART', 'false').lower() in ('true', '1', 'yes')
+    MAIL_WORKERS = int(os.environ.get('MAIL_WORKERS', 2))            # Hilos = conexiones SMTP simultáneas
+    MAIL_BATCH_SIZE = int(os.environ.get('MAIL_BATCH_SIZE', 20))
+    MAIL_RATE_LIMIT = float(os.environ.get('MAIL_RATE_LIMIT', 5))     # Correos por segundo (0 = sin límite)
+    MAIL_MAX_ATTEMPTS = int(os.environ.get('MAIL_MAX_ATTEMPTS', 5))
+    MAIL_RETRY_BASE_SECONDS = int(os.environ.get('MAIL_RETRY_BASE_SECONDS', 30))
+    MAIL_POLL_SECONDS = int(os.environ.get('MAIL_POLL_SECONDS', 10))
+
+    # Registro de auditoría en segundo plano (ver app/audit_writer.py)
+    AUDIT_LOG_ASYNC = os.environ.get('AUDIT_LOG_ASYNC', 'true').lower() in ('true', '1', 'yes')
+    AUDIT_LOG_BATCH_SIZE = int(os.environ.get('AUDIT_LOG_BATCH_SIZE', 100))
+    AUDIT_LOG_FLUSH_SECONDS = float(os.environ.get('AUDIT_LOG_FLUSH_SECONDS', 2))
+    
+    # Reportes en segundo plano (ver app/report_jobs.py); 0 hilos = generar en la petición
+    REPORT_JOB_WORKERS = int(os.environ.get('REPORT_JOB_WORKERS', 2))
+    REPORT_JOB_TIMEOUT_SECONDS = int(os.environ.get('REPORT_JOB_TIMEOUT_SECONDS', 600))
+    REPORT_JOB_POLL_SECONDS = float(os.environ.get('REPORT_JOB_POLL_SECONDS', 1))
+    REPORT_ARTIFACT_FOLDER = os.environ.get('REPORT_ARTIFACT_FOLDER', '')   # Vacío = UPLOAD_FOLDER/reports
+    REPORT_STORE_MAX_BYTES = int(os.environ.get('REPORT_STORE_MAX_BYTES', 200 * 1024 * 1024))  # 0 = sin límite
+    REPORT_STORE_MAX_AGE_HOURS = float(os.environ.get('REPORT_STORE_MAX_AGE_HOURS', 72))       # 0 = sin límite
+
+    # Caché de permisos por rol (segundos, 0 = solo caché por petición)
+    PERMISSION_CACHE_TTL = int(os.environ.get('PERMISSION_CACHE_TTL', 300))
+    
+    # Identidad del usuario en la sesión (ver app/user_cache.py); segundos entre
+    # lecturas de users.session_version, 0 = leer el usuario en cada petición
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    
+    # Caché de contadores del dashboard (segundos, 0 = sin caché)
+    DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 60))
+    DASHBOARD_REFRESH_SECONDS = int(os.environ.get('DASHBOARD_REFRESH_SECONDS', 60))
+    
+    # Arranque rápido: no ejecutar db.create_all() al iniciar (usar: flask --app app init-db)
+    FAST_BOOT = os.environ.get('FAST_BOOT', 'false').lower() in ('true', '1', 'yes')
+    
+    # Pool de conexiones (ver app/pooling.py): queue, null, proxy o vacío
+    DB_POOL_STRATEGY = os.environ.get('DB_POOL_STRATEGY', '')
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 1))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 2))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 280))          # Menor que el wait_timeout del servidor
+    DB_PING_IDLE_SECONDS = int(os.environ.get('DB_PING_IDLE_SECONDS', 60))  # Verificar solo conexiones ociosas
+    DB_PROXY_HOST = os.environ.get('DB_PROXY_HOST', '127.0.0.1')            # Pooler local (estrategia proxy)
+    DB_PROXY_PORT = os.environ.get('DB_PROXY_PORT', '')
+    
+    # Instrumentación SQL por petición (ver app/instrumentation.py)
+    SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', 'true').lower() in ('true', '1', 'yes')
+    SQL_SLOW_QUERY_MS = int(os.environ.get('SQL_SLOW_QUERY_MS', 200))
+    SQL_STATS_HISTORY = int(os.environ.get('SQL_STATS_HISTORY', 200))
 
 class DevelopmentConfig(Config):
     """Configuración de desarrollo - XAMPP MySQL local
@@ -123,18 +183,23 @@ class ProductionConfig(Config):
         # Fallback si faltan variables
         SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', '')
     
-    # Pool de conexiones optimizado para serverless
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_size': 5,
-        'pool_recycle': 3600,
-        'pool_pre_ping': True,
-        'max_overflow': 2
-    }
+    # Pool de conexiones para serverless: cada instancia de Vercel tiene su propio
+    # pool, así que se usa uno pequeño (ver app/pooling.py y DB_POOL_STRATEGY)
+    DB_POOL_STRATEGY = os.environ.get('DB_POOL_STRATEGY', 'queue')
+    
+    # Sin db.create_all() en cada arranque en frío (tablas: init_production.py o flask init-db)
+    FAST_BOOT = os.environ.get('FAST_BOOT', 'true').lower() in ('true', '1', 'yes')
+    
+    # Vercel congela el proceso al responder: los registros se insertan en la petición
+    AUDIT_LOG_ASYNC = os.environ.get('AUDIT_LOG_ASYNC', 'false').lower() in ('true', '1', 'yes')
+    REPORT_JOB_WORKERS = int(os.environ.get('REPORT_JOB_WORKERS', 0))
 
 class TestingConfig(Config):
     """Configuración de pruebas"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    AUDIT_LOG_ASYNC = False
+    REPORT_JOB_WORKERS = 0
 
 config = {
     'development': DevelopmentConfig,
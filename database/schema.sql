@@ -178,6 +178,25 @@ CREATE TABLE `alerts` (
   INDEX `idx_created_at` (`created_at`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- Cola de Correos Salientes (outbox)
+CREATE TABLE `email_outbox` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `recipient_email` VARCHAR(120) NOT NULL,
+  `subject` VARCHAR(255) NOT NULL,
+  `body` TEXT NOT NULL,
+  `html_body` TEXT,
+  `alert_id` INT,
+  `status` VARCHAR(20) NOT NULL DEFAULT 'pendiente',
+  `attempts` INT NOT NULL DEFAULT 0,
+  `next_attempt_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `locked_at` DATETIME,
+  `last_error` TEXT,
+  `sent_at` DATETIME,
+  `created_at` DATETIME DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (`alert_id`) REFERENCES `alerts` (`id`) ON DELETE SET NULL,
+  INDEX `idx_outbox_status_next` (`status`, `next_attempt_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- Tabla de Registro de Auditoría del Sistema
 CREATE TABLE `audit_logs` (
   `id` INT AUTO_INCREMENT PRIMARY KEY,
@@ -193,6 +212,14 @@ CREATE TABLE `audit_logs` (
   INDEX `idx_entity_type` (`entity_type`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- Registros de auditoría por día y acción (estadísticas del visor, ver app/audit_log.py)
+CREATE TABLE `audit_log_counters` (
+  `day` DATE NOT NULL,
+  `action` VARCHAR(100) NOT NULL,
+  `total` INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (`day`, `action`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- ====================================================================
 -- DATOS INICIALES
 -- ====================================================================
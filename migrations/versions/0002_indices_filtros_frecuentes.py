@@ -0,0 +1,126 @@
+"""índices de filtros frecuentes
+
+Declara en los modelos los índices que solo existían en database/schema.sql
+(db.create_all() no los creaba) y los de paginación por cursor.
+
+Se crean solo los que faltan, así que se puede aplicar sobre una base creada
+con db.create_all() o con schema.sql. Los índices de schema.sql que quedan
+cubiertos por los nuevos se eliminan.
+
+También crea audit_log_counters si falta (bases creadas con una versión de
+schema.sql anterior a esa tabla y marcadas con "db stamp 0001") y la llena
+con los registros existentes.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 13:49:23.373481
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+# tabla → [(nombre, columnas)]
+INDEXES = {
+    'certifications': [
+        ('idx_certifications_expiration', ['expiration_date', 'id']),
+        ('idx_certifications_status', ['status']),
+        ('idx_certifications_responsible_expiration', ['responsible_id', 'expiration_date']),
+    ],
+    'audits': [
+        ('idx_audits_scheduled', ['scheduled_date', 'id']),
+        ('idx_audits_status_scheduled', ['status', 'scheduled_date']),
+        ('idx_audits_type_scheduled', ['audit_type', 'scheduled_date']),
+        ('idx_audits_responsible_scheduled', ['responsible_id', 'scheduled_date']),
+        ('idx_audits_created', ['created_at']),
+    ],
+    'audit_findings': [
+        ('idx_audit_findings_audit_severity_status', ['audit_id', 'severity', 'status']),
+    ],
+    'policies': [
+        ('idx_policies_active_effective', ['is_active', 'effective_date']),
+    ],
+    'policy_confirmations': [
+        ('idx_policy_confirmations_policy_user', ['policy_id', 'user_id']),
+    ],
+    'alerts': [
+        ('idx_alerts_read_created', ['is_read', 'created_at']),
+        ('idx_alerts_type_related', ['alert_type', 'related_id']),
+    ],
+    'audit_logs': [
+        ('idx_audit_logs_created_id', ['created_at', 'id']),
+        ('idx_audit_logs_user_created', ['user_id', 'created_at', 'id']),
+        ('idx_audit_logs_action_created', ['action', 'created_at', 'id']),
+        ('idx_audit_logs_entity_created', ['entity_type', 'created_at', 'id']),
+    ],
+    'users': [
+        ('ix_users_role', ['role']),
+    ],
+}
+
+# Índices de schema.sql (o de versiones anteriores de los modelos) reemplazados por los de arriba
+LEGACY_INDEXES = {
+    'certifications': ['idx_expiration_date', 'idx_status', 'idx_cert_responsible_date'],
+    'audits': ['idx_audit_type', 'idx_scheduled_date', 'idx_status', 'idx_audit_responsible_date'],
+    'audit_findings': ['idx_severity', 'idx_status'],
+    'policies': ['idx_is_active', 'idx_policy_active_date'],
+    'alerts': ['idx_alert_type', 'idx_is_read', 'idx_created_at'],
+    'audit_logs': ['idx_created_at', 'idx_entity_type', 'ix_audit_logs_created_at'],
+    'users': ['idx_role'],
+}
+
+
+def existing_indexes(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def create_audit_log_counters():
+    """Crea audit_log_counters (la crea 0001, pero no las versiones anteriores de schema.sql)"""
+    counters = op.create_table('audit_log_counters',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('action', sa.String(length=100), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'action')
+    )
+    audit_logs = sa.table('audit_logs', sa.column('action'), sa.column('created_at'))
+    day = sa.func.date(audit_logs.c.created_at)
+    op.execute(counters.insert().from_select(
+        ['day', 'action', 'total'],
+        sa.select(day, audit_logs.c.action, sa.func.count()).group_by(day, audit_logs.c.action)
+    ))
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('audit_log_counters'):
+        create_audit_log_counters()
+
+    for table, indexes in INDEXES.items():
+        existing = existing_indexes(table)
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for name, columns in indexes:
+                if name not in existing:
+                    batch_op.create_index(name, columns, unique=False)
+
+    # Se eliminan después de crear los nuevos (MySQL exige un índice para cada clave foránea)
+    for table, names in LEGACY_INDEXES.items():
+        existing = existing_indexes(table)
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for name in names:
+                if name in existing:
+                    batch_op.drop_index(name)
+
+
+def downgrade():
+    # Solo se quitan los índices nuevos de esta revisión; los de schema.sql no se restauran
+    for table in ('certifications', 'audits', 'audit_findings', 'policies', 'alerts', 'users'):
+        existing = existing_indexes(table)
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for name, columns in INDEXES[table]:
+                if name in existing:
+                    batch_op.drop_index(name)
@@ -0,0 +1,83 @@
+"""confirmación única por política y usuario
+
+Agrega la clave única unique_policy_user (policy_id, user_id) que ya tenía
+database/schema.sql pero no los modelos, y elimina el índice
+idx_policy_confirmations_policy_user, que queda cubierto por ella.
+
+Antes de crearla se eliminan las confirmaciones duplicadas: de cada par se
+conserva la confirmada más antigua o, si ninguna está confirmada, la primera.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 15:12:06.418203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+TABLE = 'policy_confirmations'
+CONSTRAINT = 'unique_policy_user'
+INDEX = 'idx_policy_confirmations_policy_user'
+
+
+def existing_indexes():
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(TABLE)}
+
+
+def existing_unique_constraints():
+    return {constraint['name'] for constraint in sa.inspect(op.get_bind()).get_unique_constraints(TABLE)}
+
+
+def remove_duplicates():
+    bind = op.get_bind()
+    confirmations = sa.table(
+        TABLE,
+        sa.column('id', sa.Integer),
+        sa.column('policy_id', sa.Integer),
+        sa.column('user_id', sa.Integer),
+        sa.column('confirmed', sa.Boolean),
+        sa.column('confirmed_date', sa.DateTime)
+    )
+
+    duplicated = bind.execute(
+        sa.select(confirmations.c.policy_id, confirmations.c.user_id)
+        .group_by(confirmations.c.policy_id, confirmations.c.user_id)
+        .having(sa.func.count() > 1)
+    ).all()
+
+    for policy_id, user_id in duplicated:
+        rows = bind.execute(
+            sa.select(confirmations.c.id, confirmations.c.confirmed, confirmations.c.confirmed_date)
+            .where(confirmations.c.policy_id == policy_id, confirmations.c.user_id == user_id)
+        ).all()
+        keep = min(rows, key=lambda row: (not row.confirmed, row.confirmed_date is None,
+                                          row.confirmed_date or 0, row.id))
+        bind.execute(
+            confirmations.delete().where(
+                confirmations.c.id.in_([row.id for row in rows if row.id != keep.id])
+            )
+        )
+
+
+def upgrade():
+    if CONSTRAINT not in existing_unique_constraints():
+        remove_duplicates()
+        with op.batch_alter_table(TABLE, schema=None) as batch_op:
+            batch_op.create_unique_constraint(CONSTRAINT, ['policy_id', 'user_id'])
+
+    if INDEX in existing_indexes():
+        with op.batch_alter_table(TABLE, schema=None) as batch_op:
+            batch_op.drop_index(INDEX)
+
+
+def downgrade():
+    with op.batch_alter_table(TABLE, schema=None) as batch_op:
+        batch_op.create_index(INDEX, ['policy_id', 'user_id'], unique=False)
+        batch_op.drop_constraint(CONSTRAINT, type_='unique')
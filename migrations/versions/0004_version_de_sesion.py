@@ -0,0 +1,29 @@
+"""versión de sesión de usuarios
+
+Agrega users.session_version, que invalida la identidad guardada en la
+sesión al editar o activar/desactivar un usuario (ver app/user_cache.py).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 16:02:41.275930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('session_version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('session_version')
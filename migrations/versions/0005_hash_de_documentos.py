@@ -0,0 +1,32 @@
+"""hash de documentos de certificaciones
+
+Agrega certifications.document_hash (SHA-256 del documento, usado como ETag
+en la vista previa) y document_updated_at (Last-Modified). Los documentos
+existentes obtienen su hash la primera vez que se ven.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 16:48:19.504126
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('certifications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('document_hash', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('document_updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('certifications', schema=None) as batch_op:
+        batch_op.drop_column('document_updated_at')
+        batch_op.drop_column('document_hash')
@@ -0,0 +1,52 @@
+"""almacén de documentos por contenido
+
+Agrega la tabla document_blobs (un archivo por SHA-256 con su contador de
+referencias, ver app/document_store.py) y el índice de
+certifications.document_hash con el que se recalculan las referencias.
+
+Los documentos existentes siguen en su ruta; "flask --app app gc-documents"
+los mueve al almacén.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 19:02:41.730215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('document_blobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('path', sa.String(length=255), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('sha256')
+    )
+    with op.batch_alter_table('document_blobs', schema=None) as batch_op:
+        batch_op.create_index('idx_document_blobs_refs_updated', ['ref_count', 'updated_at'], unique=False)
+
+    with op.batch_alter_table('certifications', schema=None) as batch_op:
+        batch_op.create_index('idx_certifications_document_hash', ['document_hash'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('certifications', schema=None) as batch_op:
+        batch_op.drop_index('idx_certifications_document_hash')
+
+    with op.batch_alter_table('document_blobs', schema=None) as batch_op:
+        batch_op.drop_index('idx_document_blobs_refs_updated')
+
+    op.drop_table('document_blobs')
@@ -0,0 +1,29 @@
+"""reserva del outbox por token
+
+Agrega email_outbox.claim_token: cada reserva del worker (app/mailer.py)
+escribe un token propio y relee su lote por él, en lugar de por locked_at.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 21:14:08.512306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('email_outbox', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('claim_token', sa.String(length=32), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('email_outbox', schema=None) as batch_op:
+        batch_op.drop_column('claim_token')